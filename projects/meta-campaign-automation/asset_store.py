@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+CONTENT-ADDRESSED ASSET STORE
+=============================
+Local store of generated creatives keyed by the SHA-256 of their bytes,
+with the remote IDs they were uploaded under (Canva asset IDs, Meta image
+hashes per ad account).
+
+Uploading bytes the store has seen before is skipped and the existing
+remote ID is returned, so rerunning a workflow does not re-upload images
+to Canva or Meta.
+
+Layout:
+    <ASSET_STORE_DIR>/objects/<sha[:2]>/<sha>.<ext>   - one read-only copy per unique image
+    <ASSET_STORE_DIR>/assets.db                       - metadata (SQLite, WAL)
+
+Usage:
+    store = AssetStore()
+    asset_id = store.upload_once(path, 'canva', lambda p: canva.upload_asset(p, name))
+
+CLI:
+    python asset_store.py status
+"""
+
+import os
+import json
+import uuid
+import asyncio
+import sqlite3
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Any, Optional, Callable, Iterator, Awaitable, Tuple
+
+from streaming_io import CHUNK_SIZE, atomic_output
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+# ==============================================================================
+# CONFIGURATION
+# ==============================================================================
+
+class AssetStoreConfig:
+    """Asset Store Configuration"""
+    STORE_DIR = os.getenv('ASSET_STORE_DIR', './asset_store')
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS assets (
+    sha256 TEXT PRIMARY KEY,
+    object_path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    source_path TEXT,
+    created_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS remote_assets (
+    sha256 TEXT NOT NULL,
+    service TEXT NOT NULL,
+    remote_id TEXT NOT NULL,
+    uploaded_at TEXT NOT NULL,
+    PRIMARY KEY (sha256, service)
+);
+"""
+
+
+def file_sha256(path: str) -> str:
+    """SHA-256 of a file, read in CHUNK_SIZE pieces"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ContentMismatch(Exception):
+    """Copied bytes do not hash to the expected SHA-256"""
+
+
+def copy_hashed(source_path: str, output_path: str, expected_sha: str = None) -> str:
+    """
+    Copy a file atomically, hashing the bytes as they are written
+
+    Raises:
+        ContentMismatch: The copy does not match expected_sha (output_path
+                         is left untouched)
+
+    Returns:
+        SHA-256 of the copied bytes
+    """
+    digest = hashlib.sha256()
+    with atomic_output(output_path) as f, open(source_path, 'rb') as source:
+        for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+            f.write(chunk)
+        if expected_sha and digest.hexdigest() != expected_sha:
+            raise ContentMismatch(f"{source_path} does not hash to {expected_sha}")
+    return digest.hexdigest()
+
+
+# ==============================================================================
+# ASSET STORE
+# ==============================================================================
+
+class AssetStore:
+    """
+    SHA-256 keyed image store with remote upload IDs
+
+    Services are free-form keys; use 'canva' and 'meta:<ad_account_id>'
+    (Meta image hashes are scoped to an ad account).
+    """
+
+    def __init__(self, store_dir: str = None):
+        self.store_dir = store_dir or AssetStoreConfig.STORE_DIR
+        self.db_path = os.path.join(self.store_dir, 'assets.db')
+        os.makedirs(os.path.join(self.store_dir, 'objects'), exist_ok=True)
+
+        # One upload per (hash, service) at a time, so concurrent callers
+        # with identical bytes wait for the first upload instead of repeating it
+        self._upload_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._async_upload_locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection per unit of work (safe across worker threads)"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def add(self, path: str) -> str:
+        """
+        Add a file to the store (no-op for known content)
+
+        The object is an independent, read-only copy: the caller's file can
+        be edited or overwritten afterwards without changing stored bytes.
+
+        Returns:
+            SHA-256 of the stored bytes
+        """
+        sha = file_sha256(path)
+
+        with self._connect() as conn:
+            if conn.execute('SELECT 1 FROM assets WHERE sha256 = ?', (sha,)).fetchone():
+                return sha
+
+        extension = os.path.splitext(path)[1] or '.bin'
+        object_path = self._object_path(sha, extension)
+
+        if not (os.path.exists(object_path) and file_sha256(object_path) == sha):
+            try:
+                copy_hashed(path, object_path, sha)
+            except ContentMismatch:
+                # The file changed after it was hashed: store what was copied
+                staged = os.path.join(self.store_dir, 'objects', f'.{uuid.uuid4().hex}{extension}')
+                sha = copy_hashed(path, staged)
+                object_path = self._object_path(sha, extension)
+                os.replace(staged, object_path)
+            os.chmod(object_path, 0o444)
+
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR IGNORE INTO assets (sha256, object_path, size, source_path, created_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (sha, object_path, os.path.getsize(object_path), path, datetime.now().isoformat())
+            )
+
+        return sha
+
+    def _object_path(self, sha: str, extension: str) -> str:
+        object_path = os.path.join(self.store_dir, 'objects', sha[:2], f'{sha}{extension}')
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        return object_path
+
+    def get(self, sha: str) -> Optional[Dict[str, Any]]:
+        """Asset metadata with its remote IDs per service"""
+        with self._connect() as conn:
+            asset = conn.execute('SELECT * FROM assets WHERE sha256 = ?', (sha,)).fetchone()
+            if not asset:
+                return None
+            remotes = conn.execute(
+                'SELECT service, remote_id FROM remote_assets WHERE sha256 = ?', (sha,)
+            ).fetchall()
+
+        result = dict(asset)
+        result['remote_ids'] = {row['service']: row['remote_id'] for row in remotes}
+        return result
+
+    def materialize(self, sha: str, output_path: str) -> bool:
+        """
+        Copy the stored bytes for a hash to output_path
+
+        The copy is verified against the hash while it is written; an object
+        that no longer matches (e.g. edited through a hard link by an older
+        version of this store) is dropped instead of being handed out.
+
+        Returns:
+            False if the store has no intact copy of the content
+        """
+        asset = self.get(sha)
+        if not asset or not os.path.exists(asset['object_path']):
+            return False
+
+        if os.path.exists(output_path) and file_sha256(output_path) == sha:
+            return True
+
+        try:
+            copy_hashed(asset['object_path'], output_path, sha)
+        except ContentMismatch:
+            logger.warning(f"Stored object {asset['object_path']} is corrupt, removing it")
+            os.remove(asset['object_path'])
+            with self._connect() as conn:
+                conn.execute('DELETE FROM assets WHERE sha256 = ?', (sha,))
+            return False
+
+        return True
+
+    def get_remote_id(self, sha: str, service: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT remote_id FROM remote_assets WHERE sha256 = ? AND service = ?',
+                (sha, service)
+            ).fetchone()
+        return row['remote_id'] if row else None
+
+    def set_remote_id(self, sha: str, service: str, remote_id: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO remote_assets (sha256, service, remote_id, uploaded_at) '
+                'VALUES (?, ?, ?, ?)',
+                (sha, service, remote_id, datetime.now().isoformat())
+            )
+
+    def upload_once(
+        self,
+        path: str,
+        service: str,
+        upload: Callable[[str], Optional[str]]
+    ) -> Optional[str]:
+        """
+        Upload a file unless identical bytes were already uploaded to the service
+
+        Args:
+            path: Local file
+            service: Remote service key ('canva', 'meta:act_XXX')
+            upload: Called with the path when an upload is needed; returns
+                    the remote ID or None on failure (failures are not cached)
+
+        Returns:
+            Existing or new remote ID
+        """
+        sha = self.add(path)
+
+        with self._locks_guard:
+            lock = self._upload_locks.setdefault((sha, service), threading.Lock())
+
+        with lock:
+            remote_id = self.get_remote_id(sha, service)
+            if remote_id:
+                logger.info(f"Skipping {service} upload of {os.path.basename(path)}: already {remote_id}")
+                return remote_id
+
+            remote_id = upload(path)
+            if remote_id:
+                self.set_remote_id(sha, service, remote_id)
+
+        return remote_id
+
+    async def upload_once_async(
+        self,
+        path: str,
+        service: str,
+        upload: Callable[[str], Awaitable[Optional[str]]]
+    ) -> Optional[str]:
+        """upload_once for coroutine uploaders (hashing and SQLite run in a thread)"""
+        sha = await asyncio.to_thread(self.add, path)
+        lock = self._async_upload_locks.setdefault((sha, service), asyncio.Lock())
+
+        async with lock:
+            remote_id = await asyncio.to_thread(self.get_remote_id, sha, service)
+            if remote_id:
+                logger.info(f"Skipping {service} upload of {os.path.basename(path)}: already {remote_id}")
+                return remote_id
+
+            remote_id = await upload(path)
+            if remote_id:
+                await asyncio.to_thread(self.set_remote_id, sha, service, remote_id)
+
+        return remote_id
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            assets = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM assets').fetchone()
+            services = conn.execute(
+                'SELECT service, COUNT(*) AS uploads FROM remote_assets GROUP BY service'
+            ).fetchall()
+
+        return {
+            'store_dir': self.store_dir,
+            'assets': assets[0],
+            'bytes': assets[1],
+            'uploads': {row['service']: row['uploads'] for row in services}
+        }
+
+
+# ==============================================================================
+# CLI INTERFACE
+# ==============================================================================
+
+def main():
+    """Command line interface"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect the local creative asset store")
+    parser.add_argument("command", choices=["status", "show"], help="status: totals, show: one asset")
+    parser.add_argument("sha256", nargs="?", help="Asset hash (for show)")
+    parser.add_argument("--dir", default=AssetStoreConfig.STORE_DIR, help="Store directory")
+
+    args = parser.parse_args()
+    store = AssetStore(args.dir)
+
+    if args.command == "show":
+        result = store.get(args.sha256) if args.sha256 else {'error': 'sha256 required'}
+    else:
+        result = store.stats()
+
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+AUDIENCE REACH ESTIMATES
+========================
+Cache of Graph API reach estimates for the pre-defined audience segments.
+
+The hard-coded AudienceDefinition.estimated_reach strings drift from
+reality, but asking Meta on every /api/audiences request would be slow
+and burn rate limit. Estimates are therefore fetched by a background
+thread and cached with a TTL, keyed on a SHA-256 of the serialized
+targeting spec: when a segment's targeting changes, its old estimate is
+no longer used.
+
+Usage:
+    cache = ReachEstimateCache(MetaApiClient(), AudienceBuilder())
+    cache.start_background_refresh()
+    estimate = cache.get(AudienceSegment.HR_DIRECTORS)  # never calls Meta
+"""
+
+import os
+import time
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass, asdict
+from typing import Dict, Any, Optional, List
+
+from meta_api_client import MetaApiClient, MetaApiError
+from campaign_automation import AudienceBuilder, AudienceSegment, SEGMENT_DEFINITIONS
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+# ==============================================================================
+# CONFIGURATION
+# ==============================================================================
+
+class ReachEstimateConfig:
+    """Reach Estimate Cache Configuration"""
+    # How long an estimate is served before it is refetched
+    TTL_SECONDS = int(os.getenv('REACH_ESTIMATE_TTL_HOURS', '12')) * 3600
+
+    # How often the background thread looks for missing/expired estimates
+    REFRESH_INTERVAL = int(os.getenv('REACH_ESTIMATE_REFRESH_INTERVAL', '300'))
+
+    # Pause between Graph calls during a refresh (spreads rate limit usage)
+    REQUEST_SPACING = 1.0
+
+
+@dataclass
+class ReachEstimate:
+    """Cached reach estimate for one targeting spec"""
+    spec_hash: str
+    users_lower_bound: int
+    users_upper_bound: int
+    estimate_ready: bool
+    fetched_at: float
+
+    @property
+    def estimated_reach(self) -> str:
+        """Same format as AudienceDefinition.estimated_reach"""
+        return f"{self.users_lower_bound:,}-{self.users_upper_bound:,}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data['estimated_reach'] = self.estimated_reach
+        return data
+
+
+def spec_hash(targeting_json: bytes) -> str:
+    """Cache key for a serialized targeting spec"""
+    return hashlib.sha256(targeting_json).hexdigest()
+
+
+# ==============================================================================
+# REACH ESTIMATE CACHE
+# ==============================================================================
+
+class ReachEstimateCache:
+    """
+    TTL cache of reach estimates per targeting spec, refreshed in the background
+
+    Reads (get, get_all) only look at the cache. Graph calls happen in
+    refresh(), which the background thread runs every REFRESH_INTERVAL.
+    Expired estimates keep being served (marked stale) until a refresh
+    replaces them, so a failing Graph call never empties the cache.
+    """
+
+    def __init__(
+        self,
+        api_client: MetaApiClient,
+        audience_builder: AudienceBuilder = None,
+        ttl_seconds: int = None
+    ):
+        self.api_client = api_client
+        self.audience_builder = audience_builder or AudienceBuilder()
+        self.ttl_seconds = ttl_seconds or ReachEstimateConfig.TTL_SECONDS
+
+        self._estimates: Dict[str, ReachEstimate] = {}
+        self._errors: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+        # Bumped on every change so callers can cache serialized output
+        self.version = 0
+
+    def _segment_hash(self, segment: AudienceSegment) -> str:
+        return spec_hash(self.audience_builder.get_targeting_json(segment))
+
+    def get(self, segment: AudienceSegment) -> Optional[Dict[str, Any]]:
+        """Cached estimate for a segment (None if never fetched), with a 'stale' flag"""
+        estimate = self._estimates.get(self._segment_hash(segment))
+        if estimate is None:
+            return None
+
+        data = estimate.to_dict()
+        data['stale'] = time.time() - estimate.fetched_at > self.ttl_seconds
+        return data
+
+    def get_all(self) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Cached estimates keyed by segment value"""
+        return {
+            segment.value: self.get(segment)
+            for _, _, segment, _, _ in SEGMENT_DEFINITIONS
+        }
+
+    def get_errors(self) -> Dict[str, str]:
+        """Last refresh error per segment value"""
+        return dict(self._errors)
+
+    def refresh(
+        self,
+        segments: List[AudienceSegment] = None,
+        force: bool = False
+    ) -> int:
+        """
+        Fetch estimates for segments whose cached estimate is missing or expired
+
+        Args:
+            segments: Segments to refresh (default: all pre-defined segments)
+            force: Refetch even if the cached estimate is still fresh
+
+        Returns:
+            Number of estimates fetched
+        """
+        segments = segments or [segment for _, _, segment, _, _ in SEGMENT_DEFINITIONS]
+        fetched = 0
+
+        for segment in segments:
+            targeting_json = self.audience_builder.get_targeting_json(segment)
+            key = spec_hash(targeting_json)
+
+            cached = self._estimates.get(key)
+            if cached and not force and time.time() - cached.fetched_at < self.ttl_seconds:
+                continue
+
+            if fetched:
+                time.sleep(ReachEstimateConfig.REQUEST_SPACING)
+
+            try:
+                result = self.api_client.get_reach_estimate(targeting_json.decode('utf-8'))
+            except MetaApiError as e:
+                logger.warning(f"Reach estimate for {segment.value} failed: {e.message}")
+                self._errors[segment.value] = e.message
+                if e.is_rate_limited():
+                    break
+                continue
+
+            with self._lock:
+                self._estimates[key] = ReachEstimate(
+                    spec_hash=key,
+                    users_lower_bound=int(result.get('users_lower_bound') or 0),
+                    users_upper_bound=int(result.get('users_upper_bound') or 0),
+                    estimate_ready=bool(result.get('estimate_ready', True)),
+                    fetched_at=time.time()
+                )
+                self._errors.pop(segment.value, None)
+                self.version += 1
+
+            fetched += 1
+
+        if fetched:
+            logger.info(f"Refreshed {fetched} reach estimates")
+
+        return fetched
+
+    # ==========================================================================
+    # BACKGROUND REFRESH
+    # ==========================================================================
+
+    def start_background_refresh(self, interval: int = None) -> None:
+        """Start the daemon refresh thread (no-op if it is already running)"""
+        if self._thread and self._thread.is_alive():
+            return
+
+        interval = interval or ReachEstimateConfig.REFRESH_INTERVAL
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._refresh_loop,
+            args=(interval,),
+            name='reach-estimate-refresh',
+            daemon=True
+        )
+        self._thread.start()
+
+    def stop_background_refresh(self) -> None:
+        self._stop.set()
+
+    def _refresh_loop(self, interval: int) -> None:
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Reach estimate refresh failed: {str(e)}")
+            self._stop.wait(interval)
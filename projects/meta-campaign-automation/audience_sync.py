@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+INCREMENTAL AUDIENCE SYNC
+=========================
+Keep a Meta customer-file audience in line with Pipedrive by sending only
+what changed since the last sync.
+
+A local SQLite index holds the hashed rows (see customer_list_upload.SCHEMA)
+that each audience currently contains. A sync:
+1. Streams the current Pipedrive export (hashed in the process pool of
+   customer_list_upload) into a staging table, page by page
+2. Computes additions (export - index) and removals (index - export) in SQL
+3. Sends them as users DELETE / POST requests in 10,000-row batches,
+   updating the index after every accepted batch
+
+Removals go first: a person whose phone or email changed is one removal
+(old row) and one addition (new row) with a shared key, and Meta matches
+a removal on any key, so removing after adding would drop the person.
+
+Unchanged rows never leave the machine, and both the export and the
+difference live in SQLite, so memory stays flat for any CRM size. A sync
+that fails halfway leaves the index matching what Meta accepted; the next
+run picks up the rest.
+
+Usage:
+    sync = AudienceSync(MetaApiClient(), PipedriveClient())
+    result = sync.sync(audience_id)
+
+CLI:
+    python audience_sync.py sync --audience-id 2380000000
+    python audience_sync.py sync --audience-id 2380000000 --seed   # index only (after a full upload)
+    python audience_sync.py status
+"""
+
+import os
+import json
+import random
+import sqlite3
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Any, List, Iterator
+
+from meta_api_client import MetaApiClient
+from pipedrive_client import PipedriveClient
+from customer_list_upload import SCHEMA, CustomerListConfig, iter_hashed_pages, call_with_retry
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+# ==============================================================================
+# CONFIGURATION
+# ==============================================================================
+
+class AudienceSyncConfig:
+    """Audience Sync Configuration"""
+    DB_PATH = os.getenv('AUDIENCE_INDEX_PATH', './data/audience_index.db')
+
+    # Rows per users request
+    BATCH_SIZE = CustomerListConfig.BATCH_SIZE
+
+    # Refuse to remove more than this fraction of an audience in one sync
+    # (protects against an empty or truncated Pipedrive export)
+    MAX_REMOVAL_RATIO = float(os.getenv('AUDIENCE_SYNC_MAX_REMOVAL_RATIO', '0.5'))
+
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS audience_members (
+    audience_id TEXT NOT NULL,
+    email_hash TEXT NOT NULL,
+    phone_hash TEXT NOT NULL,
+    added_at TEXT NOT NULL,
+    PRIMARY KEY (audience_id, email_hash, phone_hash)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS sync_export (
+    audience_id TEXT NOT NULL,
+    email_hash TEXT NOT NULL,
+    phone_hash TEXT NOT NULL,
+    PRIMARY KEY (audience_id, email_hash, phone_hash)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS sync_runs (
+    audience_id TEXT PRIMARY KEY,
+    last_sync_at TEXT NOT NULL,
+    exported INTEGER NOT NULL,
+    added INTEGER NOT NULL,
+    removed INTEGER NOT NULL
+);
+"""
+
+ADDITIONS_QUERY = """
+SELECT e.email_hash, e.phone_hash FROM sync_export e
+WHERE e.audience_id = ? AND NOT EXISTS (
+    SELECT 1 FROM audience_members m
+    WHERE m.audience_id = e.audience_id
+      AND m.email_hash = e.email_hash AND m.phone_hash = e.phone_hash
+)
+"""
+
+REMOVALS_QUERY = """
+SELECT m.email_hash, m.phone_hash FROM audience_members m
+WHERE m.audience_id = ? AND NOT EXISTS (
+    SELECT 1 FROM sync_export e
+    WHERE e.audience_id = m.audience_id
+      AND e.email_hash = m.email_hash AND e.phone_hash = m.phone_hash
+)
+"""
+
+
+class AudienceSyncError(Exception):
+    """Sync refused (e.g. a suspiciously large removal)"""
+
+
+# ==============================================================================
+# AUDIENCE SYNC
+# ==============================================================================
+
+class AudienceSync:
+    """
+    Diff-based Pipedrive -> Meta audience sync over a local SQLite hash index
+
+    Usage:
+        sync = AudienceSync(MetaApiClient(), PipedriveClient())
+        sync.sync('2380000000')
+    """
+
+    def __init__(
+        self,
+        meta: MetaApiClient,
+        pipedrive: PipedriveClient,
+        db_path: str = None,
+        batch_size: int = None
+    ):
+        self.meta = meta
+        self.pipedrive = pipedrive
+        self.db_path = db_path or AudienceSyncConfig.DB_PATH
+        self.batch_size = batch_size or AudienceSyncConfig.BATCH_SIZE
+
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA_SQL)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection per unit of work"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    # ==========================================================================
+    # SYNC
+    # ==========================================================================
+
+    def sync(
+        self,
+        audience_id: str,
+        seed: bool = False,
+        allow_mass_removal: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Bring an audience in line with the current Pipedrive export
+
+        Args:
+            audience_id: Customer-file custom audience ID
+            seed: Record the export as the audience contents without sending
+                  anything (for audiences filled by customer_list_upload)
+            allow_mass_removal: Skip the MAX_REMOVAL_RATIO safety check
+
+        Returns:
+            {'audience_id', 'exported', 'added', 'removed', 'members'}
+        """
+        exported = self._stage_export(audience_id)
+
+        with self._connect() as conn:
+            members = self._count(conn, 'SELECT COUNT(*) FROM audience_members WHERE audience_id = ?', audience_id)
+            to_add = self._count(conn, f'SELECT COUNT(*) FROM ({ADDITIONS_QUERY})', audience_id)
+            to_remove = self._count(conn, f'SELECT COUNT(*) FROM ({REMOVALS_QUERY})', audience_id)
+
+        logger.info(
+            f"Audience {audience_id}: {exported} rows exported, {members} indexed, "
+            f"{to_add} to add, {to_remove} to remove"
+        )
+
+        if members and to_remove > members * AudienceSyncConfig.MAX_REMOVAL_RATIO and not allow_mass_removal:
+            self._clear_export(audience_id)
+            raise AudienceSyncError(
+                f"Refusing to remove {to_remove} of {members} rows from audience {audience_id} "
+                f"(rerun with allow_mass_removal if the export is correct)"
+            )
+
+        if seed:
+            with self._connect() as conn:
+                conn.execute('DELETE FROM audience_members WHERE audience_id = ?', (audience_id,))
+                conn.execute(
+                    'INSERT INTO audience_members (audience_id, email_hash, phone_hash, added_at) '
+                    'SELECT audience_id, email_hash, phone_hash, ? FROM sync_export WHERE audience_id = ?',
+                    (datetime.now().isoformat(), audience_id)
+                )
+            added, removed = to_add, to_remove
+        else:
+            # Removals before additions (see module docstring)
+            removed = self._apply(audience_id, REMOVALS_QUERY, to_remove, remove=True)
+            added = self._apply(audience_id, ADDITIONS_QUERY, to_add, remove=False)
+
+        self._clear_export(audience_id)
+
+        result = {
+            'audience_id': audience_id,
+            'exported': exported,
+            'added': added,
+            'removed': removed,
+            'members': members + added - removed,
+            'seeded': seed
+        }
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO sync_runs (audience_id, last_sync_at, exported, added, removed) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (audience_id, datetime.now().isoformat(), exported, added, removed)
+            )
+
+        logger.info(f"Audience {audience_id} synced: +{added} -{removed}")
+        return result
+
+    def _stage_export(self, audience_id: str) -> int:
+        """Write the hashed Pipedrive export into sync_export, returns the number of unique rows"""
+        self._clear_export(audience_id)
+
+        for _, rows in iter_hashed_pages(self.pipedrive):
+            if not rows:
+                continue
+            with self._connect() as conn:
+                conn.executemany(
+                    'INSERT OR IGNORE INTO sync_export (audience_id, email_hash, phone_hash) VALUES (?, ?, ?)',
+                    [(audience_id, email_hash, phone_hash) for email_hash, phone_hash in rows]
+                )
+
+        with self._connect() as conn:
+            return self._count(conn, 'SELECT COUNT(*) FROM sync_export WHERE audience_id = ?', audience_id)
+
+    def _clear_export(self, audience_id: str) -> None:
+        with self._connect() as conn:
+            conn.execute('DELETE FROM sync_export WHERE audience_id = ?', (audience_id,))
+
+    def _apply(self, audience_id: str, query: str, total: int, remove: bool) -> int:
+        """
+        Send the rows of a difference query in batches of one session
+
+        The query shrinks as accepted batches are written to the index, so
+        every batch is simply the first batch_size rows that are left.
+        """
+        if not total:
+            return 0
+
+        session_id = random.getrandbits(62)
+        batches = -(-total // self.batch_size)
+        action = 'Remove' if remove else 'Add'
+        request = self.meta.remove_audience_users if remove else self.meta.add_audience_users
+        sent = 0
+
+        for batch_seq in range(1, batches + 1):
+            with self._connect() as conn:
+                rows = [
+                    [row['email_hash'], row['phone_hash']]
+                    for row in conn.execute(f'{query} LIMIT ?', (audience_id, self.batch_size))
+                ]
+            if not rows:
+                break
+
+            session = {
+                'session_id': session_id,
+                'batch_seq': batch_seq,
+                'last_batch_flag': batch_seq == batches,
+                'estimated_num_total': total
+            }
+            call_with_retry(
+                lambda: request(audience_id, SCHEMA, rows, session),
+                f"{action} batch {batch_seq}/{batches} for audience {audience_id}",
+                "rerun to sync the remaining rows"
+            )
+            self._record(audience_id, rows, remove)
+            sent += len(rows)
+
+        return sent
+
+    def _record(self, audience_id: str, rows: List[List[str]], remove: bool) -> None:
+        """Update the index with an accepted batch"""
+        with self._connect() as conn:
+            if remove:
+                conn.executemany(
+                    'DELETE FROM audience_members WHERE audience_id = ? AND email_hash = ? AND phone_hash = ?',
+                    [(audience_id, email_hash, phone_hash) for email_hash, phone_hash in rows]
+                )
+            else:
+                added_at = datetime.now().isoformat()
+                conn.executemany(
+                    'INSERT OR IGNORE INTO audience_members (audience_id, email_hash, phone_hash, added_at) '
+                    'VALUES (?, ?, ?, ?)',
+                    [(audience_id, email_hash, phone_hash, added_at) for email_hash, phone_hash in rows]
+                )
+
+    @staticmethod
+    def _count(conn: sqlite3.Connection, query: str, audience_id: str) -> int:
+        return conn.execute(query, (audience_id,)).fetchone()[0]
+
+    # ==========================================================================
+    # STATUS
+    # ==========================================================================
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Indexed members and last sync per audience"""
+        with self._connect() as conn:
+            rows = conn.execute("""
+                SELECT r.audience_id, r.last_sync_at, r.exported, r.added, r.removed,
+                       (SELECT COUNT(*) FROM audience_members m WHERE m.audience_id = r.audience_id) AS members
+                FROM sync_runs r ORDER BY r.audience_id
+            """).fetchall()
+        return [dict(row) for row in rows]
+
+
+# ==============================================================================
+# CLI INTERFACE
+# ==============================================================================
+
+def main():
+    """Command line interface"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Incrementally sync Pipedrive persons to a Meta audience")
+    parser.add_argument("command", choices=["sync", "status"], help="sync: send the difference, status: index totals")
+    parser.add_argument("--audience-id", help="Custom audience ID")
+    parser.add_argument("--seed", action="store_true", help="Only record the export in the index (nothing is sent)")
+    parser.add_argument("--allow-mass-removal", action="store_true", help="Skip the removal safety check")
+    parser.add_argument("--db", default=AudienceSyncConfig.DB_PATH, help="SQLite index path")
+
+    args = parser.parse_args()
+
+    if args.command == "status":
+        sync = AudienceSync(meta=None, pipedrive=None, db_path=args.db)
+        print(json.dumps(sync.stats(), indent=2))
+        return
+
+    if not args.audience_id:
+        parser.error("--audience-id is required")
+
+    sync = AudienceSync(MetaApiClient(), PipedriveClient(), db_path=args.db)
+    result = sync.sync(args.audience_id, seed=args.seed, allow_mass_removal=args.allow_mass_removal)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+"""
+BUDGET OPTIMIZER
+================
+NumPy engine that analyzes daily per-campaign (or per-ad-set) metrics and
+allocates a fixed total daily budget.
+
+Daily rows are loaded into (entities x days) arrays once; every metric is
+then computed for all entities at the same time:
+- CPL with a Poisson confidence interval on the lead count
+- Lead-rate trend (spend-weighted least squares slope over the days)
+- Spend elasticity of leads, fitted per entity and shrunk to a default
+- Marginal CPL on a diminishing-returns curve: leads(b) = scale * b^elasticity
+
+The allocation maximizes expected leads subject to sum(budgets) == total
+and per-entity bounds (max step up/down per run, minimum budget). For
+concave curves the optimum has equal marginal leads per euro for all
+unbounded entities, so it is found by bisection on that marginal value.
+
+Usage:
+    metrics = MetricArrays.from_daily_rows(store.campaign_daily(since, until))
+    plan = BudgetOptimizer().optimize(metrics, current_budgets, total_budget=500)
+    records = plan.to_records()
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Dict, Any, List, Iterable, Optional, Tuple
+
+import numpy as np
+
+
+# ==============================================================================
+# CONFIGURATION
+# ==============================================================================
+
+class BudgetOptimizerConfig:
+    """Budget Optimizer Configuration"""
+    LOOKBACK_DAYS = int(os.getenv('OPTIMIZER_LOOKBACK_DAYS', '14'))
+
+    # z-score for CPL confidence intervals (1.96 = 95%)
+    CONFIDENCE_Z = 1.96
+
+    # Pseudo-leads shrinking sparse entities towards the portfolio lead rate
+    PRIOR_LEADS = 2.0
+
+    # leads ~ budget^elasticity; 1.0 would be linear (no diminishing returns)
+    DEFAULT_ELASTICITY = 0.7
+    MIN_ELASTICITY = 0.3
+    MAX_ELASTICITY = 0.95
+
+    # Spread of daily log-spend (sum of squared deviations) at which the fitted
+    # elasticity weighs as much as the default; steady budgets carry no signal
+    ELASTICITY_PRIOR_SPREAD = 1.0
+
+    # Max budget change per run (Meta resets learning on large jumps)
+    MAX_INCREASE = float(os.getenv('OPTIMIZER_MAX_INCREASE', '0.5'))
+    MAX_DECREASE = float(os.getenv('OPTIMIZER_MAX_DECREASE', '0.5'))
+
+    # Minimum daily budget in EUR
+    MIN_DAILY_BUDGET = float(os.getenv('OPTIMIZER_MIN_DAILY_BUDGET', '5'))
+
+    # Bisection steps on the marginal value (log-space)
+    SOLVER_ITERATIONS = 80
+
+
+# ==============================================================================
+# METRIC ARRAYS
+# ==============================================================================
+
+@dataclass
+class MetricArrays:
+    """Daily metrics as (entities x days) arrays"""
+    ids: List[str]
+    names: List[str]
+    dates: List[str]
+    spend: np.ndarray
+    leads: np.ndarray
+    impressions: np.ndarray
+    clicks: np.ndarray
+
+    @classmethod
+    def from_daily_rows(
+        cls,
+        rows: Iterable[Dict[str, Any]],
+        id_key: str = 'campaign_id',
+        name_key: str = 'campaign_name'
+    ) -> 'MetricArrays':
+        """
+        Build arrays from daily rows (insights store or time_increment=1 insights)
+
+        Rows need id_key, 'date' (or 'date_start'), spend and leads;
+        impressions and clicks are optional.
+        """
+        ids, names, dates, values = [], {}, [], []
+
+        for row in rows:
+            entity_id = row[id_key]
+            ids.append(entity_id)
+            names.setdefault(entity_id, row.get(name_key))
+            dates.append(row.get('date') or row.get('date_start'))
+            values.append((
+                float(row.get('spend') or 0),
+                float(row.get('leads') or 0),
+                float(row.get('impressions') or 0),
+                float(row.get('clicks') or 0)
+            ))
+
+        unique_ids, id_index = np.unique(np.array(ids, dtype=object).astype(str), return_inverse=True)
+        unique_dates, date_index = np.unique(np.array(dates, dtype=str), return_inverse=True)
+
+        shape = (len(unique_ids), len(unique_dates))
+        values = np.array(values, dtype=float).reshape(-1, 4)
+        arrays = []
+        for column in range(4):
+            array = np.zeros(shape)
+            np.add.at(array, (id_index, date_index), values[:, column])
+            arrays.append(array)
+
+        return cls(
+            ids=unique_ids.tolist(),
+            names=[names.get(entity_id) for entity_id in unique_ids.tolist()],
+            dates=unique_dates.tolist(),
+            spend=arrays[0],
+            leads=arrays[1],
+            impressions=arrays[2],
+            clicks=arrays[3]
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+# ==============================================================================
+# VECTORIZED METRICS
+# ==============================================================================
+
+def cost_per_lead(spend: np.ndarray, leads: np.ndarray) -> np.ndarray:
+    """CPL per entity, NaN where there are no leads"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(leads > 0, spend / leads, np.nan)
+
+
+def cpl_confidence_interval(
+    spend: np.ndarray,
+    leads: np.ndarray,
+    z: float = BudgetOptimizerConfig.CONFIDENCE_Z
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    CPL interval from a Poisson interval on the lead count
+
+    Uses the square-root (Wilson-style) bounds (sqrt(k + z²/4) ± z/2)², so
+    entities with 0 leads still get a finite lower CPL bound. The upper
+    bound is inf when the lower lead bound is 0.
+    """
+    root = np.sqrt(leads + z * z / 4)
+    leads_low = np.maximum(root - z / 2, 0) ** 2
+    leads_high = (root + z / 2) ** 2
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cpl_low = np.where(spend > 0, spend / leads_high, 0.0)
+        cpl_high = np.where(leads_low > 0, spend / leads_low, np.inf)
+
+    return cpl_low, cpl_high
+
+
+def lead_rate_trend(spend_daily: np.ndarray, leads_daily: np.ndarray) -> np.ndarray:
+    """
+    Relative daily change of leads per euro (spend-weighted OLS slope)
+
+    0.05 means the lead rate improves ~5% per day (CPL falling), negative
+    values mean CPL is rising. NaN when there is no spend or no leads.
+    """
+    days = np.arange(spend_daily.shape[1], dtype=float)
+    total_spend = spend_daily.sum(axis=1)
+    total_leads = leads_daily.sum(axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_day = (spend_daily * days).sum(axis=1) / total_spend
+        rate = total_leads / total_spend
+
+        # With weights w=spend and y=leads/spend, w*y is simply leads
+        day_offset = days[None, :] - mean_day[:, None]
+        covariance = (day_offset * (leads_daily - spend_daily * rate[:, None])).sum(axis=1)
+        variance = (spend_daily * day_offset ** 2).sum(axis=1)
+        slope = covariance / variance
+
+        return np.where((total_leads > 0) & (variance > 0), slope / rate, np.nan)
+
+
+def fit_elasticity(
+    spend_daily: np.ndarray,
+    leads_daily: np.ndarray,
+    default: float = BudgetOptimizerConfig.DEFAULT_ELASTICITY,
+    prior_spread: float = BudgetOptimizerConfig.ELASTICITY_PRIOR_SPREAD
+) -> np.ndarray:
+    """
+    Per-entity spend elasticity of leads from a log-log fit over the days
+
+    Only days with spend and leads are used. The fit is shrunk towards
+    the default by how much the daily spend actually varied (a slope is
+    only informative when the budget moved) and clipped to the configured
+    range, so steady or sparse entities stay close to the default curve.
+    """
+    mask = (spend_daily > 0) & (leads_daily > 0)
+    n = mask.sum(axis=1).astype(float)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = np.where(mask, np.log(np.where(mask, spend_daily, 1)), 0.0)
+        y = np.where(mask, np.log(np.where(mask, leads_daily, 1)), 0.0)
+        x_mean = x.sum(axis=1) / n
+        y_mean = y.sum(axis=1) / n
+        x_offset = np.where(mask, x - x_mean[:, None], 0.0)
+        variance = (x_offset ** 2).sum(axis=1)
+        slope = (x_offset * (y - y_mean[:, None])).sum(axis=1) / variance
+
+    usable = (n >= 3) & (variance > 1e-9)
+    fitted = np.where(usable, slope, default)
+    weight = np.where(usable, variance / (variance + prior_spread), 0.0)
+    elasticity = weight * fitted + (1 - weight) * default
+
+    return np.clip(
+        elasticity,
+        BudgetOptimizerConfig.MIN_ELASTICITY,
+        BudgetOptimizerConfig.MAX_ELASTICITY
+    )
+
+
+def marginal_cpl(
+    scale: np.ndarray,
+    elasticity: np.ndarray,
+    budget: np.ndarray
+) -> np.ndarray:
+    """Cost of the next lead at a daily budget: 1 / d(leads)/d(budget)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        marginal_leads = scale * elasticity * np.power(budget, elasticity - 1)
+        return np.where(marginal_leads > 0, 1 / marginal_leads, np.inf)
+
+
+def allocate_budget(
+    scale: np.ndarray,
+    elasticity: np.ndarray,
+    total: float,
+    lower: np.ndarray,
+    upper: np.ndarray,
+    iterations: int = BudgetOptimizerConfig.SOLVER_ITERATIONS
+) -> np.ndarray:
+    """
+    Maximize sum(scale * b^elasticity) subject to sum(b) == total, lower <= b <= upper
+
+    At the optimum every entity between its bounds has the same marginal
+    leads per euro (lam), with b(lam) = (scale * elasticity / lam)^(1/(1-elasticity)).
+    sum(b(lam)) decreases in lam, so lam is found by bisection in log-space.
+    Infeasible totals are clipped to sum(lower) / sum(upper).
+    """
+    if total <= lower.sum():
+        return lower.copy()
+    if total >= upper.sum():
+        return upper.copy()
+
+    numerator = scale * elasticity
+    exponent = 1 / (1 - elasticity)
+    safe_lower = np.maximum(lower, 1e-6)
+
+    def budgets(log_lam: float) -> np.ndarray:
+        return np.clip((numerator / np.exp(log_lam)) ** exponent, lower, upper)
+
+    # Marginal values at the bounds bracket the solution
+    log_marginal = np.log(numerator)
+    log_high = float(np.max(log_marginal + (elasticity - 1) * np.log(safe_lower))) + 1
+    log_low = float(np.min(log_marginal + (elasticity - 1) * np.log(upper))) - 1
+
+    for _ in range(iterations):
+        log_mid = (log_low + log_high) / 2
+        if budgets(log_mid).sum() > total:
+            log_low = log_mid
+        else:
+            log_high = log_mid
+
+    allocation = budgets((log_low + log_high) / 2)
+
+    # Spread the residual of the bisection over entities with headroom
+    residual = total - allocation.sum()
+    headroom = (upper - allocation) if residual > 0 else (allocation - lower)
+    if headroom.sum() > 0:
+        allocation += residual * headroom / headroom.sum()
+
+    return allocation
+
+
+def scale_budget(
+    budgets: np.ndarray,
+    total: float,
+    lower: np.ndarray,
+    upper: np.ndarray,
+    iterations: int = BudgetOptimizerConfig.SOLVER_ITERATIONS
+) -> np.ndarray:
+    """
+    Scale budgets by one common factor so they sum to total, within lower..upper
+
+    Used when there are no leads to optimize on. sum(clip(factor * budgets))
+    increases in the factor, so it is found by bisection; infeasible totals
+    are clipped to sum(lower) / sum(upper) like allocate_budget.
+    """
+    if total <= lower.sum():
+        return lower.copy()
+    if total >= upper.sum():
+        return upper.copy()
+
+    factor_low, factor_high = 0.0, float(np.max(upper / budgets))
+    for _ in range(iterations):
+        factor = (factor_low + factor_high) / 2
+        if np.clip(budgets * factor, lower, upper).sum() > total:
+            factor_high = factor
+        else:
+            factor_low = factor
+
+    allocation = np.clip(budgets * (factor_low + factor_high) / 2, lower, upper)
+
+    residual = total - allocation.sum()
+    headroom = (upper - allocation) if residual > 0 else (allocation - lower)
+    if headroom.sum() > 0:
+        allocation += residual * headroom / headroom.sum()
+
+    return allocation
+
+
+# ==============================================================================
+# OPTIMIZER
+# ==============================================================================
+
+@dataclass
+class BudgetPlan:
+    """Per-entity analysis and budget allocation (arrays aligned with metrics.ids)"""
+    ids: List[str]
+    names: List[str]
+    spend: np.ndarray
+    leads: np.ndarray
+    cpl: np.ndarray
+    cpl_low: np.ndarray
+    cpl_high: np.ndarray
+    trend: np.ndarray
+    elasticity: np.ndarray
+    current_budget: np.ndarray
+    recommended_budget: np.ndarray
+    marginal_cpl_current: np.ndarray
+    marginal_cpl_recommended: np.ndarray
+    expected_leads_current: float
+    expected_leads_recommended: float
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """Plain dicts for JSON responses (NaN/inf become None)"""
+        def value(array: np.ndarray, index: int) -> Optional[float]:
+            item = float(array[index])
+            return round(item, 2) if np.isfinite(item) else None
+
+        return [
+            {
+                'id': entity_id,
+                'name': self.names[i],
+                'spend': value(self.spend, i),
+                'leads': int(self.leads[i]),
+                'cpl': value(self.cpl, i),
+                'cpl_confidence_interval': [value(self.cpl_low, i), value(self.cpl_high, i)],
+                'lead_rate_trend': value(self.trend * 100, i),
+                'elasticity': value(self.elasticity, i),
+                'current_daily_budget': value(self.current_budget, i),
+                'recommended_daily_budget': value(self.recommended_budget, i),
+                'marginal_cpl_current': value(self.marginal_cpl_current, i),
+                'marginal_cpl_recommended': value(self.marginal_cpl_recommended, i)
+            }
+            for i, entity_id in enumerate(self.ids)
+        ]
+
+
+class BudgetOptimizer:
+    """
+    Analyze metric arrays and allocate a total daily budget
+
+    Usage:
+        optimizer = BudgetOptimizer()
+        plan = optimizer.optimize(metrics, current_budgets, total_budget=750.0)
+    """
+
+    def __init__(
+        self,
+        max_increase: float = None,
+        max_decrease: float = None,
+        min_budget: float = None
+    ):
+        self.max_increase = BudgetOptimizerConfig.MAX_INCREASE if max_increase is None else max_increase
+        self.max_decrease = BudgetOptimizerConfig.MAX_DECREASE if max_decrease is None else max_decrease
+        self.min_budget = BudgetOptimizerConfig.MIN_DAILY_BUDGET if min_budget is None else min_budget
+
+    def optimize(
+        self,
+        metrics: MetricArrays,
+        current_budgets: np.ndarray,
+        total_budget: float = None,
+        allocatable: np.ndarray = None
+    ) -> BudgetPlan:
+        """
+        Compute metrics and the budget allocation for all entities
+
+        Args:
+            metrics: Daily metric arrays
+            current_budgets: Current daily budget per entity in EUR (NaN = unknown)
+            total_budget: Daily budget to distribute over allocatable entities
+                          (default: their current total, i.e. rebalance only)
+            allocatable: Boolean mask of entities whose budget may change
+                         (default: all entities with a known budget)
+
+        Returns:
+            BudgetPlan; entities that are not allocatable keep their budget
+        """
+        spend_daily, leads_daily = metrics.spend, metrics.leads
+        num_days = max(spend_daily.shape[1], 1)
+        spend = spend_daily.sum(axis=1)
+        leads = leads_daily.sum(axis=1)
+
+        current = np.asarray(current_budgets, dtype=float)
+        if allocatable is None:
+            allocatable = np.isfinite(current) & (current > 0)
+        allocatable = allocatable & np.isfinite(current) & (current > 0)
+
+        cpl = cost_per_lead(spend, leads)
+        cpl_low, cpl_high = cpl_confidence_interval(spend, leads)
+        trend = lead_rate_trend(spend_daily, leads_daily)
+        elasticity = fit_elasticity(spend_daily, leads_daily)
+
+        # Gamma-Poisson shrinkage of leads per euro towards the portfolio rate
+        portfolio_spend = spend.sum()
+        portfolio_rate = leads.sum() / portfolio_spend if portfolio_spend > 0 else 0.0
+        if portfolio_rate > 0:
+            prior_spend = BudgetOptimizerConfig.PRIOR_LEADS / portfolio_rate
+            rate = (leads + BudgetOptimizerConfig.PRIOR_LEADS) / (spend + prior_spend)
+        else:
+            rate = np.zeros(len(metrics))
+
+        # Anchor each curve at the observed average daily spend (or budget without delivery)
+        reference = np.where(spend > 0, spend / num_days, np.where(allocatable, current, 1.0))
+        scale = rate * reference ** (1 - elasticity)
+
+        recommended = np.where(np.isfinite(current), current, np.nan)
+
+        if allocatable.any() and (portfolio_rate > 0 or total_budget is not None):
+            budgets = current[allocatable]
+            lower = np.maximum(budgets * (1 - self.max_decrease), self.min_budget)
+            upper = np.maximum(budgets * (1 + self.max_increase), lower)
+            total = budgets.sum() if total_budget is None else float(total_budget)
+
+            if portfolio_rate > 0:
+                recommended[allocatable] = allocate_budget(
+                    scale[allocatable], elasticity[allocatable], total, lower, upper
+                )
+            else:
+                # No leads anywhere: nothing to optimize on, scale proportionally (same bounds)
+                recommended[allocatable] = scale_budget(budgets, total, lower, upper)
+
+        def expected_leads(budgets: np.ndarray) -> float:
+            known = np.isfinite(budgets)
+            return float((scale[known] * budgets[known] ** elasticity[known]).sum())
+
+        return BudgetPlan(
+            ids=metrics.ids,
+            names=metrics.names,
+            spend=spend,
+            leads=leads,
+            cpl=cpl,
+            cpl_low=cpl_low,
+            cpl_high=cpl_high,
+            trend=trend,
+            elasticity=elasticity,
+            current_budget=current,
+            recommended_budget=recommended,
+            marginal_cpl_current=marginal_cpl(scale, elasticity, current),
+            marginal_cpl_recommended=marginal_cpl(scale, elasticity, recommended),
+            expected_leads_current=expected_leads(current),
+            expected_leads_recommended=expected_leads(recommended)
+        )
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+STATIC SNIPPET BUILD
+====================
+Write every pixel snippet as a deployable static file, so the Netlify
+site serves them from its CDN and pages never wait on the Flask service.
+
+Variants:
+- pixel-base.html             - Base pixel code (PixelCodeGenerator.get_base_pixel_code)
+- pixel-netlify.html          - Full Netlify integration (create_netlify_pixel_file)
+- event-<name>.js             - fbq('track', ...) call per StandardEvent
+- typeform-<form_id>.html     - Typeform embed with tracking, per form ID
+
+Each file is minified conservatively (comments, indentation and blank
+lines removed; line breaks kept so script semantics never change) and
+named after its content hash, e.g. pixel-base.3f9a0c1d2e4b.html, so it
+can be cached forever. manifest.json maps each variant to its current
+file, SHA-256, size and subresource-integrity hash.
+
+Usage:
+    manifest = build_snippets('./dist/pixel', typeform_ids=['cuGe3IEC'])
+
+CLI:
+    python build_snippets.py --out ./dist/pixel --typeform-id cuGe3IEC
+    python build_snippets.py --out ./dist/pixel --clean   # drop files of the previous build
+
+--clean only removes files the previous manifest.json listed that the new
+one does not, and only when their names have the <variant>.<hash>.<ext>
+form this module writes; anything else in the directory is left alone.
+"""
+
+import os
+import re
+import json
+import base64
+import hashlib
+import logging
+from datetime import datetime
+from typing import Dict, Any, List, Tuple
+
+from pixel_tracking import PixelCodeGenerator, PixelConfig, StandardEvent, create_netlify_pixel_file
+from streaming_io import atomic_output
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+# ==============================================================================
+# CONFIGURATION
+# ==============================================================================
+
+class SnippetBuildConfig:
+    """Snippet Build Configuration"""
+    OUTPUT_DIR = os.getenv('SNIPPET_BUILD_DIR', './dist/pixel')
+
+    # Typeform forms to build embeds for (comma separated)
+    TYPEFORM_IDS = [
+        form_id.strip() for form_id in os.getenv('TYPEFORM_FORM_IDS', '').split(',')
+        if form_id.strip()
+    ]
+
+    # Content hash characters in file names
+    HASH_LENGTH = 12
+
+    MANIFEST_NAME = 'manifest.json'
+
+
+# ==============================================================================
+# MINIFICATION
+# ==============================================================================
+
+# HTML comments, except conditional comments (<!--[if ...]>)
+HTML_COMMENT = re.compile(r'<!--(?!\[if).*?-->', re.S)
+
+# A line that is only a // comment (never touches URLs inside strings)
+JS_LINE_COMMENT = re.compile(r'^\s*//.*$', re.M)
+
+
+def minify(code: str) -> str:
+    """
+    Safe minification of an HTML/JS snippet
+
+    Removes HTML comments, whole-line // comments, indentation and blank
+    lines. Line breaks are kept, so automatic semicolon insertion and
+    string contents behave exactly as in the source.
+    """
+    code = HTML_COMMENT.sub('', code)
+    code = JS_LINE_COMMENT.sub('', code)
+    lines = (line.strip() for line in code.splitlines())
+    return '\n'.join(line for line in lines if line) + '\n'
+
+
+# ==============================================================================
+# BUILD
+# ==============================================================================
+
+def snippet_variants(generator: PixelCodeGenerator, typeform_ids: List[str]) -> List[Tuple[str, str, str]]:
+    """(variant name, file extension, source code) for every snippet"""
+    variants = [
+        ('pixel-base', 'html', generator.get_base_pixel_code()),
+        ('pixel-netlify', 'html', create_netlify_pixel_file())
+    ]
+    variants += [
+        (f'event-{event.value}', 'js', generator.get_event_code(event.value))
+        for event in StandardEvent
+    ]
+    variants += [
+        (f'typeform-{form_id}', 'html', generator.get_typeform_embed_with_tracking(form_id))
+        for form_id in typeform_ids
+    ]
+    return variants
+
+
+def build_snippets(
+    output_dir: str = None,
+    typeform_ids: List[str] = None,
+    clean: bool = False
+) -> Dict[str, Any]:
+    """
+    Write all snippet variants and the manifest
+
+    Args:
+        output_dir: Directory to write to
+        typeform_ids: Typeform form IDs to build embeds for
+        clean: Remove files of the previous build that the new manifest no
+               longer lists (see stale_files)
+
+    Returns:
+        The manifest
+    """
+    output_dir = output_dir or SnippetBuildConfig.OUTPUT_DIR
+    typeform_ids = SnippetBuildConfig.TYPEFORM_IDS if typeform_ids is None else typeform_ids
+    os.makedirs(output_dir, exist_ok=True)
+
+    if not typeform_ids:
+        logger.warning("No Typeform IDs given (TYPEFORM_FORM_IDS / --typeform-id): skipping embeds")
+
+    manifest_path = os.path.join(output_dir, SnippetBuildConfig.MANIFEST_NAME)
+    previous = read_manifest(manifest_path)
+
+    generator = PixelCodeGenerator()
+    files = {}
+
+    for name, extension, source in snippet_variants(generator, typeform_ids):
+        content = minify(source).encode('utf-8')
+        sha256 = hashlib.sha256(content).hexdigest()
+        file_name = f'{name}.{sha256[:SnippetBuildConfig.HASH_LENGTH]}.{extension}'
+        file_path = os.path.join(output_dir, file_name)
+
+        # Same name means same bytes: unchanged variants are not rewritten
+        if not os.path.exists(file_path):
+            with atomic_output(file_path) as f:
+                f.write(content)
+
+        files[name] = {
+            'file': file_name,
+            'sha256': sha256,
+            'integrity': 'sha384-' + base64.b64encode(hashlib.sha384(content).digest()).decode('ascii'),
+            'size': len(content),
+            'source_size': len(source.encode('utf-8'))
+        }
+
+    manifest = {
+        'pixel_id': PixelConfig.PIXEL_ID,
+        'built_at': datetime.now().isoformat(),
+        'files': files
+    }
+    with atomic_output(manifest_path) as f:
+        f.write(json.dumps(manifest, indent=2).encode('utf-8'))
+
+    if clean:
+        for file_name in stale_files(previous, manifest):
+            file_path = os.path.join(output_dir, file_name)
+            if os.path.isfile(file_path) and not os.path.islink(file_path):
+                os.remove(file_path)
+                logger.info(f"Removed stale {file_name}")
+
+    total = sum(entry['size'] for entry in files.values())
+    source_total = sum(entry['source_size'] for entry in files.values())
+    logger.info(f"Built {len(files)} snippets in {output_dir} ({source_total} -> {total} bytes)")
+    return manifest
+
+
+def read_manifest(path: str) -> Dict[str, Any]:
+    """Manifest of an earlier build ({'files': {}} if there is none or it is unreadable)"""
+    try:
+        with open(path, 'rb') as f:
+            manifest = json.loads(f.read().decode('utf-8'))
+    except (OSError, ValueError):
+        return {'files': {}}
+    return manifest if isinstance(manifest.get('files'), dict) else {'files': {}}
+
+
+def stale_files(previous: Dict[str, Any], current: Dict[str, Any]) -> List[str]:
+    """
+    Files of the previous build that the current manifest no longer lists
+
+    Only entries named <variant>.<hash>.<ext> after their own manifest key
+    are returned, so a hand-edited manifest cannot point --clean at other
+    files, directories or paths outside the output directory.
+    """
+    keep = {entry['file'] for entry in current['files'].values()}
+    stale = []
+    for name, entry in previous['files'].items():
+        file_name = entry.get('file') if isinstance(entry, dict) else None
+        if not file_name or file_name in keep:
+            continue
+        pattern = rf'{re.escape(name)}\.[0-9a-f]{{{SnippetBuildConfig.HASH_LENGTH}}}\.(html|js)'
+        if re.fullmatch(pattern, file_name):
+            stale.append(file_name)
+    return stale
+
+
+# ==============================================================================
+# CLI INTERFACE
+# ==============================================================================
+
+def main():
+    """Command line interface"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build static, hashed pixel snippet files for the CDN")
+    parser.add_argument("--out", default=SnippetBuildConfig.OUTPUT_DIR, help="Output directory")
+    parser.add_argument("--typeform-id", action="append", dest="typeform_ids",
+                        help="Typeform form ID to build an embed for (repeatable)")
+    parser.add_argument("--clean", action="store_true",
+                        help="Remove files of the previous build that this build no longer lists")
+
+    args = parser.parse_args()
+    manifest = build_snippets(args.out, args.typeform_ids, clean=args.clean)
+    print(json.dumps({name: entry['file'] for name, entry in manifest['files'].items()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
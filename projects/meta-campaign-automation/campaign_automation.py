@@ -20,18 +20,28 @@ Campaign Structure:
 import os
 import json
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, List
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, Optional, List, Iterable
 from dataclasses import dataclass, asdict
 from enum import Enum
 
+import numpy as np
+
 from meta_api_client import (
     MetaApiClient,
+    MetaConfig,
     CampaignObjective,
     OptimizationGoal,
-    MetaApiError
+    MetaApiError,
+    batch_operation,
+    batch_reference,
+    get_action_value
 )
 from pixel_tracking import ConversionAPI, UserData, CustomData
+from insights_store import InsightsStore
+from budget_optimizer import BudgetOptimizer, BudgetOptimizerConfig, MetricArrays
 
 # Configure logging
 logging.basicConfig(
@@ -59,6 +69,9 @@ class CampaignConfig:
     # Special ad categories
     SPECIAL_AD_CATEGORIES = []  # Not employment/housing/credit ads
 
+    # Graph batch requests in flight while provisioning templates
+    PROVISIONING_CONCURRENCY = 2
+
 
 # ==============================================================================
 # AUDIENCE SEGMENTS
@@ -94,6 +107,53 @@ class AudienceDefinition:
     recommended_budget: int  # Daily budget in cents
 
 
+@dataclass(frozen=True)
+class TargetingRecipe:
+    """How to build a segment's targeting spec and which builder attributes it depends on"""
+    method: str
+    args: tuple = ()
+    depends_on: tuple = ()  # e.g. ('pixel_id',) for pixel-based audiences
+
+
+# (name, description, segment, estimated_reach, recommended_budget)
+SEGMENT_DEFINITIONS = [
+    ("HR Directors Netherlands", "Senior HR decision makers in the Netherlands",
+     AudienceSegment.HR_DIRECTORS, "15,000-25,000", 3500),
+    ("HR Managers Netherlands", "HR Managers and HR Business Partners",
+     AudienceSegment.HR_MANAGERS, "40,000-60,000", 2500),
+    ("Operations & COO", "Operations leaders who handle hiring",
+     AudienceSegment.OPERATIONS_COO, "20,000-35,000", 3000),
+    ("Recruitment Agency Owners", "Recruitment bureau owners and directors",
+     AudienceSegment.RECRUITMENT_AGENCIES, "5,000-10,000", 2500),
+    ("SME Business Owners", "Small to medium business owners who do hiring",
+     AudienceSegment.SME_OWNERS, "80,000-120,000", 2500),
+    ("Tech Sector HR", "HR professionals in tech/IT companies",
+     AudienceSegment.TECH_SECTOR, "10,000-18,000", 3000),
+    ("Industry & Manufacturing HR", "HR in industrial and manufacturing sector",
+     AudienceSegment.INDUSTRY_MANUFACTURING, "12,000-20,000", 2500),
+    ("Healthcare HR", "HR professionals in healthcare sector",
+     AudienceSegment.HEALTHCARE, "8,000-15,000", 3000),
+    ("Website Visitors (7 days)", "Recent website visitors for hot retargeting",
+     AudienceSegment.RETARGETING_7D, "500-2,000", 1500),
+    ("Website Visitors (30 days)", "Website visitors for warm retargeting",
+     AudienceSegment.RETARGETING_30D, "1,500-5,000", 2000),
+    ("Website Visitors (60 days)", "Extended retargeting pool",
+     AudienceSegment.RETARGETING_60D, "3,000-10,000", 2000),
+]
+
+
+# Serialized targeting specs shared by all builders:
+# (segment, ((dependency, value), ...)) -> JSON bytes
+_targeting_cache: Dict[tuple, bytes] = {}
+_targeting_cache_lock = threading.Lock()
+
+
+def clear_targeting_cache() -> None:
+    """Drop all cached targeting specs (after editing targeting definitions)"""
+    with _targeting_cache_lock:
+        _targeting_cache.clear()
+
+
 # ==============================================================================
 # AUDIENCE BUILDER
 # ==============================================================================
@@ -102,123 +162,65 @@ class AudienceBuilder:
     """
     Build targeting specifications for different audience segments
 
+    Specs are built lazily, once per segment, and cached as JSON bytes
+    (immutable, shared across builders). The cache key includes the
+    builder attributes a segment declares in its recipe's depends_on, so
+    pixel-based segments are cached per pixel ID.
+
     Usage:
         builder = AudienceBuilder()
         targeting = builder.get_targeting(AudienceSegment.HR_DIRECTORS)
     """
 
+    TARGETING_RECIPES: Dict[AudienceSegment, TargetingRecipe] = {
+        AudienceSegment.HR_DIRECTORS: TargetingRecipe('_hr_directors_targeting'),
+        AudienceSegment.HR_MANAGERS: TargetingRecipe('_hr_managers_targeting'),
+        AudienceSegment.OPERATIONS_COO: TargetingRecipe('_operations_coo_targeting'),
+        AudienceSegment.RECRUITMENT_AGENCIES: TargetingRecipe('_recruitment_agencies_targeting'),
+        AudienceSegment.SME_OWNERS: TargetingRecipe('_sme_owners_targeting'),
+        AudienceSegment.TECH_SECTOR: TargetingRecipe('_tech_sector_targeting'),
+        AudienceSegment.INDUSTRY_MANUFACTURING: TargetingRecipe('_industry_manufacturing_targeting'),
+        AudienceSegment.HEALTHCARE: TargetingRecipe('_healthcare_targeting'),
+        AudienceSegment.RETARGETING_7D: TargetingRecipe('_retargeting_targeting', (7,), ('pixel_id',)),
+        AudienceSegment.RETARGETING_30D: TargetingRecipe('_retargeting_targeting', (30,), ('pixel_id',)),
+        AudienceSegment.RETARGETING_60D: TargetingRecipe('_retargeting_targeting', (60,), ('pixel_id',)),
+    }
+    DEFAULT_RECIPE = TargetingRecipe('_default_targeting')
+
     def __init__(self, pixel_id: str = None):
         self.pixel_id = pixel_id or os.getenv('META_PIXEL_ID', '1443564313411457')
 
     def get_targeting(self, segment: AudienceSegment) -> Dict[str, Any]:
-        """Get targeting specification for a segment"""
-        targeting_map = {
-            AudienceSegment.HR_DIRECTORS: self._hr_directors_targeting(),
-            AudienceSegment.HR_MANAGERS: self._hr_managers_targeting(),
-            AudienceSegment.OPERATIONS_COO: self._operations_coo_targeting(),
-            AudienceSegment.RECRUITMENT_AGENCIES: self._recruitment_agencies_targeting(),
-            AudienceSegment.SME_OWNERS: self._sme_owners_targeting(),
-            AudienceSegment.TECH_SECTOR: self._tech_sector_targeting(),
-            AudienceSegment.INDUSTRY_MANUFACTURING: self._industry_manufacturing_targeting(),
-            AudienceSegment.HEALTHCARE: self._healthcare_targeting(),
-            AudienceSegment.RETARGETING_7D: self._retargeting_targeting(7),
-            AudienceSegment.RETARGETING_30D: self._retargeting_targeting(30),
-            AudienceSegment.RETARGETING_60D: self._retargeting_targeting(60),
-        }
+        """Get targeting specification for a segment (a fresh copy, safe to modify)"""
+        return json.loads(self.get_targeting_json(segment))
+
+    def get_targeting_json(self, segment: AudienceSegment) -> bytes:
+        """Get the cached, serialized targeting specification for a segment"""
+        recipe = self.TARGETING_RECIPES.get(segment, self.DEFAULT_RECIPE)
+        key = (segment, tuple((name, getattr(self, name)) for name in recipe.depends_on))
+
+        cached = _targeting_cache.get(key)
+        if cached is not None:
+            return cached
 
-        return targeting_map.get(segment, self._default_targeting())
+        targeting = getattr(self, recipe.method)(*recipe.args)
+        serialized = json.dumps(targeting, separators=(',', ':')).encode('utf-8')
+
+        with _targeting_cache_lock:
+            return _targeting_cache.setdefault(key, serialized)
 
     def get_all_segments(self) -> List[AudienceDefinition]:
         """Get all pre-defined audience segments with their definitions"""
         return [
             AudienceDefinition(
-                name="HR Directors Netherlands",
-                description="Senior HR decision makers in the Netherlands",
-                segment=AudienceSegment.HR_DIRECTORS,
-                targeting=self._hr_directors_targeting(),
-                estimated_reach="15,000-25,000",
-                recommended_budget=3500
-            ),
-            AudienceDefinition(
-                name="HR Managers Netherlands",
-                description="HR Managers and HR Business Partners",
-                segment=AudienceSegment.HR_MANAGERS,
-                targeting=self._hr_managers_targeting(),
-                estimated_reach="40,000-60,000",
-                recommended_budget=2500
-            ),
-            AudienceDefinition(
-                name="Operations & COO",
-                description="Operations leaders who handle hiring",
-                segment=AudienceSegment.OPERATIONS_COO,
-                targeting=self._operations_coo_targeting(),
-                estimated_reach="20,000-35,000",
-                recommended_budget=3000
-            ),
-            AudienceDefinition(
-                name="Recruitment Agency Owners",
-                description="Recruitment bureau owners and directors",
-                segment=AudienceSegment.RECRUITMENT_AGENCIES,
-                targeting=self._recruitment_agencies_targeting(),
-                estimated_reach="5,000-10,000",
-                recommended_budget=2500
-            ),
-            AudienceDefinition(
-                name="SME Business Owners",
-                description="Small to medium business owners who do hiring",
-                segment=AudienceSegment.SME_OWNERS,
-                targeting=self._sme_owners_targeting(),
-                estimated_reach="80,000-120,000",
-                recommended_budget=2500
-            ),
-            AudienceDefinition(
-                name="Tech Sector HR",
-                description="HR professionals in tech/IT companies",
-                segment=AudienceSegment.TECH_SECTOR,
-                targeting=self._tech_sector_targeting(),
-                estimated_reach="10,000-18,000",
-                recommended_budget=3000
-            ),
-            AudienceDefinition(
-                name="Industry & Manufacturing HR",
-                description="HR in industrial and manufacturing sector",
-                segment=AudienceSegment.INDUSTRY_MANUFACTURING,
-                targeting=self._industry_manufacturing_targeting(),
-                estimated_reach="12,000-20,000",
-                recommended_budget=2500
-            ),
-            AudienceDefinition(
-                name="Healthcare HR",
-                description="HR professionals in healthcare sector",
-                segment=AudienceSegment.HEALTHCARE,
-                targeting=self._healthcare_targeting(),
-                estimated_reach="8,000-15,000",
-                recommended_budget=3000
-            ),
-            AudienceDefinition(
-                name="Website Visitors (7 days)",
-                description="Recent website visitors for hot retargeting",
-                segment=AudienceSegment.RETARGETING_7D,
-                targeting=self._retargeting_targeting(7),
-                estimated_reach="500-2,000",
-                recommended_budget=1500
-            ),
-            AudienceDefinition(
-                name="Website Visitors (30 days)",
-                description="Website visitors for warm retargeting",
-                segment=AudienceSegment.RETARGETING_30D,
-                targeting=self._retargeting_targeting(30),
-                estimated_reach="1,500-5,000",
-                recommended_budget=2000
-            ),
-            AudienceDefinition(
-                name="Website Visitors (60 days)",
-                description="Extended retargeting pool",
-                segment=AudienceSegment.RETARGETING_60D,
-                targeting=self._retargeting_targeting(60),
-                estimated_reach="3,000-10,000",
-                recommended_budget=2000
-            ),
+                name=name,
+                description=description,
+                segment=segment,
+                targeting=self.get_targeting(segment),
+                estimated_reach=estimated_reach,
+                recommended_budget=recommended_budget
+            )
+            for name, description, segment, estimated_reach, recommended_budget in SEGMENT_DEFINITIONS
         ]
 
     # ==========================================================================
@@ -592,8 +594,13 @@ class CampaignAutomationService:
         report = service.get_performance_report()
     """
 
-    def __init__(self, api_client: MetaApiClient = None):
+    def __init__(
+        self,
+        api_client: MetaApiClient = None,
+        insights_store: InsightsStore = None
+    ):
         self.api_client = api_client or MetaApiClient()
+        self.insights_store = insights_store
         self.audience_builder = AudienceBuilder()
         self.conversion_api = ConversionAPI()
 
@@ -605,6 +612,9 @@ class CampaignAutomationService:
         """
         Create a campaign from a template
 
+        The campaign and its ad sets are created in one Graph batch request.
+        If any ad set fails, the objects that were created are deleted again.
+
         Args:
             template: CampaignTemplate to use
             status: Initial campaign status
@@ -612,180 +622,557 @@ class CampaignAutomationService:
         Returns:
             Created campaign data
         """
-        try:
-            # Create campaign
-            campaign = self.api_client.create_campaign(
-                name=template.name,
-                objective=template.objective,
-                status=status,
-                daily_budget=template.daily_budget,
-                special_ad_categories=CampaignConfig.SPECIAL_AD_CATEGORIES
+        result = self.provision_templates([template], status)[0]
+
+        if 'error' in result:
+            logger.error(f"Failed to create campaign: {result['error']}")
+            raise MetaApiError(message=result['error'], code=result.get('error_code'))
+
+        return result
+
+    def create_all_campaigns(
+        self,
+        status: str = 'PAUSED',
+        all_or_nothing: bool = False
+    ) -> List[Dict]:
+        """
+        Create all campaigns from templates
+
+        Args:
+            status: Initial campaign status
+            all_or_nothing: Roll back every template if any template fails
+                            (default: only the failed templates are rolled back)
+        """
+        results = self.provision_templates(
+            CampaignTemplates.get_all_templates(),
+            status,
+            all_or_nothing=all_or_nothing
+        )
+
+        for result in results:
+            if 'error' in result:
+                logger.error(f"Skipping template {result['template']}: {result['error']}")
+
+        return results
+
+    def provision_templates(
+        self,
+        templates: List[CampaignTemplate],
+        status: str = 'PAUSED',
+        all_or_nothing: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Create campaigns and ad sets for several templates with Graph batch requests
+
+        Each template becomes a small dependency graph (campaign -> ad sets):
+        the ad sets reference the campaign ID inside the batch, so a whole
+        template is one round trip and templates are packed together up to
+        BATCH_MAX_SIZE operations. Batches run concurrently (bounded by
+        CampaignConfig.PROVISIONING_CONCURRENCY).
+
+        A template is atomic: if one of its operations fails, everything it
+        created is deleted again and the result carries 'error' and
+        'rolled_back'.
+
+        Returns:
+            One result per template, in template order
+        """
+        plans = [self._template_operations(template, status, index) for index, template in enumerate(templates)]
+
+        chunks, chunk, chunk_size = [], [], 0
+        for plan in plans:
+            if chunk and chunk_size + len(plan) > MetaConfig.BATCH_MAX_SIZE:
+                chunks.append(chunk)
+                chunk, chunk_size = [], 0
+            chunk.append(plan)
+            chunk_size += len(plan)
+        if chunk:
+            chunks.append(chunk)
+
+        with ThreadPoolExecutor(max_workers=CampaignConfig.PROVISIONING_CONCURRENCY) as executor:
+            chunk_results = list(executor.map(self._run_provisioning_batch, chunks))
+
+        results = [
+            self._template_result(template, plan, plan_results)
+            for template, plan, plan_results in zip(
+                templates,
+                plans,
+                (plan_results for chunk_result in chunk_results for plan_results in chunk_result)
             )
+        ]
 
-            campaign_id = campaign.get('id')
-            logger.info(f"Created campaign: {campaign_id} ({template.name})")
-
-            # Create ad sets for each audience segment
-            ad_sets = []
-            for segment in template.audience_segments:
-                targeting = self.audience_builder.get_targeting(segment)
-
-                ad_set = self.api_client.create_ad_set(
-                    name=f"{template.name} - {segment.value}",
-                    campaign_id=campaign_id,
-                    daily_budget=template.daily_budget // len(template.audience_segments),
-                    targeting=targeting,
-                    optimization_goal=template.optimization_goal,
-                    status=status
-                )
+        failed = [result for result in results if 'error' in result]
+        if all_or_nothing and failed:
+            error = f"{len(failed)} of {len(results)} templates failed"
+            results = [
+                result if 'error' in result else {
+                    'template': result['template'],
+                    'error': error,
+                    'rolled_back': self._rollback(
+                        [result['campaign']['id']] + [ad_set['id'] for ad_set in result['ad_sets']]
+                    )
+                }
+                for result in results
+            ]
+
+        return results
+
+    def _template_operations(
+        self,
+        template: CampaignTemplate,
+        status: str,
+        index: int
+    ) -> List[Dict[str, Any]]:
+        """Batch operations for one template: campaign first, then its ad sets"""
+        campaign_name = f'campaign_{index}'
+
+        operations = [self.api_client.create_campaign_request(
+            batch_name=campaign_name,
+            name=template.name,
+            objective=template.objective,
+            status=status,
+            daily_budget=template.daily_budget,
+            special_ad_categories=CampaignConfig.SPECIAL_AD_CATEGORIES
+        )]
+
+        for segment in template.audience_segments:
+            operations.append(self.api_client.create_ad_set_request(
+                name=f"{template.name} - {segment.value}",
+                campaign_id=batch_reference(campaign_name),
+                daily_budget=template.daily_budget // len(template.audience_segments),
+                targeting=self.audience_builder.get_targeting(segment),
+                optimization_goal=template.optimization_goal,
+                status=status
+            ))
+
+        return operations
+
+    def _run_provisioning_batch(
+        self,
+        plans: List[List[Dict[str, Any]]]
+    ) -> List[List[Dict[str, Any]]]:
+        """Run the operations of several templates in one batch, split results per template"""
+        operations = [operation for plan in plans for operation in plan]
 
-                ad_sets.append(ad_set)
-                logger.info(f"Created ad set: {ad_set.get('id')}")
+        try:
+            results = self.api_client.batch(operations)
+        except MetaApiError as e:
+            # Whole batch rejected (token, rate limit, ...): nothing was created
+            results = [{'error': {'message': e.message, 'code': e.code}}] * len(operations)
+
+        split, offset = [], 0
+        for plan in plans:
+            split.append(results[offset:offset + len(plan)])
+            offset += len(plan)
 
+        return split
+
+    def _template_result(
+        self,
+        template: CampaignTemplate,
+        plan: List[Dict[str, Any]],
+        results: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Turn batch results into a template result, rolling back partial failures"""
+        errors = [result['error'] for result in results if 'error' in result]
+
+        if not errors:
+            campaign, ad_sets = results[0], results[1:]
+            logger.info(f"Created campaign: {campaign.get('id')} ({template.name}) with {len(ad_sets)} ad sets")
             return {
                 'campaign': campaign,
                 'ad_sets': ad_sets,
                 'template': template.name
             }
 
-        except MetaApiError as e:
-            logger.error(f"Failed to create campaign: {e.message}")
-            raise
+        created = [result['id'] for result in results if 'id' in result]
+        logger.error(
+            f"Provisioning {template.name} failed ({errors[0].get('message')}), "
+            f"rolling back {len(created)} objects"
+        )
+
+        return {
+            'template': template.name,
+            'error': errors[0].get('message'),
+            'error_code': errors[0].get('code'),
+            'rolled_back': self._rollback(created)
+        }
+
+    def _rollback(self, object_ids: List[str]) -> List[str]:
+        """Delete created objects (children before parents), return the deleted IDs"""
+        if not object_ids:
+            return []
 
-    def create_all_campaigns(self, status: str = 'PAUSED') -> List[Dict]:
-        """Create all campaigns from templates"""
-        results = []
+        # Ad sets were created after their campaign, so delete in reverse order
+        object_ids = list(reversed(object_ids))
+        deleted = []
 
-        for template in CampaignTemplates.get_all_templates():
+        for offset in range(0, len(object_ids), MetaConfig.BATCH_MAX_SIZE):
+            chunk = object_ids[offset:offset + MetaConfig.BATCH_MAX_SIZE]
             try:
-                result = self.create_campaign_from_template(template, status)
-                results.append(result)
+                results = self.api_client.batch([batch_operation('DELETE', object_id) for object_id in chunk])
             except MetaApiError as e:
-                logger.error(f"Skipping template {template.name}: {e.message}")
-                results.append({
-                    'template': template.name,
-                    'error': e.message
-                })
+                logger.error(f"Rollback failed, delete manually: {chunk} ({e.message})")
+                continue
 
-        return results
+            for object_id, result in zip(chunk, results):
+                if 'error' in result:
+                    logger.error(f"Rollback of {object_id} failed: {result['error'].get('message')}")
+                else:
+                    deleted.append(object_id)
+
+        return deleted
 
-    def get_performance_report(self, days: int = 7) -> Dict[str, Any]:
+    def get_performance_report(
+        self,
+        days: int = 7,
+        breakdowns: List[str] = None,
+        use_store: bool = True
+    ) -> Dict[str, Any]:
         """
         Get performance report for all campaigns
 
+        Read from the local insights store when it has been synced (no
+        Graph API calls). Otherwise built from a single account-level
+        insights query (level=campaign) plus one campaign listing for status.
+
         Args:
             days: Number of days to report on
+            breakdowns: Optional insights breakdowns (age, gender, publisher_platform, ...)
+            use_store: Set to False to bypass the insights store and query Meta live
+
+        Raises:
+            InsightsReportPending: Long live ranges on an interactive client
+                (finish with get_performance_report_job)
         """
         try:
-            campaigns = self.api_client.get_campaigns()
-
-            report = {
-                'period': f'last_{days}d',
-                'generated_at': datetime.now().isoformat(),
-                'campaigns': [],
-                'totals': {
-                    'spend': 0,
-                    'impressions': 0,
-                    'clicks': 0,
-                    'leads': 0
-                }
+            date_preset = f'last_{days}d'
+
+            if use_store and self.insights_store and not breakdowns and self.insights_store.has_data():
+                # Same window as Meta's last_Nd preset: N days ending yesterday
+                until = date.today() - timedelta(days=1)
+                since = until - timedelta(days=days - 1)
+                report = self._build_report(
+                    date_preset,
+                    self.insights_store.campaign_totals(since, until),
+                    campaigns=self.insights_store.get_campaigns()
+                )
+                report['source'] = 'insights_store'
+                report['last_sync'] = self.insights_store.get_last_sync()
+                return report
+            rows = self.api_client.iter_account_insights(
+                level='campaign',
+                date_preset=date_preset,
+                breakdowns=breakdowns
+            )
+            return self._build_report(date_preset, rows, breakdowns)
+
+        except MetaApiError as e:
+            logger.error(f"Failed to generate report: {e.message}")
+            return {'error': e.message}
+
+    def submit_performance_report(
+        self,
+        days: int = None,
+        time_range: Dict[str, str] = None,
+        breakdowns: List[str] = None
+    ) -> str:
+        """
+        Submit the performance report as an async insights job
+
+        Returns immediately with a report_run_id so long ranges don't block
+        the caller; poll with get_performance_report_job.
+
+        Args:
+            days: Number of days to report on (ignored when time_range is set)
+            time_range: Custom range {'since': 'YYYY-MM-DD', 'until': 'YYYY-MM-DD'}
+            breakdowns: Optional insights breakdowns
+        """
+        return self.api_client.submit_account_insights_report(
+            level='campaign',
+            date_preset=f'last_{days or 7}d',
+            breakdowns=breakdowns,
+            time_range=time_range
+        )
+
+    def get_performance_report_job(
+        self,
+        report_run_id: str,
+        breakdowns: List[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Check an async performance report and build it once the job completes
+
+        Returns:
+            {'status': ..., 'percent_complete': ...} plus 'report' when done
+        """
+        status = self.api_client.get_insights_report_status(report_run_id)
+        async_status = status.get('async_status')
+
+        result = {
+            'report_run_id': report_run_id,
+            'status': async_status,
+            'percent_complete': status.get('async_percent_completion', 0)
+        }
+
+        if async_status == 'Job Completed':
+            period = f"{status.get('date_start')}..{status.get('date_stop')}"
+            rows = self.api_client.iter_insights_report(report_run_id)
+            result['report'] = self._build_report(period, rows, breakdowns)
+
+        return result
+
+    def _build_report(
+        self,
+        period: str,
+        rows: Iterable[Dict[str, Any]],
+        breakdowns: List[str] = None,
+        campaigns: Dict[str, Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Aggregate campaign-level insights rows into a performance report"""
+        report = {
+            'period': period,
+            'generated_at': datetime.now().isoformat(),
+            'campaigns': [],
+            'totals': {
+                'spend': 0,
+                'impressions': 0,
+                'clicks': 0,
+                'leads': 0
             }
+        }
+
+        if breakdowns:
+            report['breakdowns'] = breakdowns
 
-            for campaign in campaigns:
-                insights = self.api_client.get_campaign_insights(
-                    campaign['id'],
-                    date_preset=f'last_{days}d'
+        if campaigns is None:
+            campaigns = {
+                campaign['id']: campaign
+                for campaign in self.api_client.iter_campaigns(
+                    fields=['id', 'name', 'status']
                 )
+            }
+
+        campaign_rows: Dict[str, Dict[str, Any]] = {}
+
+        for row in rows:
+            campaign_id = row.get('campaign_id')
+            metrics = self._metrics_from_insights(row)
 
+            campaign_data = campaign_rows.get(campaign_id)
+            if campaign_data is None:
+                campaign = campaigns.get(campaign_id, {})
                 campaign_data = {
-                    'id': campaign['id'],
-                    'name': campaign['name'],
-                    'status': campaign['status'],
-                    'spend': float(insights.get('spend', 0)),
-                    'impressions': int(insights.get('impressions', 0)),
-                    'clicks': int(insights.get('clicks', 0)),
-                    'cpc': float(insights.get('cpc', 0)),
-                    'cpm': float(insights.get('cpm', 0)),
-                    'ctr': float(insights.get('ctr', 0))
+                    'id': campaign_id,
+                    'name': campaign.get('name', row.get('campaign_name')),
+                    'status': campaign.get('status'),
+                    'spend': 0.0,
+                    'impressions': 0,
+                    'clicks': 0,
+                    'leads': 0
+                }
+                if breakdowns:
+                    campaign_data['breakdowns'] = []
+                campaign_rows[campaign_id] = campaign_data
+
+            for key in ('spend', 'impressions', 'clicks', 'leads'):
+                campaign_data[key] += metrics[key]
+
+            if breakdowns:
+                breakdown_data = {key: row.get(key) for key in breakdowns}
+                breakdown_data.update(metrics)
+                campaign_data['breakdowns'].append(breakdown_data)
+
+        # Campaigns without delivery in the period have no insights rows
+        for campaign_id, campaign in campaigns.items():
+            if campaign_id not in campaign_rows:
+                campaign_rows[campaign_id] = {
+                    'id': campaign_id,
+                    'name': campaign.get('name'),
+                    'status': campaign.get('status'),
+                    'spend': 0.0,
+                    'impressions': 0,
+                    'clicks': 0,
+                    'leads': 0
                 }
 
-                # Extract leads from actions
-                actions = insights.get('actions', [])
-                leads = next(
-                    (a.get('value', 0) for a in actions if a.get('action_type') == 'lead'),
-                    0
-                )
-                campaign_data['leads'] = int(leads)
+        for campaign_data in campaign_rows.values():
+            self._add_derived_metrics(campaign_data)
+            report['campaigns'].append(campaign_data)
 
-                report['campaigns'].append(campaign_data)
+            # Update totals
+            report['totals']['spend'] += campaign_data['spend']
+            report['totals']['impressions'] += campaign_data['impressions']
+            report['totals']['clicks'] += campaign_data['clicks']
+            report['totals']['leads'] += campaign_data['leads']
 
-                # Update totals
-                report['totals']['spend'] += campaign_data['spend']
-                report['totals']['impressions'] += campaign_data['impressions']
-                report['totals']['clicks'] += campaign_data['clicks']
-                report['totals']['leads'] += campaign_data['leads']
+        # Calculate overall metrics
+        if report['totals']['clicks'] > 0:
+            report['totals']['cpc'] = report['totals']['spend'] / report['totals']['clicks']
+        if report['totals']['impressions'] > 0:
+            report['totals']['cpm'] = (report['totals']['spend'] / report['totals']['impressions']) * 1000
+            report['totals']['ctr'] = (report['totals']['clicks'] / report['totals']['impressions']) * 100
+        if report['totals']['leads'] > 0:
+            report['totals']['cpl'] = report['totals']['spend'] / report['totals']['leads']
 
-            # Calculate overall metrics
-            if report['totals']['clicks'] > 0:
-                report['totals']['cpc'] = report['totals']['spend'] / report['totals']['clicks']
-            if report['totals']['impressions'] > 0:
-                report['totals']['cpm'] = (report['totals']['spend'] / report['totals']['impressions']) * 1000
-                report['totals']['ctr'] = (report['totals']['clicks'] / report['totals']['impressions']) * 100
-            if report['totals']['leads'] > 0:
-                report['totals']['cpl'] = report['totals']['spend'] / report['totals']['leads']
+        return report
 
-            return report
+    @staticmethod
+    def _metrics_from_insights(row: Dict[str, Any]) -> Dict[str, Any]:
+        """Extract additive metrics (spend, impressions, clicks, leads) from an insights row"""
+        if 'leads' in row:
+            # Rows from the insights store carry pre-extracted leads
+            leads = int(row['leads'] or 0)
+        else:
+            leads = get_action_value(row.get('actions', []), 'lead')
+
+        metrics = {
+            'spend': float(row.get('spend') or 0),
+            'impressions': int(row.get('impressions') or 0),
+            'clicks': int(row.get('clicks') or 0),
+            'leads': leads
+        }
+        CampaignAutomationService._add_derived_metrics(metrics)
+        return metrics
 
-        except MetaApiError as e:
-            logger.error(f"Failed to generate report: {e.message}")
-            return {'error': e.message}
+    @staticmethod
+    def _add_derived_metrics(data: Dict[str, Any]) -> None:
+        """Compute CPC, CPM and CTR in place from additive metrics"""
+        data['cpc'] = data['spend'] / data['clicks'] if data['clicks'] else 0.0
+        data['cpm'] = data['spend'] / data['impressions'] * 1000 if data['impressions'] else 0.0
+        data['ctr'] = data['clicks'] / data['impressions'] * 100 if data['impressions'] else 0.0
 
-    def optimize_budgets(self, target_cpl: float = 25.0) -> Dict[str, Any]:
+    def optimize_budgets(
+        self,
+        target_cpl: float = 25.0,
+        total_budget: float = None,
+        days: int = None,
+        report_run_id: str = None
+    ) -> Dict[str, Any]:
         """
         Optimize campaign budgets based on performance
 
+        Daily metrics of all campaigns are analyzed at once by the NumPy
+        budget optimizer (CPL with confidence interval, lead-rate trend,
+        marginal CPL) and the total daily budget of active campaigns with
+        a campaign budget is redistributed to maximize expected leads.
+
         Args:
             target_cpl: Target cost per lead in EUR
+            total_budget: Total daily budget in EUR to distribute
+                          (default: current total, i.e. rebalance only)
+            days: Lookback window in days (default: OPTIMIZER_LOOKBACK_DAYS)
+            report_run_id: Completed report run with the daily metrics, for
+                           windows that InsightsReportPending handed out
+
+        Raises:
+            InsightsReportPending: The window needs an async report run (no
+                synced store, long lookback on an interactive client)
         """
-        report = self.get_performance_report(7)
+        days = days or BudgetOptimizerConfig.LOOKBACK_DAYS
+
+        if self.insights_store and self.insights_store.has_data():
+            # Budgets and statuses as of the last sync, no Graph call
+            campaigns = self.insights_store.get_campaigns()
+        else:
+            campaigns = {
+                campaign['id']: campaign
+                for campaign in self.api_client.iter_campaigns(
+                    fields=['id', 'name', 'status', 'daily_budget']
+                )
+            }
+        metrics = MetricArrays.from_daily_rows(self._daily_campaign_metrics(days, report_run_id))
+
+        # Meta budgets are in cents; campaigns without one use ad set budgets
+        current_budgets = np.array([
+            float(campaigns.get(campaign_id, {}).get('daily_budget') or 'nan') / 100
+            for campaign_id in metrics.ids
+        ])
+        allocatable = np.array([
+            campaigns.get(campaign_id, {}).get('status') == 'ACTIVE'
+            for campaign_id in metrics.ids
+        ], dtype=bool)
+
+        plan = BudgetOptimizer().optimize(
+            metrics,
+            current_budgets,
+            total_budget=total_budget,
+            allocatable=allocatable
+        )
+        allocation = plan.to_records()
+
+        # Classify all campaigns at once against the CPL thresholds
+        actions = np.select(
+            [
+                (plan.leads > 0) & (plan.cpl < target_cpl * 0.8),
+                (plan.leads > 0) & (plan.cpl > target_cpl * 1.5),
+                (plan.leads == 0) & (plan.spend > 50)
+            ],
+            ['INCREASE_BUDGET', 'DECREASE_BUDGET', 'REVIEW_TARGETING'],
+            default=''
+        )
+
         recommendations = []
+        for i in np.flatnonzero(actions):
+            record = allocation[i]
+            recommendation = {
+                'campaign_id': record['id'],
+                'campaign_name': campaigns.get(record['id'], {}).get('name', record['name']),
+                'action': str(actions[i])
+            }
 
-        for campaign in report.get('campaigns', []):
-            if campaign.get('leads', 0) > 0:
-                cpl = campaign['spend'] / campaign['leads']
-
-                if cpl < target_cpl * 0.8:
-                    # Performing well, increase budget
-                    recommendations.append({
-                        'campaign_id': campaign['id'],
-                        'campaign_name': campaign['name'],
-                        'action': 'INCREASE_BUDGET',
-                        'reason': f'CPL ({cpl:.2f}€) below target ({target_cpl}€)',
-                        'current_cpl': cpl
-                    })
-                elif cpl > target_cpl * 1.5:
-                    # Underperforming, decrease budget
-                    recommendations.append({
-                        'campaign_id': campaign['id'],
-                        'campaign_name': campaign['name'],
-                        'action': 'DECREASE_BUDGET',
-                        'reason': f'CPL ({cpl:.2f}€) above target ({target_cpl}€)',
-                        'current_cpl': cpl
-                    })
-            elif campaign['spend'] > 50 and campaign['leads'] == 0:
-                # Spending without leads
-                recommendations.append({
-                    'campaign_id': campaign['id'],
-                    'campaign_name': campaign['name'],
-                    'action': 'REVIEW_TARGETING',
-                    'reason': f'Spent {campaign["spend"]:.2f}€ with 0 leads'
-                })
+            if actions[i] == 'REVIEW_TARGETING':
+                recommendation['reason'] = f'Spent {plan.spend[i]:.2f}€ with 0 leads'
+            else:
+                direction = 'below' if actions[i] == 'INCREASE_BUDGET' else 'above'
+                recommendation['reason'] = f'CPL ({plan.cpl[i]:.2f}€) {direction} target ({target_cpl}€)'
+                recommendation['current_cpl'] = float(plan.cpl[i])
+                recommendation['cpl_confidence_interval'] = record['cpl_confidence_interval']
+
+            recommendation['recommended_daily_budget'] = record['recommended_daily_budget']
+            recommendations.append(recommendation)
+
+        known = np.isfinite(plan.recommended_budget)
 
         return {
             'target_cpl': target_cpl,
-            'recommendations': recommendations
+            'lookback_days': days,
+            'total_budget': round(float(plan.recommended_budget[known & allocatable].sum()), 2),
+            'expected_daily_leads': {
+                'current': round(plan.expected_leads_current, 2),
+                'recommended': round(plan.expected_leads_recommended, 2)
+            },
+            'recommendations': recommendations,
+            'allocation': allocation
         }
 
+    def _daily_campaign_metrics(self, days: int, report_run_id: str = None) -> List[Dict[str, Any]]:
+        """Daily per-campaign metrics for the last N days (store, report run or live insights)"""
+        until = date.today() - timedelta(days=1)
+        since = until - timedelta(days=days - 1)
+
+        if report_run_id:
+            rows = self.api_client.completed_insights_report(report_run_id)
+        elif self.insights_store and self.insights_store.has_data():
+            return self.insights_store.campaign_daily(since, until)
+        else:
+            rows = self.api_client.iter_account_insights(
+                level='campaign',
+                fields=['campaign_id', 'campaign_name', 'spend', 'impressions', 'clicks', 'actions'],
+                time_range={'since': since.isoformat(), 'until': until.isoformat()},
+                time_increment=1
+            )
+
+        return [
+            dict(
+                self._metrics_from_insights(row),
+                campaign_id=row.get('campaign_id'),
+                campaign_name=row.get('campaign_name'),
+                date=row.get('date_start')
+            )
+            for row in rows
+        ]
+
 
 # ==============================================================================
 # MAIN (for testing)
@@ -5,9 +5,10 @@ COMPLETE META CAMPAIGN AUTOMATION FLOW
 Volledige pipeline: Leonardo AI → Canva → Facebook/Instagram/LinkedIn
 
 Flow:
-1. Genereer images via Leonardo AI (MCP server of direct API)
-2. Upload naar Canva en voeg tekst/branding toe
-3. Publiceer naar Meta (Facebook/Instagram) via Ads API
+1. Genereer images via Leonardo AI (MCP server of direct API), één master per campagne
+2. Snijd per platform het juiste formaat uit de master (lokaal, Pillow)
+3. Upload naar Canva en voeg tekst/branding toe
+4. Publiceer naar Meta (Facebook/Instagram) via Ads API
 
 Dependencies:
 - LEONARDO_API_KEY: Leonardo AI API key
@@ -19,17 +20,24 @@ Dependencies:
 
 import os
 import json
-import time
 import asyncio
 import logging
 import hashlib
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from dataclasses import dataclass, asdict
 from enum import Enum
 import requests
 import httpx
 
+from asset_store import AssetStore
+from generation_cache import GenerationCache, generation_key
+from image_variants import (
+    VariantSpec, submit_variants, master_size, generation_size, upscale_factor, image_size
+)
+from generation_poller import get_generation_poller, GenerationFailedError
+from streaming_io import CHUNK_SIZE, MultipartFileReader, aiter_file, atomic_output
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -63,6 +71,11 @@ class Config:
     # Output
     OUTPUT_DIR = os.getenv('IMAGE_OUTPUT_DIR', './generated_campaigns')
 
+    # Campaign flows run concurrently by run_all_campaigns, and the
+    # connection limit of the HTTP client they share
+    MAX_CONCURRENT_FLOWS = int(os.getenv('FLOW_MAX_CONCURRENCY', '4'))
+    HTTP_MAX_CONNECTIONS = 20
+
 
 class Platform(Enum):
     """Target platforms"""
@@ -147,13 +160,21 @@ NEGATIVE_PROMPT = "blur, blurry, low quality, pixelated, cartoon, animated, text
 # ==============================================================================
 
 class LeonardoClient:
-    """Leonardo AI API Client"""
+    """Leonardo AI API Client (async, on the flow's shared httpx client)"""
+
+    MODEL_IDS = {
+        "lucid_origin": "7b592283-e8a7-4c5a-9ba6-d18c31f258b9",
+        "phoenix": "de7d3faf-762f-48e0-b3b7-9d0ac3a3fcf3",
+        "lucid_realism": "05ce0082-2d80-4a2d-8653-4d1c85e2418e",
+    }
 
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, http: httpx.AsyncClient = None):
         self.api_key = api_key or Config.LEONARDO_API_KEY
         if not self.api_key:
             raise ValueError("LEONARDO_API_KEY is required")
 
+        self.http = http or httpx.AsyncClient(timeout=60.0)
+
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
@@ -168,16 +189,10 @@ class LeonardoClient:
         max_wait: int = 120
     ) -> Dict[str, Any]:
         """Generate image and wait for completion"""
-        model_ids = {
-            "lucid_origin": "7b592283-e8a7-4c5a-9ba6-d18c31f258b9",
-            "phoenix": "de7d3faf-762f-48e0-b3b7-9d0ac3a3fcf3",
-            "lucid_realism": "05ce0082-2d80-4a2d-8653-4d1c85e2418e",
-        }
-
         payload = {
             "prompt": prompt,
             "negative_prompt": NEGATIVE_PROMPT,
-            "modelId": model_ids.get(model, model),
+            "modelId": self.MODEL_IDS.get(model, model),
             "width": width,
             "height": height,
             "num_images": 4,
@@ -185,59 +200,108 @@ class LeonardoClient:
             "enhancePrompt": True,
         }
 
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            # Start generation
-            response = await client.post(
-                f"{Config.LEONARDO_BASE_URL}/generations",
-                headers=self.headers,
-                json=payload
-            )
-            response.raise_for_status()
-            result = response.json()
-
-            generation_id = result.get("sdGenerationJob", {}).get("generationId")
-            if not generation_id:
-                return {"error": "No generation ID returned"}
+        # Start generation
+        response = await self.http.post(
+            f"{Config.LEONARDO_BASE_URL}/generations",
+            headers=self.headers,
+            json=payload
+        )
+        response.raise_for_status()
+        result = response.json()
 
-            logger.info(f"Leonardo generation started: {generation_id}")
+        generation_id = result.get("sdGenerationJob", {}).get("generationId")
+        if not generation_id:
+            return {"error": "No generation ID returned"}
 
-            # Poll for completion
-            start_time = time.time()
-            while time.time() - start_time < max_wait:
-                status_response = await client.get(
-                    f"{Config.LEONARDO_BASE_URL}/generations/{generation_id}",
-                    headers=self.headers
-                )
-                status_data = status_response.json()
-                status = status_data.get("generations_by_pk", {}).get("status")
-
-                if status == "COMPLETE":
-                    images = status_data.get("generations_by_pk", {}).get("generated_images", [])
-                    return {
-                        "success": True,
-                        "generation_id": generation_id,
-                        "images": [img.get("url") for img in images],
-                        "status": "COMPLETE"
-                    }
-                elif status == "FAILED":
-                    return {"error": "Generation failed", "generation_id": generation_id}
-
-                await asyncio.sleep(3)
+        logger.info(f"Leonardo generation started: {generation_id}")
 
+        # Wait on the shared poller instead of a per-generation sleep loop
+        future = get_generation_poller().track(generation_id, self.get_generation_status, max_wait)
+        try:
+            images = await asyncio.wrap_future(future)
+        except GenerationFailedError:
+            return {"error": "Generation failed", "generation_id": generation_id}
+        except TimeoutError:
             return {"error": f"Timeout after {max_wait}s", "generation_id": generation_id}
 
+        return {
+            "success": True,
+            "generation_id": generation_id,
+            "images": [img.get("url") for img in images],
+            "image_ids": [img.get("id") for img in images],
+            "status": "COMPLETE"
+        }
+
+    async def upscale_and_wait(self, image_id: str, factor: float, max_wait: int = 300) -> str:
+        """
+        Upscale a generated image with Leonardo's universal upscaler
+
+        Args:
+            image_id: Generated image ID (image_ids of generate_and_wait)
+            factor: Upscale multiplier (Leonardo accepts 1.0-2.0)
+
+        Returns:
+            URL of the upscaled image
+        """
+        response = await self.http.post(
+            f"{Config.LEONARDO_BASE_URL}/variations/universal-upscaler",
+            headers=self.headers,
+            json={
+                "generatedImageId": image_id,
+                "upscaleMultiplier": round(min(max(factor, 1.0), 2.0), 2),
+                "ultraUpscaleStyle": "REALISTIC"
+            }
+        )
+        response.raise_for_status()
+
+        variation_id = response.json().get("universalUpscaler", {}).get("id")
+        logger.info(f"Leonardo upscale started: {variation_id} (x{factor:.2f})")
+
+        future = get_generation_poller().track(variation_id, self.get_variation_status, max_wait)
+        images = await asyncio.wrap_future(future)
+        return images[0]["url"]
+
+    def get_variation_status(self, variation_id: str) -> Tuple[str, List[Dict]]:
+        """Check an upscale once; called from the generation poller thread"""
+        response = requests.get(
+            f"{Config.LEONARDO_BASE_URL}/variations/{variation_id}",
+            headers=self.headers,
+            timeout=30
+        )
+        response.raise_for_status()
+
+        variations = response.json().get("generated_image_variation_generic", [])
+        status = variations[0].get("status") if variations else None
+        images = [v for v in variations if v.get("url")] if status == "COMPLETE" else []
+
+        return status, images
+
+    def get_generation_status(self, generation_id: str) -> Tuple[str, List[Dict]]:
+        """Check a generation once; called from the generation poller thread"""
+        response = requests.get(
+            f"{Config.LEONARDO_BASE_URL}/generations/{generation_id}",
+            headers=self.headers,
+            timeout=30
+        )
+        response.raise_for_status()
+
+        generation = response.json().get("generations_by_pk", {})
+        status = generation.get("status")
+        images = generation.get("generated_images", []) if status == "COMPLETE" else []
+
+        return status, images
+
     async def download_image(self, url: str, output_path: str) -> str:
-        """Download image to local file"""
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.get(url)
+        """Download image to local file (streamed in chunks)"""
+        async with self.http.stream("GET", url) as response:
             response.raise_for_status()
 
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            with open(output_path, 'wb') as f:
-                f.write(response.content)
+            with atomic_output(output_path) as f:
+                async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                    f.write(chunk)
 
-            logger.info(f"Image downloaded: {output_path}")
-            return output_path
+        logger.info(f"Image downloaded: {output_path}")
+        return output_path
 
 
 # ==============================================================================
@@ -245,23 +309,24 @@ class LeonardoClient:
 # ==============================================================================
 
 class CanvaClient:
-    """Canva API Client for design creation and asset upload"""
+    """Canva API Client for design creation and asset upload (async)"""
 
-    def __init__(self, access_token: str = None):
+    def __init__(self, access_token: str = None, http: httpx.AsyncClient = None):
         self.access_token = access_token or Config.CANVA_ACCESS_TOKEN
         self.headers = {
             "Authorization": f"Bearer {self.access_token}",
             "Content-Type": "application/json"
         } if self.access_token else {}
+        self.http = http or httpx.AsyncClient(timeout=60.0)
 
-    def upload_asset(self, file_path: str, name: str) -> Optional[str]:
+    async def upload_asset(self, file_path: str, name: str) -> Optional[str]:
         """Upload image to Canva as asset"""
         if not self.access_token:
             logger.warning("Canva access token not configured")
             return None
 
         # Get upload URL
-        response = requests.post(
+        response = await self.http.post(
             f"{Config.CANVA_BASE_URL}/assets",
             headers=self.headers,
             json={"name": name}
@@ -275,13 +340,15 @@ class CanvaClient:
         upload_url = upload_data.get("upload_url")
         asset_id = upload_data.get("id")
 
-        # Upload file
-        with open(file_path, 'rb') as f:
-            upload_response = requests.put(
-                upload_url,
-                data=f.read(),
-                headers={"Content-Type": "image/png"}
-            )
+        # Upload file (streamed from disk)
+        upload_response = await self.http.put(
+            upload_url,
+            content=aiter_file(file_path),
+            headers={
+                "Content-Type": "image/png",
+                "Content-Length": str(os.path.getsize(file_path))
+            }
+        )
 
         if upload_response.status_code in [200, 201]:
             logger.info(f"Uploaded to Canva: {asset_id}")
@@ -289,7 +356,7 @@ class CanvaClient:
 
         return None
 
-    def create_design_with_text(
+    async def create_design_with_text(
         self,
         asset_id: str,
         headline: str,
@@ -312,25 +379,31 @@ class CanvaClient:
 # ==============================================================================
 
 class MetaAdsClient:
-    """Meta Ads API Client for campaign creation"""
+    """Meta Ads API Client for campaign creation (async)"""
 
-    def __init__(self, access_token: str = None, ad_account_id: str = None):
+    def __init__(
+        self,
+        access_token: str = None,
+        ad_account_id: str = None,
+        http: httpx.AsyncClient = None
+    ):
         self.access_token = access_token or Config.META_ACCESS_TOKEN
         self.ad_account_id = ad_account_id or Config.META_AD_ACCOUNT_ID
         self.page_id = Config.META_PAGE_ID
+        self.http = http or httpx.AsyncClient(timeout=60.0)
 
         if not self.access_token:
             logger.warning("META_ACCESS_TOKEN not configured")
 
-    def _request(self, method: str, endpoint: str, data: Dict = None) -> Dict:
+    async def _request(self, method: str, endpoint: str, data: Dict = None) -> Dict:
         """Make authenticated request to Meta API"""
         url = f"{Config.META_BASE_URL}/{endpoint}"
         params = {"access_token": self.access_token}
 
         if method == "GET":
-            response = requests.get(url, params=params, timeout=30)
+            response = await self.http.get(url, params=params, timeout=30)
         elif method == "POST":
-            response = requests.post(url, params=params, json=data, timeout=30)
+            response = await self.http.post(url, params=params, json=data, timeout=30)
         else:
             raise ValueError(f"Unsupported method: {method}")
 
@@ -339,19 +412,23 @@ class MetaAdsClient:
             logger.error(f"Meta API error: {result['error']}")
         return result
 
-    def upload_image(self, image_path: str) -> Optional[str]:
+    async def upload_image(self, image_path: str) -> Optional[str]:
         """Upload image to Meta ad account"""
         if not self.access_token or not self.ad_account_id:
             return None
 
         url = f"{Config.META_BASE_URL}/{self.ad_account_id}/adimages"
 
-        with open(image_path, 'rb') as f:
-            files = {'filename': f}
-            response = requests.post(
+        # Stream the multipart body from disk instead of buffering it (files=)
+        with MultipartFileReader('filename', image_path, content_type='image/png') as body:
+            response = await self.http.post(
                 url,
                 params={"access_token": self.access_token},
-                files=files,
+                content=body,
+                headers={
+                    "Content-Type": body.content_type,
+                    "Content-Length": str(len(body))
+                },
                 timeout=120
             )
 
@@ -364,7 +441,7 @@ class MetaAdsClient:
         logger.error(f"Meta image upload failed: {result}")
         return None
 
-    def create_campaign(
+    async def create_campaign(
         self,
         name: str,
         objective: AdObjective = AdObjective.LEADS,
@@ -382,13 +459,13 @@ class MetaAdsClient:
             "special_ad_categories": []
         }
 
-        result = self._request("POST", f"{self.ad_account_id}/campaigns", data)
+        result = await self._request("POST", f"{self.ad_account_id}/campaigns", data)
         campaign_id = result.get("id")
         if campaign_id:
             logger.info(f"Campaign created: {campaign_id}")
         return campaign_id
 
-    def create_adset(
+    async def create_adset(
         self,
         campaign_id: str,
         name: str,
@@ -411,10 +488,10 @@ class MetaAdsClient:
             "status": status
         }
 
-        result = self._request("POST", f"{self.ad_account_id}/adsets", data)
+        result = await self._request("POST", f"{self.ad_account_id}/adsets", data)
         return result.get("id")
 
-    def create_ad(
+    async def create_ad(
         self,
         adset_id: str,
         name: str,
@@ -444,7 +521,7 @@ class MetaAdsClient:
             }
         }
 
-        creative_result = self._request("POST", f"{self.ad_account_id}/adcreatives", creative_data)
+        creative_result = await self._request("POST", f"{self.ad_account_id}/adcreatives", creative_data)
         creative_id = creative_result.get("id")
 
         if not creative_id:
@@ -458,7 +535,7 @@ class MetaAdsClient:
             "status": status
         }
 
-        ad_result = self._request("POST", f"{self.ad_account_id}/ads", ad_data)
+        ad_result = await self._request("POST", f"{self.ad_account_id}/ads", ad_data)
         ad_id = ad_result.get("id")
 
         if ad_id:
@@ -488,16 +565,44 @@ class MetaCampaignAutomation:
     """
     Complete automation flow: Leonardo → Canva → Facebook
 
+    One Leonardo generation per campaign serves all requested platforms:
+    each platform image is cropped locally from the generated master
+    (image_variants, in a process pool).
+
+    All clients are async and share one httpx.AsyncClient (connection
+    pool); run_all_campaigns runs up to max_concurrency campaign flows at
+    once, each publishing its platforms concurrently.
+
     Usage:
-        automation = MetaCampaignAutomation()
-        result = await automation.run_campaign_flow("voor_na_vergelijking", Platform.FACEBOOK_FEED)
+        async with MetaCampaignAutomation() as automation:
+            result = await automation.run_campaign_flow("voor_na_vergelijking", Platform.FACEBOOK_FEED)
+
+    With reuse=True, a generation cached for the same prompt, model and
+    dimensions is used instead of a new Leonardo generation.
     """
 
-    def __init__(self):
-        self.leonardo = LeonardoClient() if Config.LEONARDO_API_KEY else None
-        self.canva = CanvaClient() if Config.CANVA_ACCESS_TOKEN else None
-        self.meta = MetaAdsClient() if Config.META_ACCESS_TOKEN else None
+    def __init__(self, reuse: bool = False, max_concurrency: int = None):
+        self.http = httpx.AsyncClient(
+            timeout=60.0,
+            limits=httpx.Limits(max_connections=Config.HTTP_MAX_CONNECTIONS)
+        )
+        self.leonardo = LeonardoClient(http=self.http) if Config.LEONARDO_API_KEY else None
+        self.canva = CanvaClient(http=self.http) if Config.CANVA_ACCESS_TOKEN else None
+        self.meta = MetaAdsClient(http=self.http) if Config.META_ACCESS_TOKEN else None
         self.output_dir = Config.OUTPUT_DIR
+        self.asset_store = AssetStore()
+        self.generation_cache = GenerationCache()
+        self.reuse = reuse
+        self.max_concurrency = max_concurrency or Config.MAX_CONCURRENT_FLOWS
+
+    async def aclose(self) -> None:
+        await self.http.aclose()
+
+    async def __aenter__(self) -> 'MetaCampaignAutomation':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
 
     async def run_campaign_flow(
         self,
@@ -512,67 +617,211 @@ class MetaCampaignAutomation:
         2. Upload to Canva (optional)
         3. Create Meta campaign (optional)
         """
+        results = await self.run_campaign_platforms(campaign_key, [platform], create_meta_campaign)
+        return results[0]
+
+    async def run_campaign_platforms(
+        self,
+        campaign_key: str,
+        platforms: List[Platform],
+        create_meta_campaign: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Run the campaign flow for several platforms from one Leonardo generation
+
+        Returns:
+            One result per platform (same shape as run_campaign_flow)
+        """
         if campaign_key not in CAMPAIGN_CONTENT:
-            return {"error": f"Unknown campaign: {campaign_key}"}
+            return [{"error": f"Unknown campaign: {campaign_key}"} for _ in platforms]
 
         campaign = CAMPAIGN_CONTENT[campaign_key]
-        width, height = PLATFORM_DIMENSIONS[platform]
-
-        result = {
-            "campaign": campaign["name"],
-            "platform": platform.value,
-            "timestamp": datetime.now().isoformat(),
-            "steps": []
-        }
+        started_at = datetime.now()
+
+        results = [
+            {
+                "campaign": campaign["name"],
+                "platform": platform.value,
+                "timestamp": started_at.isoformat(),
+                "steps": []
+            }
+            for platform in platforms
+        ]
 
         # Step 1: Generate images with Leonardo AI
         logger.info(f"Step 1: Generating images for {campaign['name']}")
-        if self.leonardo:
-            try:
+        generation_step, master_path = await self._generate_master(campaign_key, platforms, started_at)
+        for result in results:
+            result["steps"].append(generation_step)
+
+        # Crop every platform format from the master (process pool)
+        if master_path:
+            specs = [
+                VariantSpec(
+                    master_path,
+                    os.path.join(
+                        self.output_dir,
+                        campaign_key,
+                        f"{platform.value}_{started_at.strftime('%Y%m%d_%H%M%S')}.png"
+                    ),
+                    *PLATFORM_DIMENSIONS[platform]
+                )
+                for platform in platforms
+            ]
+            variant_paths = await asyncio.gather(
+                *(asyncio.wrap_future(future) for future in submit_variants(specs)),
+                return_exceptions=True
+            )
+
+            for result, local_path in zip(results, variant_paths):
+                if isinstance(local_path, Exception):
+                    result["steps"].append({
+                        "step": "image_variant",
+                        "status": "error",
+                        "error": str(local_path)
+                    })
+                    continue
+
+                result["master_image_path"] = master_path
+                result["local_image_path"] = local_path
+                result["image_sha256"] = await asyncio.to_thread(self.asset_store.add, local_path)
+
+        await asyncio.gather(*(
+            self._publish(campaign, platform, result, create_meta_campaign)
+            for platform, result in zip(platforms, results)
+        ))
+
+        return results
+
+    async def _generate_master(
+        self,
+        campaign_key: str,
+        platforms: List[Platform],
+        started_at: datetime
+    ) -> Tuple[Dict[str, Any], Optional[str]]:
+        """
+        Generate (or reuse) and download the image all platform formats are cut from
+
+        A single platform is generated at its own dimensions, several share
+        a square master (image_variants.master_size). Leonardo generates at
+        most MAX_GENERATION_SIDE per side; a smaller result is upscaled by
+        Leonardo until it covers the largest platform format on both axes.
+
+        Returns:
+            (leonardo_generation step, local master path or None)
+        """
+        if not self.leonardo:
+            return {
+                "step": "leonardo_generation",
+                "status": "skipped",
+                "reason": "LEONARDO_API_KEY not configured"
+            }, None
+
+        if len(platforms) == 1:
+            required = PLATFORM_DIMENSIONS[platforms[0]]
+        else:
+            required = master_size([PLATFORM_DIMENSIONS[platform] for platform in platforms])
+        width, height = generation_size(required)
+
+        campaign = CAMPAIGN_CONTENT[campaign_key]
+
+        try:
+            params = {
+                "prompt": campaign["leonardo_prompt"],
+                "negative_prompt": NEGATIVE_PROMPT,
+                "model_id": LeonardoClient.MODEL_IDS["lucid_origin"],
+                "width": width,
+                "height": height,
+                "guidance_scale": 7.0,
+                "preset_style": None
+            }
+            cache_key = generation_key(**params)
+            cached = self.generation_cache.get(cache_key) if self.reuse else None
+
+            if cached and cached["images"]:
+                logger.info(f"Reusing generation {cached['generation_id']}")
+                gen_result = {
+                    "success": True,
+                    "generation_id": cached["generation_id"],
+                    "images": [image["url"] for image in cached["images"]],
+                    "status": "COMPLETE"
+                }
+            else:
                 gen_result = await self.leonardo.generate_and_wait(
                     prompt=campaign["leonardo_prompt"],
                     width=width,
                     height=height
                 )
+                if gen_result.get("success"):
+                    self.generation_cache.put(
+                        cache_key, params, gen_result["generation_id"], gen_result["images"]
+                    )
 
-                result["steps"].append({
-                    "step": "leonardo_generation",
-                    "status": "success" if gen_result.get("success") else "failed",
-                    "images": gen_result.get("images", []),
-                    "generation_id": gen_result.get("generation_id")
-                })
+            step = {
+                "step": "leonardo_generation",
+                "status": "success" if gen_result.get("success") else "failed",
+                "images": gen_result.get("images", []),
+                "generation_id": gen_result.get("generation_id"),
+                "cached": bool(cached and cached["images"])
+            }
 
-                # Download first image
-                if gen_result.get("images"):
-                    image_url = gen_result["images"][0]
-                    local_path = os.path.join(
-                        self.output_dir,
-                        campaign_key,
-                        f"{platform.value}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-                    )
-                    await self.leonardo.download_image(image_url, local_path)
-                    result["local_image_path"] = local_path
+            if not gen_result.get("images"):
+                return step, None
 
-            except Exception as e:
-                result["steps"].append({
-                    "step": "leonardo_generation",
-                    "status": "error",
-                    "error": str(e)
-                })
-        else:
-            result["steps"].append({
+            # Download first image (restored from the asset store when cached)
+            master_path = os.path.join(
+                self.output_dir,
+                campaign_key,
+                f"master_{started_at.strftime('%Y%m%d_%H%M%S')}.png"
+            )
+            cached_sha = cached["images"][0]["sha256"] if cached and cached["images"] else None
+            restored = bool(cached_sha) and await asyncio.to_thread(
+                self.asset_store.materialize, cached_sha, master_path
+            )
+            if not restored:
+                await self.leonardo.download_image(gen_result["images"][0], master_path)
+
+            # The stored master is the upscaled one, so a restored master needs no upscale
+            factor = upscale_factor(await asyncio.to_thread(image_size, master_path), required)
+            image_ids = gen_result.get("image_ids") or [None]
+            if factor > 1.0 and image_ids[0]:
+                upscaled_url = await self.leonardo.upscale_and_wait(image_ids[0], factor)
+                await self.leonardo.download_image(upscaled_url, master_path)
+                step["upscaled"] = round(factor, 2)
+            elif factor > 1.0:
+                logger.warning(
+                    f"Master is smaller than {required[0]}x{required[1]} and has no "
+                    f"Leonardo image ID to upscale; formats will be upscaled crops"
+                )
+            self.generation_cache.set_image_file(
+                cache_key, 0, master_path, await asyncio.to_thread(self.asset_store.add, master_path)
+            )
+
+            return step, master_path
+
+        except Exception as e:
+            return {
                 "step": "leonardo_generation",
-                "status": "skipped",
-                "reason": "LEONARDO_API_KEY not configured"
-            })
+                "status": "error",
+                "error": str(e)
+            }, None
 
+    async def _publish(
+        self,
+        campaign: Dict[str, Any],
+        platform: Platform,
+        result: Dict[str, Any],
+        create_meta_campaign: bool
+    ) -> Dict[str, Any]:
+        """Steps 2 and 3 for one platform image (adds to result['steps'])"""
         # Step 2: Upload to Canva
         logger.info(f"Step 2: Uploading to Canva")
         if self.canva and result.get("local_image_path"):
             try:
-                asset_id = self.canva.upload_asset(
+                asset_id = await self.asset_store.upload_once_async(
                     result["local_image_path"],
-                    f"{campaign['name']} - {platform.value}"
+                    'canva',
+                    lambda path: self.canva.upload_asset(path, f"{campaign['name']} - {platform.value}")
                 )
                 result["steps"].append({
                     "step": "canva_upload",
@@ -597,12 +846,16 @@ class MetaCampaignAutomation:
         if create_meta_campaign and self.meta and result.get("local_image_path"):
             logger.info(f"Step 3: Creating Meta campaign")
             try:
-                # Upload image to Meta
-                image_hash = self.meta.upload_image(result["local_image_path"])
+                # Upload image to Meta (image hashes are per ad account)
+                image_hash = await self.asset_store.upload_once_async(
+                    result["local_image_path"],
+                    f"meta:{self.meta.ad_account_id}",
+                    self.meta.upload_image
+                )
 
                 if image_hash:
                     # Create campaign
-                    campaign_id = self.meta.create_campaign(
+                    campaign_id = await self.meta.create_campaign(
                         name=f"Kandidatentekort - {campaign['name']}",
                         objective=AdObjective.LEADS,
                         status="PAUSED"
@@ -610,7 +863,7 @@ class MetaCampaignAutomation:
 
                     if campaign_id:
                         # Create ad set
-                        adset_id = self.meta.create_adset(
+                        adset_id = await self.meta.create_adset(
                             campaign_id=campaign_id,
                             name=f"{campaign['name']} - {platform.value}",
                             targeting=self.meta.get_hr_directors_targeting(),
@@ -619,7 +872,7 @@ class MetaCampaignAutomation:
 
                         if adset_id:
                             # Create ad
-                            ad_id = self.meta.create_ad(
+                            ad_id = await self.meta.create_ad(
                                 adset_id=adset_id,
                                 name=f"Ad - {campaign['name']}",
                                 image_hash=image_hash,
@@ -659,7 +912,7 @@ class MetaCampaignAutomation:
         platforms: List[Platform] = None,
         create_meta_campaigns: bool = False
     ) -> Dict[str, Any]:
-        """Run flow for all campaigns"""
+        """Run flow for all campaigns (up to max_concurrency campaigns at once)"""
         if platforms is None:
             platforms = [Platform.FACEBOOK_FEED]
 
@@ -668,16 +921,23 @@ class MetaCampaignAutomation:
             "campaigns": {}
         }
 
-        for campaign_key in CAMPAIGN_CONTENT.keys():
-            campaign_results = []
-            for platform in platforms:
-                result = await self.run_campaign_flow(
-                    campaign_key,
-                    platform,
-                    create_meta_campaigns
-                )
-                campaign_results.append(result)
-            all_results["campaigns"][campaign_key] = campaign_results
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(campaign_key: str) -> List[Dict[str, Any]]:
+            async with semaphore:
+                try:
+                    return await self.run_campaign_platforms(
+                        campaign_key,
+                        platforms,
+                        create_meta_campaigns
+                    )
+                except Exception as e:
+                    logger.error(f"Campaign flow {campaign_key} failed: {str(e)}")
+                    return [{"error": str(e)} for _ in platforms]
+
+        campaign_keys = list(CAMPAIGN_CONTENT.keys())
+        campaign_results = await asyncio.gather(*(run(key) for key in campaign_keys))
+        all_results["campaigns"] = dict(zip(campaign_keys, campaign_results))
 
         all_results["completed_at"] = datetime.now().isoformat()
         return all_results
@@ -702,15 +962,26 @@ async def main():
     )
     parser.add_argument(
         "--platform",
-        choices=["facebook", "instagram", "instagram_story", "linkedin"],
+        choices=["facebook", "instagram", "instagram_story", "linkedin", "all"],
         default="facebook",
-        help="Target platform"
+        help="Target platform (all: every platform from one generation per campaign)"
     )
     parser.add_argument(
         "--create-meta-campaign",
         action="store_true",
         help="Actually create campaign in Meta Ads Manager"
     )
+    parser.add_argument(
+        "--reuse",
+        action="store_true",
+        help="Serve cached generations, only generate missing prompt/size combinations"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=Config.MAX_CONCURRENT_FLOWS,
+        help="Campaign flows run concurrently"
+    )
     parser.add_argument(
         "--list",
         action="store_true",
@@ -737,23 +1008,31 @@ async def main():
         "instagram_story": Platform.INSTAGRAM_STORY,
         "linkedin": Platform.LINKEDIN
     }
-    platform = platform_map.get(args.platform, Platform.FACEBOOK_FEED)
-
-    automation = MetaCampaignAutomation()
-
-    if args.campaign == "all":
-        print("\nRunning all campaigns...")
-        results = await automation.run_all_campaigns(
-            platforms=[platform],
-            create_meta_campaigns=args.create_meta_campaign
-        )
-    else:
-        print(f"\nRunning {args.campaign}...")
-        results = await automation.run_campaign_flow(
-            args.campaign,
-            platform,
-            args.create_meta_campaign
-        )
+    platforms = list(Platform) if args.platform == "all" else [
+        platform_map.get(args.platform, Platform.FACEBOOK_FEED)
+    ]
+
+    async with MetaCampaignAutomation(reuse=args.reuse, max_concurrency=args.concurrency) as automation:
+        if args.campaign == "all":
+            print("\nRunning all campaigns...")
+            results = await automation.run_all_campaigns(
+                platforms=platforms,
+                create_meta_campaigns=args.create_meta_campaign
+            )
+        elif len(platforms) == 1:
+            print(f"\nRunning {args.campaign}...")
+            results = await automation.run_campaign_flow(
+                args.campaign,
+                platforms[0],
+                args.create_meta_campaign
+            )
+        else:
+            print(f"\nRunning {args.campaign}...")
+            results = await automation.run_campaign_platforms(
+                args.campaign,
+                platforms,
+                args.create_meta_campaign
+            )
 
     # Save results
     output_file = os.path.join(
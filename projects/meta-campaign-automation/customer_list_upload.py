@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+CUSTOMER LIST UPLOAD
+====================
+Fill a Meta customer-file custom audience with all Pipedrive persons.
+
+The upload streams: Pipedrive persons are read page by page, their email
+and phone are normalized and SHA-256 hashed in a process pool (pii_hashing,
+the rules shared with the Conversion API), and the hashed rows are
+sent to Meta in batches of 10,000 rows within one upload session
+(session_id + batch_seq, last_batch_flag on the final batch). Only a
+bounded number of pages and at most two batches are held in memory, so
+memory use does not grow with the size of the CRM.
+
+After every accepted batch the position in the Pipedrive list is saved to
+a small state file; a failed or interrupted upload continues from there
+with the same session when it is run again.
+
+Usage:
+    uploader = CustomerListUploader(MetaApiClient(), PipedriveClient())
+    summary = uploader.upload(audience_id)
+
+CLI:
+    python customer_list_upload.py upload --audience-id 2380000000
+    python customer_list_upload.py upload --create "Pipedrive - Alle personen"
+    python customer_list_upload.py status --audience-id 2380000000
+"""
+
+import os
+import json
+import time
+import random
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Iterator, Tuple, Callable
+
+from meta_api_client import MetaApiClient, MetaApiError, MetaConfig
+from pii_hashing import hash_pii
+from pipedrive_client import PipedriveClient, PipedriveConfig
+from streaming_io import atomic_output
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+# ==============================================================================
+# CONFIGURATION
+# ==============================================================================
+
+class CustomerListConfig:
+    """Customer List Upload Configuration"""
+    # Rows per users request (Meta max is 10,000)
+    BATCH_SIZE = MetaConfig.AUDIENCE_USERS_MAX_BATCH
+
+    # Hashing processes (default: one per core)
+    HASH_WORKERS = int(os.getenv('CUSTOMER_LIST_HASH_WORKERS', '0')) or os.cpu_count() or 1
+
+    # Pipedrive pages being hashed ahead of the upload
+    MAX_PENDING_PAGES = HASH_WORKERS * 2
+
+    # Resume state per audience
+    STATE_DIR = os.getenv('CUSTOMER_LIST_STATE_DIR', './data/customer_lists')
+
+    # Retries for rate-limited or failed users requests
+    MAX_RETRIES = 5
+    RETRY_BASE_DELAY = 30  # seconds, doubled per attempt
+
+
+# Columns of every uploaded row
+SCHEMA = ['EMAIL', 'PHONE']
+
+# Hashed row plus its position in the Pipedrive list: (page start, index on page + 1)
+Position = Tuple[int, int]
+
+
+# ==============================================================================
+# NORMALIZATION & HASHING (runs in worker processes)
+# ==============================================================================
+
+def primary_value(entries: Any) -> Optional[str]:
+    """Primary (else first non-empty) value of a Pipedrive email/phone field"""
+    if isinstance(entries, str):
+        return entries or None
+
+    values = [entry for entry in entries or [] if entry.get('value')]
+    if not values:
+        return None
+    primary = next((entry for entry in values if entry.get('primary')), values[0])
+    return primary['value']
+
+
+def contact_fields(person: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+    """(email, phone) of a Pipedrive person"""
+    return primary_value(person.get('email')), primary_value(person.get('phone'))
+
+
+def hash_contacts(contacts: List[Tuple[Optional[str], Optional[str]]]) -> List[List[str]]:
+    """
+    Hash (email, phone) pairs into SCHEMA rows
+
+    Empty values become '' (Meta skips empty columns); persons without a
+    usable email or phone are left out.
+    """
+    rows = []
+    for email, phone in contacts:
+        email = (email or '').strip()
+        phone = (phone or '').strip()
+
+        email_hash = (hash_pii(email, 'em') if '@' in email else None) or ''
+        phone_hash = hash_pii(phone, 'ph') or ''
+
+        if email_hash or phone_hash:
+            rows.append([email_hash, phone_hash])
+    return rows
+
+
+def iter_hashed_pages(
+    pipedrive: PipedriveClient,
+    start: int = 0,
+    page_size: int = None,
+    workers: int = None
+) -> Iterator[Tuple[int, List[List[str]]]]:
+    """
+    Hashed SCHEMA rows of all Pipedrive persons, page by page, in list order
+
+    Pages are hashed in a process pool while the next pages are fetched;
+    at most MAX_PENDING_PAGES pages are in flight.
+
+    Yields:
+        (offset of the Pipedrive page, hashed rows of that page)
+    """
+    workers = workers or CustomerListConfig.HASH_WORKERS
+    max_pending = max(CustomerListConfig.MAX_PENDING_PAGES, workers)
+    pending = deque()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for page_start, persons in pipedrive.iter_person_pages(start, page_size):
+            contacts = [contact_fields(person) for person in persons]
+            pending.append((page_start, executor.submit(hash_contacts, contacts)))
+
+            while len(pending) >= max_pending:
+                page_start, future = pending.popleft()
+                yield page_start, future.result()
+
+        while pending:
+            page_start, future = pending.popleft()
+            yield page_start, future.result()
+
+
+# ==============================================================================
+# UPLOADER
+# ==============================================================================
+
+def call_with_retry(request: Callable[[], Dict[str, Any]], label: str, hint: str = '') -> Dict[str, Any]:
+    """Run a Graph API call, retrying throttling and network errors with backoff"""
+    for attempt in range(CustomerListConfig.MAX_RETRIES + 1):
+        try:
+            return request()
+        except MetaApiError as e:
+            retryable = e.is_rate_limited() or e.code is None
+            if not retryable or attempt == CustomerListConfig.MAX_RETRIES:
+                logger.error(f"{label} failed: {e.message}{f' - {hint}' if hint else ''}")
+                raise
+            delay = CustomerListConfig.RETRY_BASE_DELAY * 2 ** attempt
+            logger.warning(f"{label} failed ({e.message}), retrying in {delay}s")
+            time.sleep(delay)
+
+
+class CustomerListUploader:
+    """
+    Resumable streaming upload of Pipedrive persons into a customer-file audience
+
+    Usage:
+        uploader = CustomerListUploader(MetaApiClient(), PipedriveClient())
+        uploader.upload('2380000000')       # resumes an interrupted upload
+    """
+
+    def __init__(
+        self,
+        meta: MetaApiClient,
+        pipedrive: PipedriveClient,
+        state_dir: str = None,
+        batch_size: int = None
+    ):
+        self.meta = meta
+        self.pipedrive = pipedrive
+        self.state_dir = state_dir or CustomerListConfig.STATE_DIR
+        self.batch_size = batch_size or CustomerListConfig.BATCH_SIZE
+
+    # ==========================================================================
+    # RESUME STATE
+    # ==========================================================================
+
+    def state_path(self, audience_id: str) -> str:
+        return os.path.join(self.state_dir, f'{audience_id}.json')
+
+    def load_state(self, audience_id: str) -> Optional[Dict[str, Any]]:
+        """State of an unfinished upload, None if there is none"""
+        path = self.state_path(audience_id)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_state(self, state: Dict[str, Any]) -> None:
+        with atomic_output(self.state_path(state['audience_id'])) as f:
+            f.write(json.dumps(state, indent=2).encode('utf-8'))
+
+    def _clear_state(self, audience_id: str) -> None:
+        path = self.state_path(audience_id)
+        if os.path.exists(path):
+            os.remove(path)
+
+    # ==========================================================================
+    # UPLOAD
+    # ==========================================================================
+
+    def upload(
+        self,
+        audience_id: str,
+        restart: bool = False,
+        estimated_total: int = None
+    ) -> Dict[str, Any]:
+        """
+        Upload all Pipedrive persons to an audience (or finish an interrupted upload)
+
+        Args:
+            audience_id: Customer-file custom audience ID
+            restart: Ignore saved state and start a new session
+            estimated_total: Expected number of rows, passed to Meta as a hint
+
+        Returns:
+            Summary with session_id, batches and rows_sent
+
+        Raises:
+            MetaApiError / PipedriveError when a batch keeps failing; the
+            state of all accepted batches is kept for the next run
+        """
+        state = None if restart else self.load_state(audience_id)
+
+        if state:
+            logger.info(
+                f"Resuming session {state['session_id']} for audience {audience_id} "
+                f"after batch {state['batch_seq']} ({state['rows_sent']} rows sent)"
+            )
+        else:
+            state = {
+                'audience_id': audience_id,
+                'session_id': random.getrandbits(62),
+                'batch_seq': 0,
+                'rows_sent': 0,
+                'page_size': PipedriveConfig.PAGE_SIZE,
+                'page_start': 0,
+                'page_offset': 0,
+                'started_at': datetime.now().isoformat()
+            }
+            self._save_state(state)
+
+        # A batch is only sent once the next row exists, so the final
+        # batch is known when it is sent and can carry last_batch_flag
+        pending = None
+        for batch in self._iter_batches(state):
+            if pending:
+                self._send(state, *pending, last=False, estimated_total=estimated_total)
+            pending = batch
+
+        if pending:
+            self._send(state, *pending, last=True, estimated_total=estimated_total)
+        elif state['batch_seq']:
+            logger.warning(f"No rows left to close session {state['session_id']}")
+
+        self._clear_state(audience_id)
+
+        summary = {
+            'audience_id': audience_id,
+            'session_id': state['session_id'],
+            'batches': state['batch_seq'],
+            'rows_sent': state['rows_sent'],
+            'started_at': state['started_at'],
+            'completed_at': datetime.now().isoformat()
+        }
+        logger.info(f"Customer list upload complete: {summary['rows_sent']} rows in {summary['batches']} batches")
+        return summary
+
+    def _iter_batches(self, state: Dict[str, Any]) -> Iterator[Tuple[List[List[str]], Position]]:
+        """Batches of hashed rows after the saved position, with the position after each batch"""
+        batch: List[List[str]] = []
+        position: Optional[Position] = None
+
+        for page_start, rows in iter_hashed_pages(
+            self.pipedrive,
+            start=state['page_start'],
+            page_size=state['page_size']
+        ):
+            skip = state['page_offset'] if page_start == state['page_start'] else 0
+
+            for index in range(skip, len(rows)):
+                batch.append(rows[index])
+                position = (page_start, index + 1)
+
+                if len(batch) == self.batch_size:
+                    yield batch, position
+                    batch = []
+
+        if batch:
+            yield batch, position
+
+    def _send(
+        self,
+        state: Dict[str, Any],
+        rows: List[List[str]],
+        position: Position,
+        last: bool,
+        estimated_total: int = None
+    ) -> None:
+        """Send one batch (retrying throttling and network errors) and record it"""
+        session = {
+            'session_id': state['session_id'],
+            'batch_seq': state['batch_seq'] + 1,
+            'last_batch_flag': last
+        }
+        if estimated_total:
+            session['estimated_num_total'] = estimated_total
+
+        result = call_with_retry(
+            lambda: self.meta.add_audience_users(state['audience_id'], SCHEMA, rows, session),
+            f"Batch {session['batch_seq']}",
+            f"rerun to resume after batch {state['batch_seq']}"
+        )
+
+        state['batch_seq'] = session['batch_seq']
+        state['rows_sent'] += len(rows)
+        state['page_start'], state['page_offset'] = position
+        self._save_state(state)
+
+        logger.info(
+            f"Batch {session['batch_seq']}{' (last)' if last else ''}: "
+            f"{result.get('num_received', len(rows))} rows received, "
+            f"{result.get('num_invalid_entries', 0)} invalid"
+        )
+
+
+# ==============================================================================
+# CLI INTERFACE
+# ==============================================================================
+
+def main():
+    """Command line interface"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Upload Pipedrive persons to a Meta customer-file audience")
+    parser.add_argument("command", choices=["upload", "status"], help="upload: run or resume, status: saved state")
+    parser.add_argument("--audience-id", help="Existing custom audience ID")
+    parser.add_argument("--create", metavar="NAME", help="Create a new customer-file audience with this name")
+    parser.add_argument("--restart", action="store_true", help="Discard saved state and start a new session")
+    parser.add_argument("--estimated-total", type=int, help="Expected number of persons (hint for Meta)")
+
+    args = parser.parse_args()
+
+    if args.command == "status":
+        if not args.audience_id:
+            parser.error("--audience-id is required")
+        uploader = CustomerListUploader(meta=None, pipedrive=None)
+        print(json.dumps(uploader.load_state(args.audience_id) or {'status': 'no upload in progress'}, indent=2))
+        return
+
+    meta = MetaApiClient()
+    audience_id = args.audience_id
+    if args.create:
+        audience_id = meta.create_custom_audience(
+            name=args.create,
+            description='Pipedrive persons (customer list upload)',
+            customer_file_source='USER_PROVIDED_ONLY'
+        )['id']
+    if not audience_id:
+        parser.error("--audience-id or --create is required")
+
+    uploader = CustomerListUploader(meta, PipedriveClient())
+    result = uploader.upload(audience_id, restart=args.restart, estimated_total=args.estimated_total)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
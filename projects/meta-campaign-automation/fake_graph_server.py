@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""
+FAKE META GRAPH API SERVER
+==========================
+Local stand-in for the parts of the Graph API used by MetaApiClient, so
+paging and the async insights report flow can be exercised without a real
+ad account or API quota.
+
+Emulated endpoints:
+- GET  /<version>/debug_token                   - Token info
+- GET  /<version>/oauth/access_token            - Exchange for a new long-lived token
+- GET  /<version>/act_<id>/campaigns            - Paginated campaign list
+- GET  /<version>/act_<id>/customaudiences      - Paginated audience list
+- GET  /<version>/act_<id>/insights             - Paginated sync insights
+- POST /<version>/act_<id>/insights             - Submit async report run
+- GET  /<version>/<campaign_id>/insights        - Single campaign insights
+- GET  /<version>/<report_run_id>               - Report run status
+- GET  /<version>/<report_run_id>/insights      - Paginated report rows
+- GET  /<version>/act_<id>/reachestimate        - Audience size for a targeting spec
+- POST /<version>/act_<id>/campaigns            - Create campaign
+- POST /<version>/act_<id>/adsets               - Create ad set
+- DELETE /<version>/<object_id>                 - Delete campaign/ad set
+- POST /<version>/                              - Batch requests (with {result=...} references;
+                                                  named operations return null unless
+                                                  omit_response_on_success is false)
+- POST /<version>/<audience_id>/users           - Add hashed users (upload sessions)
+- DELETE /<version>/<audience_id>/users         - Remove hashed users
+
+Usage:
+    python fake_graph_server.py
+    META_GRAPH_BASE_URL=http://localhost:5055/v18.0 \\
+        META_ACCESS_TOKEN=fake META_AD_ACCOUNT_ID=act_123 python main_server.py
+
+Environment:
+- FAKE_GRAPH_PORT: Port to listen on (default: 5055)
+- FAKE_GRAPH_CAMPAIGNS: Number of fake campaigns (default: 250)
+- FAKE_GRAPH_JOB_POLLS: Status polls before a report run completes (default: 3)
+- FAKE_GRAPH_FAIL_MATCH: Fail create calls whose name contains this text (rollback testing)
+- FAKE_GRAPH_FAIL_USERS_BATCH: Fail the users request with this batch_seq once (resume testing)
+- FAKE_GRAPH_TOKEN_DAYS: Days until the initial token expires (default: 50, refresh testing)
+- FAKE_GRAPH_CALL_BUDGET: Calls per minute before code 80004 errors; responses then carry
+  x-app-usage / x-business-use-case-usage headers (throttle testing)
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import random
+from urllib.parse import parse_qsl
+from collections import deque
+from datetime import date, timedelta
+from typing import Dict, Any, List
+from flask import Flask, request, jsonify
+
+app = Flask(__name__)
+
+NUM_CAMPAIGNS = int(os.getenv('FAKE_GRAPH_CAMPAIGNS', '250'))
+JOB_POLLS = int(os.getenv('FAKE_GRAPH_JOB_POLLS', '3'))
+FAIL_MATCH = os.getenv('FAKE_GRAPH_FAIL_MATCH')
+FAIL_USERS_BATCH = os.getenv('FAKE_GRAPH_FAIL_USERS_BATCH')
+TOKEN_DAYS = float(os.getenv('FAKE_GRAPH_TOKEN_DAYS', '50'))
+CALL_BUDGET = int(os.getenv('FAKE_GRAPH_CALL_BUDGET', '0'))
+
+# Times of the calls in the last minute (FAKE_GRAPH_CALL_BUDGET)
+CALL_TIMES: deque = deque()
+
+# access token -> expires_at of tokens issued by /oauth/access_token
+TOKENS: Dict[str, int] = {}
+
+CAMPAIGNS = [
+    {
+        'id': str(120200000000000 + i),
+        'name': f'Kandidatentekort - Fake Campaign {i + 1}',
+        'objective': 'OUTCOME_LEADS',
+        'status': 'ACTIVE' if i % 3 else 'PAUSED',
+        'daily_budget': str(2500 + (i % 4) * 1000),
+        'created_time': '2024-01-01T00:00:00+0100'
+    }
+    for i in range(NUM_CAMPAIGNS)
+]
+
+AUDIENCES = [
+    {
+        'id': str(238000000000000 + i),
+        'name': f'Fake Audience {i + 1}',
+        'description': '',
+        'subtype': 'CUSTOM',
+        'approximate_count': 1000 + i
+    }
+    for i in range(NUM_CAMPAIGNS // 5)
+]
+
+# report_run_id -> {'rows': [...], 'polls': int, 'params': {...}}
+REPORT_RUNS: Dict[str, Dict[str, Any]] = {}
+
+# object_id -> created campaign/ad set (deleted objects are removed)
+CREATED_OBJECTS: Dict[str, Dict[str, Any]] = {}
+
+# audience_id -> set of uploaded rows; session_id -> batch_seqs received
+AUDIENCE_USERS: Dict[str, set] = {}
+UPLOAD_SESSIONS: Dict[int, List[int]] = {}
+
+
+# ==============================================================================
+# FAKE DATA
+# ==============================================================================
+
+def report_days(params: Dict[str, Any]) -> List[tuple]:
+    """(date_start, date_stop) per row period, honouring time_range/time_increment"""
+    if params.get('time_range'):
+        time_range = json.loads(params['time_range'])
+        since = date.fromisoformat(time_range['since'])
+        until = date.fromisoformat(time_range['until'])
+    else:
+        since, until = date(2024, 1, 1), date(2024, 3, 31)
+
+    if params.get('time_increment') != '1':
+        return [(since.isoformat(), until.isoformat())]
+
+    return [
+        ((since + timedelta(days=i)).isoformat(),) * 2
+        for i in range((until - since).days + 1)
+    ]
+
+
+def insights_rows(params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Generate deterministic campaign-level insights rows"""
+    breakdowns = [b for b in params.get('breakdowns', '').split(',') if b]
+    breakdown_values = {
+        'age': ['25-34', '35-44', '45-54'],
+        'gender': ['male', 'female'],
+        'publisher_platform': ['facebook', 'instagram']
+    }
+
+    rows = []
+    for (date_start, date_stop), campaign in (
+        (period, campaign) for period in report_days(params) for campaign in CAMPAIGNS
+    ):
+        rng = random.Random(f"{campaign['id']}-{date_start}")
+        combos = [{}]
+        for breakdown in breakdowns:
+            combos = [
+                dict(combo, **{breakdown: value})
+                for combo in combos
+                for value in breakdown_values.get(breakdown, ['unknown'])
+            ]
+
+        for combo in combos:
+            impressions = rng.randint(500, 20000)
+            clicks = rng.randint(5, impressions // 50)
+            spend = round(rng.uniform(5, 150), 2)
+            leads = rng.randint(0, 8)
+            row = {
+                'campaign_id': campaign['id'],
+                'campaign_name': campaign['name'],
+                'impressions': str(impressions),
+                'clicks': str(clicks),
+                'spend': str(spend),
+                'reach': str(int(impressions * 0.7)),
+                'cpc': str(round(spend / clicks, 4)),
+                'cpm': str(round(spend / impressions * 1000, 4)),
+                'ctr': str(round(clicks / impressions * 100, 4)),
+                'actions': [{'action_type': 'lead', 'value': str(leads)}] if leads else [],
+                'date_start': date_start,
+                'date_stop': date_stop
+            }
+            row.update(combo)
+            rows.append(row)
+
+    return rows
+
+
+def paginate(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Return one page of items with Graph-style cursor paging"""
+    limit = int(request.args.get('limit', 25))
+    offset = int(request.args.get('after', 0))
+    page = items[offset:offset + limit]
+
+    result = {
+        'data': page,
+        'paging': {
+            'cursors': {
+                'before': str(offset),
+                'after': str(offset + len(page))
+            }
+        }
+    }
+
+    if offset + limit < len(items):
+        result['paging']['next'] = f"{request.base_url}?after={offset + limit}&limit={limit}"
+
+    return result
+
+
+# ==============================================================================
+# RATE LIMITS
+# ==============================================================================
+
+def usage_pct() -> float:
+    now = time.time()
+    while CALL_TIMES and CALL_TIMES[0] < now - 60:
+        CALL_TIMES.popleft()
+    return round(len(CALL_TIMES) * 100 / CALL_BUDGET, 2)
+
+
+@app.before_request
+def enforce_call_budget():
+    """Business use case limit of FAKE_GRAPH_CALL_BUDGET calls per minute"""
+    if CALL_BUDGET and usage_pct() >= 100:
+        return jsonify({'error': {
+            'message': 'There have been too many calls to this ad-account.',
+            'type': 'OAuthException',
+            'code': 80004,
+            'error_subcode': 2446079
+        }}), 400
+    if CALL_BUDGET:
+        CALL_TIMES.append(time.time())
+
+
+@app.after_request
+def add_usage_headers(response):
+    if CALL_BUDGET:
+        pct = usage_pct()
+        response.headers['x-app-usage'] = json.dumps({'call_count': pct / 4, 'total_time': 1, 'total_cputime': 1})
+        response.headers['x-business-use-case-usage'] = json.dumps({'1234567890': [{
+            'type': 'ads_management',
+            'call_count': pct,
+            'total_cputime': 1,
+            'total_time': 1,
+            'estimated_time_to_regain_access': 1 if pct >= 100 else 0
+        }]})
+    return response
+
+
+# ==============================================================================
+# ROUTES
+# ==============================================================================
+
+@app.route('/<version>/debug_token', methods=['GET'])
+def debug_token(version: str):
+    """Token info (the initial token expires in FAKE_GRAPH_TOKEN_DAYS)"""
+    input_token = request.args.get('input_token')
+    return jsonify({
+        'data': {
+            'type': 'USER',
+            'expires_at': TOKENS.get(input_token, int(time.time() + TOKEN_DAYS * 24 * 3600)),
+            'scopes': ['ads_read', 'ads_management']
+        }
+    })
+
+
+@app.route('/<version>/oauth/access_token', methods=['GET'])
+def access_token(version: str):
+    """fb_exchange_token: issue a new 60-day token"""
+    if not request.args.get('fb_exchange_token'):
+        return jsonify({'error': {'message': 'Missing fb_exchange_token', 'code': 100}}), 400
+
+    token = f'fake-long-lived-{uuid.uuid4().hex[:12]}'
+    TOKENS[token] = int(time.time()) + 60 * 24 * 3600
+    return jsonify({'access_token': token, 'token_type': 'bearer', 'expires_in': 60 * 24 * 3600})
+
+
+@app.route('/<version>/<account_id>/campaigns', methods=['GET', 'POST'])
+def campaigns(version: str, account_id: str):
+    if request.method == 'POST':
+        status, body = create_object('campaign', request.get_json(silent=True) or {})
+        return jsonify(body), status
+    return jsonify(paginate(CAMPAIGNS))
+
+
+@app.route('/<version>/<account_id>/reachestimate', methods=['GET'])
+def reach_estimate(version: str, account_id: str):
+    """Deterministic audience size derived from the targeting spec"""
+    rng = random.Random(request.args.get('targeting_spec', ''))
+    lower = rng.randint(500, 100000)
+    return jsonify({
+        'data': {
+            'users_lower_bound': lower,
+            'users_upper_bound': int(lower * 1.6),
+            'estimate_ready': True
+        }
+    })
+
+
+@app.route('/<version>/<account_id>/adsets', methods=['POST'])
+def ad_sets(version: str, account_id: str):
+    status, body = create_object('adset', request.get_json(silent=True) or {})
+    return jsonify(body), status
+
+
+@app.route('/<version>/', methods=['POST'])
+def batch(version: str):
+    """Run batch operations in order, resolving {result=name:$.id} references"""
+    data = request.get_json(silent=True) or request.form
+    operations = json.loads(data['batch'])
+    named_results: Dict[str, Dict[str, Any]] = {}
+    responses = []
+
+    for operation in operations:
+        body = dict(parse_qsl(operation.get('body', '')))
+        references = [
+            re.fullmatch(r'\{result=([^:]+):\$\.(\w+)\}', value)
+            for value in body.values()
+        ]
+        if any(match and match.group(1) not in named_results for match in references):
+            # Dependency failed: Meta does not execute the operation
+            responses.append(None)
+            continue
+
+        for key, match in zip(list(body), references):
+            if match:
+                body[key] = named_results[match.group(1)].get(match.group(2))
+
+        if operation['method'] == 'DELETE':
+            status, result = delete_object(operation['relative_url'])
+        elif operation['relative_url'].endswith('/campaigns'):
+            status, result = create_object('campaign', body)
+        elif operation['relative_url'].endswith('/adsets'):
+            status, result = create_object('adset', body)
+        else:
+            status, result = 400, {'error': {'message': 'Unsupported batch operation', 'code': 100}}
+
+        if status == 200 and operation.get('name'):
+            named_results[operation['name']] = result
+            if operation.get('omit_response_on_success', True) is not False:
+                # Like Meta: named operations return null unless asked not to
+                responses.append(None)
+                continue
+        responses.append({'code': status, 'body': json.dumps(result)})
+
+    return jsonify(responses)
+
+
+def create_object(object_type: str, data: Dict[str, Any]):
+    """Create a campaign/ad set, failing when its name contains FAKE_GRAPH_FAIL_MATCH"""
+    if FAIL_MATCH and FAIL_MATCH in data.get('name', ''):
+        return 400, {'error': {'message': f"Invalid parameter: {data.get('name')}", 'code': 100}}
+    if object_type == 'adset' and data.get('campaign_id') not in CREATED_OBJECTS:
+        return 400, {'error': {'message': 'Unknown campaign_id', 'code': 100}}
+
+    object_id = str(uuid.uuid4().int)[:15]
+    CREATED_OBJECTS[object_id] = dict(data, id=object_id, type=object_type)
+    return 200, {'id': object_id}
+
+
+def delete_object(object_id: str):
+    if CREATED_OBJECTS.pop(object_id, None) is None:
+        return 400, {'error': {'message': f'Unknown object: {object_id}', 'code': 100}}
+    return 200, {'success': True}
+
+
+@app.route('/<version>/<account_id>/customaudiences', methods=['GET'])
+def custom_audiences(version: str, account_id: str):
+    return jsonify(paginate(AUDIENCES))
+
+
+@app.route('/<version>/<audience_id>/users', methods=['POST', 'DELETE'])
+def audience_users(version: str, audience_id: str):
+    """Add/remove audience rows, checking upload session sequencing"""
+    global FAIL_USERS_BATCH
+    data = request.get_json(silent=True) or {}
+    payload = data.get('payload') or {}
+    session = data.get('session') or {}
+    rows = payload.get('data') or []
+
+    if len(rows) > 10000:
+        return jsonify({'error': {'message': 'Too many rows in one request', 'code': 100}}), 400
+
+    if session:
+        if FAIL_USERS_BATCH and int(FAIL_USERS_BATCH) == session['batch_seq']:
+            FAIL_USERS_BATCH = None
+            return jsonify({'error': {'message': 'Service temporarily unavailable', 'code': 2}}), 500
+
+        received = UPLOAD_SESSIONS.setdefault(session['session_id'], [])
+        if session['batch_seq'] in received:
+            return jsonify({'error': {'message': 'Duplicate batch_seq', 'code': 100}}), 400
+        received.append(session['batch_seq'])
+
+    members = AUDIENCE_USERS.setdefault(audience_id, set())
+    if request.method == 'DELETE':
+        members.difference_update(tuple(row) for row in rows)
+    else:
+        members.update(tuple(row) for row in rows)
+
+    return jsonify({
+        'audience_id': audience_id,
+        'session_id': session.get('session_id'),
+        'num_received': len(rows),
+        'num_invalid_entries': 0,
+        'invalid_entry_samples': {}
+    })
+
+
+@app.route('/<version>/<object_id>/insights', methods=['GET', 'POST'])
+def insights(version: str, object_id: str):
+    params = request.args.to_dict()
+
+    if object_id in REPORT_RUNS:
+        return jsonify(paginate(REPORT_RUNS[object_id]['rows']))
+
+    rows = insights_rows(params)
+    if not object_id.startswith('act_'):
+        rows = [row for row in rows if row['campaign_id'] == object_id]
+
+    if request.method == 'POST':
+        report_run_id = str(uuid.uuid4().int)[:15]
+        REPORT_RUNS[report_run_id] = {'rows': rows, 'polls': 0, 'params': params}
+        return jsonify({'report_run_id': report_run_id})
+
+    return jsonify(paginate(rows))
+
+
+@app.route('/<version>/<object_id>', methods=['GET', 'DELETE'])
+def graph_object(version: str, object_id: str):
+    if request.method == 'DELETE':
+        status, body = delete_object(object_id)
+        return jsonify(body), status
+
+    if object_id in CREATED_OBJECTS:
+        return jsonify(CREATED_OBJECTS[object_id])
+
+    run = REPORT_RUNS.get(object_id)
+    if not run:
+        return jsonify({'error': {'message': f'Unknown object: {object_id}', 'code': 100}}), 404
+
+    run['polls'] += 1
+    done = run['polls'] >= JOB_POLLS
+
+    return jsonify({
+        'id': object_id,
+        'async_status': 'Job Completed' if done else 'Job Running',
+        'async_percent_completion': 100 if done else int(run['polls'] / JOB_POLLS * 100),
+        'date_start': '2024-01-01',
+        'date_stop': '2024-03-31'
+    })
+
+
+if __name__ == '__main__':
+    port = int(os.environ.get('FAKE_GRAPH_PORT', 5055))
+    app.run(host='127.0.0.1', port=port)
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+LEONARDO GENERATION CACHE
+=========================
+Persistent cache of Leonardo generations keyed on everything that
+determines the output: prompt, negative prompt, model ID, width, height,
+guidance scale and preset style.
+
+Every completed generation is recorded with its generation ID, image URLs
+and, once downloaded, the local path and SHA-256 of each image (the bytes
+themselves live in the asset store). Workflows started with --reuse serve
+cached generations instead of spending credits and only generate the
+combinations that are missing.
+
+Usage:
+    cache = GenerationCache()
+    key = generation_key(prompt, NEGATIVE_PROMPT, model_id, 1024, 576, 7.0, "PHOTOGRAPHY")
+    cached = cache.get(key)   # None -> generate, then cache.put(...)
+
+CLI:
+    python generation_cache.py status
+    python generation_cache.py clear
+"""
+
+import os
+import json
+import sqlite3
+import hashlib
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Iterator
+
+from asset_store import AssetStoreConfig
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+# ==============================================================================
+# CONFIGURATION
+# ==============================================================================
+
+class GenerationCacheConfig:
+    """Generation Cache Configuration"""
+    DB_PATH = os.getenv(
+        'GENERATION_CACHE_PATH',
+        os.path.join(AssetStoreConfig.STORE_DIR, 'generations.db')
+    )
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS generations (
+    cache_key TEXT PRIMARY KEY,
+    generation_id TEXT NOT NULL,
+    params TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS generation_images (
+    cache_key TEXT NOT NULL,
+    image_index INTEGER NOT NULL,
+    url TEXT NOT NULL,
+    local_path TEXT,
+    sha256 TEXT,
+    PRIMARY KEY (cache_key, image_index)
+);
+"""
+
+
+def generation_key(
+    prompt: str,
+    negative_prompt: Optional[str],
+    model_id: str,
+    width: int,
+    height: int,
+    guidance_scale: float,
+    preset_style: Optional[str]
+) -> str:
+    """Cache key for one combination of generation parameters"""
+    params = {
+        "prompt": prompt,
+        "negative_prompt": negative_prompt,
+        "model_id": model_id,
+        "width": width,
+        "height": height,
+        "guidance_scale": guidance_scale,
+        "preset_style": preset_style
+    }
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+# ==============================================================================
+# GENERATION CACHE
+# ==============================================================================
+
+class GenerationCache:
+    """SQLite-backed map of generation parameters to completed generations"""
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or GenerationCacheConfig.DB_PATH
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection per unit of work (safe across worker threads)"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Cached generation for a key
+
+        Returns:
+            {"generation_id", "params", "created_at", "images": [{"index",
+            "url", "local_path", "sha256"}]} or None
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT * FROM generations WHERE cache_key = ?', (key,)
+            ).fetchone()
+            if not row:
+                return None
+            images = conn.execute(
+                'SELECT image_index, url, local_path, sha256 FROM generation_images '
+                'WHERE cache_key = ? ORDER BY image_index',
+                (key,)
+            ).fetchall()
+
+        return {
+            "generation_id": row["generation_id"],
+            "params": json.loads(row["params"]),
+            "created_at": row["created_at"],
+            "images": [
+                {
+                    "index": image["image_index"],
+                    "url": image["url"],
+                    "local_path": image["local_path"],
+                    "sha256": image["sha256"]
+                }
+                for image in images
+            ]
+        }
+
+    def put(
+        self,
+        key: str,
+        params: Dict[str, Any],
+        generation_id: str,
+        image_urls: List[str]
+    ) -> None:
+        """Record a completed generation (replaces an older one for the same key)"""
+        with self._connect() as conn:
+            conn.execute('DELETE FROM generation_images WHERE cache_key = ?', (key,))
+            conn.execute(
+                'INSERT OR REPLACE INTO generations (cache_key, generation_id, params, created_at) '
+                'VALUES (?, ?, ?, ?)',
+                (key, generation_id, json.dumps(params, sort_keys=True), datetime.now().isoformat())
+            )
+            conn.executemany(
+                'INSERT INTO generation_images (cache_key, image_index, url) VALUES (?, ?, ?)',
+                [(key, index, url) for index, url in enumerate(image_urls)]
+            )
+
+    def set_image_file(self, key: str, index: int, local_path: str, sha256: str) -> None:
+        """Record where a cached image was downloaded to"""
+        with self._connect() as conn:
+            conn.execute(
+                'UPDATE generation_images SET local_path = ?, sha256 = ? '
+                'WHERE cache_key = ? AND image_index = ?',
+                (local_path, sha256, key, index)
+            )
+
+    def clear(self) -> int:
+        """Drop all cached generations, returns the number removed"""
+        with self._connect() as conn:
+            removed = conn.execute('DELETE FROM generations').rowcount
+            conn.execute('DELETE FROM generation_images')
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            generations = conn.execute('SELECT COUNT(*) FROM generations').fetchone()[0]
+            images = conn.execute(
+                'SELECT COUNT(*), COUNT(sha256) FROM generation_images'
+            ).fetchone()
+
+        return {
+            "db_path": self.db_path,
+            "generations": generations,
+            "images": images[0],
+            "downloaded_images": images[1]
+        }
+
+
+# ==============================================================================
+# CLI INTERFACE
+# ==============================================================================
+
+def main():
+    """Command line interface"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect the Leonardo generation cache")
+    parser.add_argument("command", choices=["status", "clear"], help="status: totals, clear: drop all entries")
+    parser.add_argument("--db", default=GenerationCacheConfig.DB_PATH, help="SQLite database path")
+
+    args = parser.parse_args()
+    cache = GenerationCache(args.db)
+
+    if args.command == "clear":
+        result = {"removed": cache.clear()}
+    else:
+        result = cache.stats()
+
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
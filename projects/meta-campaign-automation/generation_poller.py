@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+LEONARDO GENERATION POLLER
+==========================
+One background poller for all in-flight Leonardo generations.
+
+Instead of every caller sleeping in its own loop on a single generation
+ID, callers register generation IDs and get a concurrent.futures.Future
+back. One thread checks the generations in order of their next due time:
+- Checks are scheduled adaptively from observed completion times: the
+  first check lands around the median duration of recent generations,
+  overdue generations back off exponentially.
+- The total status request rate is bounded (POLLER_MAX_REQUESTS_PER_SECOND)
+  no matter whether 1 or 200 generations are pending.
+
+Both the sync workflow (leonardo_canva_workflow) and the async flow
+(complete_meta_flow, via asyncio.wrap_future) share the same poller.
+
+Usage:
+    poller = get_generation_poller()
+    future = poller.track(generation_id, client.get_generation_status)
+    future.add_done_callback(on_done)   # or future.result()
+"""
+
+import os
+import time
+import logging
+import threading
+import statistics
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# (generation_id) -> (status, images)
+StatusFetcher = Callable[[str], Tuple[str, List[Dict[str, Any]]]]
+
+
+# ==============================================================================
+# CONFIGURATION
+# ==============================================================================
+
+class PollerConfig:
+    """Generation Poller Configuration"""
+    # Upper bound on status requests across all tracked generations
+    MAX_REQUESTS_PER_SECOND = float(os.getenv('POLLER_MAX_REQUESTS_PER_SECOND', '4'))
+
+    # Delay of the first check before any completion times are known
+    INITIAL_DELAY = 5  # seconds
+
+    # Bounds for the adaptive check interval
+    MIN_INTERVAL = 1  # seconds
+    MAX_INTERVAL = 15  # seconds
+
+    # Completion times remembered for the adaptive schedule
+    HISTORY_SIZE = 50
+
+    # Consecutive failed status requests before a generation is given up
+    MAX_STATUS_ERRORS = 3
+
+    # Idle seconds before the poller thread exits (restarted on demand)
+    IDLE_TIMEOUT = 30
+
+
+class GenerationFailedError(Exception):
+    """Leonardo reported the generation as FAILED"""
+
+
+@dataclass
+class _TrackedGeneration:
+    generation_id: str
+    fetch_status: StatusFetcher
+    future: Future
+    submitted_at: float
+    deadline: float
+    next_check: float
+    checks: int = 0
+    errors: int = 0
+
+
+# ==============================================================================
+# POLLER
+# ==============================================================================
+
+class GenerationPoller:
+    """
+    Track many Leonardo generations with one rate-bounded polling thread
+
+    Usage:
+        poller = GenerationPoller()
+        images = poller.track(generation_id, client.get_generation_status).result()
+    """
+
+    def __init__(self, max_requests_per_second: float = None):
+        self.max_requests_per_second = max_requests_per_second or PollerConfig.MAX_REQUESTS_PER_SECOND
+
+        self._generations: Dict[str, _TrackedGeneration] = {}
+        self._durations: deque = deque(maxlen=PollerConfig.HISTORY_SIZE)
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._last_request = 0.0
+
+    def track(
+        self,
+        generation_id: str,
+        fetch_status: StatusFetcher,
+        max_wait: float = 120
+    ) -> Future:
+        """
+        Start tracking a generation
+
+        Args:
+            generation_id: Leonardo generation ID
+            fetch_status: Single status check, returns (status, images)
+            max_wait: Seconds before the future fails with TimeoutError
+
+        Returns:
+            Future resolving to the generated images, or raising
+            GenerationFailedError / TimeoutError
+        """
+        now = time.time()
+
+        with self._condition:
+            existing = self._generations.get(generation_id)
+            if existing:
+                return existing.future
+
+            future = Future()
+            future.set_running_or_notify_cancel()
+            self._generations[generation_id] = _TrackedGeneration(
+                generation_id=generation_id,
+                fetch_status=fetch_status,
+                future=future,
+                submitted_at=now,
+                deadline=now + max_wait,
+                next_check=now + self._first_delay()
+            )
+
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name='leonardo-generation-poller',
+                    daemon=True
+                )
+                self._thread.start()
+
+            self._condition.notify()
+
+        return future
+
+    def pending(self) -> int:
+        """Number of generations still being polled"""
+        return len(self._generations)
+
+    def expected_duration(self) -> Optional[float]:
+        """Median duration of recently completed generations"""
+        if not self._durations:
+            return None
+        return statistics.median(self._durations)
+
+    # ==========================================================================
+    # SCHEDULING
+    # ==========================================================================
+
+    def _first_delay(self) -> float:
+        expected = self.expected_duration()
+        if expected is None:
+            return PollerConfig.INITIAL_DELAY
+        # Check slightly before the typical completion time
+        return max(PollerConfig.MIN_INTERVAL, expected * 0.9)
+
+    def _next_delay(self, generation: _TrackedGeneration, now: float) -> float:
+        expected = self.expected_duration()
+        elapsed = now - generation.submitted_at
+
+        if expected is not None and elapsed < expected:
+            delay = expected - elapsed
+        else:
+            # Overdue (or nothing known yet): back off exponentially
+            delay = PollerConfig.MIN_INTERVAL * 2 ** max(generation.checks - 1, 0)
+
+        return min(max(delay, PollerConfig.MIN_INTERVAL), PollerConfig.MAX_INTERVAL)
+
+    # ==========================================================================
+    # POLL LOOP
+    # ==========================================================================
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if not self._generations:
+                    self._condition.wait(PollerConfig.IDLE_TIMEOUT)
+                    if not self._generations:
+                        self._thread = None
+                        return
+                    continue
+
+                generation = min(self._generations.values(), key=lambda g: g.next_check)
+                delay = generation.next_check - time.time()
+                if delay > 0:
+                    # Woken early by track() when a new generation arrives
+                    self._condition.wait(delay)
+                    continue
+
+            # Bound the total request rate
+            spacing = 1 / self.max_requests_per_second
+            wait = self._last_request + spacing - time.time()
+            if wait > 0:
+                time.sleep(wait)
+            self._last_request = time.time()
+
+            self._check(generation)
+
+    def _check(self, generation: _TrackedGeneration) -> None:
+        try:
+            status, images = generation.fetch_status(generation.generation_id)
+            generation.errors = 0
+        except Exception as e:
+            generation.errors += 1
+            logger.warning(f"Status check for {generation.generation_id} failed: {str(e)}")
+            if generation.errors >= PollerConfig.MAX_STATUS_ERRORS:
+                self._finish(generation, error=e)
+                return
+            status, images = None, []
+
+        now = time.time()
+        generation.checks += 1
+
+        if status == "COMPLETE":
+            self._durations.append(now - generation.submitted_at)
+            logger.info(f"Generation complete: {generation.generation_id} ({len(images)} images)")
+            self._finish(generation, result=images)
+        elif status == "FAILED":
+            self._finish(generation, error=GenerationFailedError("Generation failed"))
+        elif now >= generation.deadline:
+            self._finish(generation, error=TimeoutError("Generation timed out"))
+        else:
+            with self._condition:
+                generation.next_check = min(
+                    now + self._next_delay(generation, now),
+                    generation.deadline
+                )
+
+    def _finish(
+        self,
+        generation: _TrackedGeneration,
+        result: List[Dict[str, Any]] = None,
+        error: Exception = None
+    ) -> None:
+        with self._condition:
+            self._generations.pop(generation.generation_id, None)
+
+        if error is not None:
+            generation.future.set_exception(error)
+        else:
+            generation.future.set_result(result)
+
+
+_poller: Optional[GenerationPoller] = None
+_poller_lock = threading.Lock()
+
+
+def get_generation_poller() -> GenerationPoller:
+    """Get or create the poller shared by all Leonardo clients in this process"""
+    global _poller
+    with _poller_lock:
+        if _poller is None:
+            _poller = GenerationPoller()
+        return _poller
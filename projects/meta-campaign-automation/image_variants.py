@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+IMAGE VARIANTS
+==============
+Derive platform formats (feed, square, story, LinkedIn) locally from one
+high-resolution master image, instead of a Leonardo generation per format.
+
+Each variant is cut from the master with a smart crop: the crop window
+slides along the axis being cut and lands where the image has the most
+detail (edge energy), with a mild pull towards the centre. When a crop
+would keep less than MIN_CROP_COVERAGE of the master, the master is
+padded instead: fitted whole onto a blurred, dimmed enlargement of itself.
+
+The master must cover the largest variant on both axes (master_size),
+otherwise the variants are upscaled crops. Leonardo generates at most
+MAX_GENERATION_SIDE pixels per side, so a larger master is generated at
+generation_size and then upscaled by Leonardo (upscale_factor) before
+any variant is cut from it.
+
+Rendering runs in a shared process pool so it scales across cores.
+
+Usage:
+    futures = submit_variants([
+        VariantSpec(master_path, './out/story.png', 1080, 1920),
+        VariantSpec(master_path, './out/feed.png', 1200, 628),
+    ])
+    paths = [future.result() for future in futures]
+"""
+
+import os
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor, Future
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image, ImageEnhance, ImageFilter, ImageOps
+
+from streaming_io import atomic_output
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+# ==============================================================================
+# CONFIGURATION
+# ==============================================================================
+
+class VariantConfig:
+    """Image Variant Configuration"""
+    # Worker processes for rendering (default: one per core)
+    MAX_WORKERS = int(os.getenv('IMAGE_VARIANT_WORKERS', '0')) or os.cpu_count() or 1
+
+    # Smallest fraction of the master a crop may keep before padding instead
+    MIN_CROP_COVERAGE = float(os.getenv('IMAGE_VARIANT_MIN_CROP_COVERAGE', '0.5'))
+
+    # Longest side of the thumbnail the crop position is computed on
+    ANALYSIS_SIZE = 256
+
+    # Weight of the pull towards the centre (0 = detail only)
+    CENTER_BIAS = 0.5
+
+    # Background of padded variants
+    PAD_BLUR_RADIUS = 40
+    PAD_BRIGHTNESS = 0.7
+
+    # Largest width/height Leonardo generates (multiples of 8)
+    MAX_GENERATION_SIDE = 1536
+
+
+@dataclass(frozen=True)
+class VariantSpec:
+    """One variant to render from a master image"""
+    master_path: str
+    output_path: str
+    width: int
+    height: int
+    mode: str = 'auto'  # 'crop', 'pad' or 'auto' (crop unless too much is lost)
+
+
+# ==============================================================================
+# MASTER SIZE
+# ==============================================================================
+
+def master_size(sizes: Sequence[Tuple[int, int]]) -> Tuple[int, int]:
+    """
+    Smallest square master every size can be cropped from without upscaling
+
+    A square crops every format at full height (portrait) or full width
+    (landscape), so it must be as large as the largest side of any size:
+    1920x1920 for a 1080x1920 story next to a 1200x628 feed image.
+    """
+    side = max(max(size) for size in sizes)
+    return side, side
+
+
+def generation_size(size: Tuple[int, int], max_side: int = None) -> Tuple[int, int]:
+    """Size to request from Leonardo: size scaled down to max_side, in multiples of 8"""
+    max_side = max_side or VariantConfig.MAX_GENERATION_SIDE
+    scale = min(1.0, max_side / max(size))
+    return tuple(max(8, int(side * scale) // 8 * 8) for side in size)
+
+
+def upscale_factor(current: Tuple[int, int], required: Tuple[int, int]) -> float:
+    """Factor that makes current cover required on both axes (1.0 if it already does)"""
+    return max(1.0, required[0] / current[0], required[1] / current[1])
+
+
+def image_size(path: str) -> Tuple[int, int]:
+    """Width and height of an image file (reads the header only)"""
+    with Image.open(path) as image:
+        width, height = image.size
+        # EXIF orientations 5-8 are rotated by 90 degrees (see exif_transpose)
+        if image.getexif().get(0x0112, 1) in (5, 6, 7, 8):
+            return height, width
+        return width, height
+
+
+# ==============================================================================
+# RENDERING (runs in worker processes)
+# ==============================================================================
+
+def _crop_offset(energy: np.ndarray, window: int) -> int:
+    """Start of the window along a 1-D energy profile with the most weighted energy"""
+    positions = np.arange(len(energy) - window + 1)
+    centre = (len(energy) - window) / 2
+
+    cumulative = np.concatenate(([0.0], np.cumsum(energy)))
+    totals = cumulative[window:] - cumulative[:-window]
+    totals = totals / (totals.max() or 1.0)
+
+    if centre > 0:
+        totals = totals * (1 - VariantConfig.CENTER_BIAS * ((positions - centre) / centre) ** 2)
+
+    return int(np.argmax(totals))
+
+
+def smart_crop(image: Image.Image, target_ratio: float) -> Image.Image:
+    """Crop to target_ratio (width / height) keeping the most detailed region"""
+    width, height = image.size
+    if abs(width / height - target_ratio) < 1e-3:
+        return image
+
+    # Edge energy on a small grayscale copy
+    scale = VariantConfig.ANALYSIS_SIZE / max(width, height)
+    thumbnail = image.convert('L').resize(
+        (max(1, round(width * scale)), max(1, round(height * scale))),
+        Image.BILINEAR
+    )
+    pixels = np.asarray(thumbnail, dtype=np.float32)
+    energy = np.zeros_like(pixels)
+    energy[:, 1:] += np.abs(np.diff(pixels, axis=1))
+    energy[1:, :] += np.abs(np.diff(pixels, axis=0))
+
+    if width / height > target_ratio:
+        crop_width = round(height * target_ratio)
+        window = max(1, round(crop_width * scale))
+        left = round(_crop_offset(energy.sum(axis=0), window) / scale)
+        left = min(max(left, 0), width - crop_width)
+        return image.crop((left, 0, left + crop_width, height))
+
+    crop_height = round(width / target_ratio)
+    window = max(1, round(crop_height * scale))
+    top = round(_crop_offset(energy.sum(axis=1), window) / scale)
+    top = min(max(top, 0), height - crop_height)
+    return image.crop((0, top, width, top + crop_height))
+
+
+def pad_to_size(image: Image.Image, width: int, height: int) -> Image.Image:
+    """Fit the whole image onto a blurred, dimmed enlargement of itself"""
+    background = ImageOps.fit(image, (width, height), Image.LANCZOS)
+    background = background.filter(ImageFilter.GaussianBlur(VariantConfig.PAD_BLUR_RADIUS))
+    background = ImageEnhance.Brightness(background).enhance(VariantConfig.PAD_BRIGHTNESS)
+
+    foreground = ImageOps.contain(image, (width, height), Image.LANCZOS)
+    background.paste(
+        foreground,
+        ((width - foreground.width) // 2, (height - foreground.height) // 2)
+    )
+    return background
+
+
+def render_variant(spec: VariantSpec) -> str:
+    """
+    Render one variant (top-level so worker processes can run it)
+
+    Returns:
+        spec.output_path
+    """
+    with Image.open(spec.master_path) as master:
+        image = ImageOps.exif_transpose(master).convert('RGB')
+
+    target_ratio = spec.width / spec.height
+    ratio = image.width / image.height
+    coverage = min(ratio / target_ratio, target_ratio / ratio)
+
+    mode = spec.mode
+    if mode == 'auto':
+        mode = 'crop' if coverage >= VariantConfig.MIN_CROP_COVERAGE else 'pad'
+
+    if mode == 'pad':
+        variant = pad_to_size(image, spec.width, spec.height)
+    else:
+        variant = smart_crop(image, target_ratio).resize((spec.width, spec.height), Image.LANCZOS)
+
+    with atomic_output(spec.output_path) as f:
+        variant.save(f, format='PNG')
+
+    return spec.output_path
+
+
+# ==============================================================================
+# PROCESS POOL
+# ==============================================================================
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_variant_executor() -> ProcessPoolExecutor:
+    """Get or create the process pool shared by all variant rendering in this process"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=VariantConfig.MAX_WORKERS)
+        return _executor
+
+
+def submit_variants(specs: List[VariantSpec]) -> List[Future]:
+    """Queue variants on the shared process pool, one future per spec (resolving to its path)"""
+    executor = get_variant_executor()
+    return [executor.submit(render_variant, spec) for spec in specs]
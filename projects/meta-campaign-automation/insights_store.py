@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+CAMPAIGN INSIGHTS STORE
+=======================
+Local SQLite time-series store of daily per-campaign metrics.
+
+Reports, budget optimization and CPL calculations read from this store
+instead of refetching insights from Meta on every request. An incremental
+sync job only fetches days that are not final yet (Meta keeps restating
+recent days while conversions are attributed).
+
+Tables:
+- campaign_daily: one row per (campaign_id, date) with additive metrics
+- campaigns: latest known name/status/daily budget per campaign
+- sync_state: watermark of the last date that is considered final
+
+Usage:
+    store = InsightsStore()
+    store.sync(MetaApiClient())
+    rows = store.campaign_totals(since, until)
+
+CLI:
+    python insights_store.py sync          # Incremental sync (backfills on first run)
+    python insights_store.py sync --full   # Re-fetch the backfill window
+
+The backfill (and any gap longer than the async insights threshold) runs
+as an async report job that is polled until done, so it only runs from
+the CLI; POST /api/report/sync performs short incremental syncs only.
+"""
+
+import os
+import json
+import sqlite3
+import logging
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, Optional, List, Iterator
+
+from meta_api_client import MetaApiClient, get_action_value, is_long_date_range
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+# ==============================================================================
+# CONFIGURATION
+# ==============================================================================
+
+class InsightsStoreConfig:
+    """Insights Store Configuration"""
+    DB_PATH = os.getenv('INSIGHTS_DB_PATH', './data/insights.db')
+
+    # Days before today that Meta may still restate (attribution window)
+    FINAL_AFTER_DAYS = int(os.getenv('INSIGHTS_FINAL_AFTER_DAYS', '3'))
+
+    # History to fetch on the first sync
+    BACKFILL_DAYS = int(os.getenv('INSIGHTS_BACKFILL_DAYS', '90'))
+
+    # Rows per executemany batch while syncing
+    WRITE_BATCH_SIZE = 500
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS campaign_daily (
+    campaign_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    campaign_name TEXT,
+    spend REAL NOT NULL DEFAULT 0,
+    impressions INTEGER NOT NULL DEFAULT 0,
+    clicks INTEGER NOT NULL DEFAULT 0,
+    leads INTEGER NOT NULL DEFAULT 0,
+    fetched_at TEXT NOT NULL,
+    PRIMARY KEY (campaign_id, date)
+);
+CREATE INDEX IF NOT EXISTS idx_campaign_daily_date ON campaign_daily (date);
+
+CREATE TABLE IF NOT EXISTS campaigns (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    status TEXT,
+    daily_budget INTEGER,
+    updated_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+# ==============================================================================
+# INSIGHTS STORE
+# ==============================================================================
+
+class InsightsStore:
+    """
+    SQLite-backed daily campaign metrics
+
+    Usage:
+        store = InsightsStore('./data/insights.db')
+        store.sync(api_client)
+        totals = store.campaign_totals(date(2024, 1, 1), date(2024, 1, 31))
+    """
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or InsightsStoreConfig.DB_PATH
+
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+
+            # Stores created before daily budgets were kept
+            columns = {row['name'] for row in conn.execute('PRAGMA table_info(campaigns)')}
+            if 'daily_budget' not in columns:
+                conn.execute('ALTER TABLE campaigns ADD COLUMN daily_budget INTEGER')
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection per unit of work (safe across Flask threads)"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    # ==========================================================================
+    # SYNC STATE
+    # ==========================================================================
+
+    def get_final_watermark(self) -> Optional[date]:
+        """Last date whose metrics are stored and considered final"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM sync_state WHERE key = 'final_watermark'"
+            ).fetchone()
+        return date.fromisoformat(row['value']) if row else None
+
+    def _set_sync_state(self, conn: sqlite3.Connection, key: str, value: str) -> None:
+        conn.execute(
+            'INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)',
+            (key, value)
+        )
+
+    def has_data(self) -> bool:
+        """Check whether at least one sync has completed"""
+        return self.get_final_watermark() is not None
+
+    def get_last_sync(self) -> Optional[str]:
+        """ISO timestamp of the last completed sync"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM sync_state WHERE key = 'last_sync'"
+            ).fetchone()
+        return row['value'] if row else None
+
+    # ==========================================================================
+    # INCREMENTAL SYNC
+    # ==========================================================================
+
+    def sync_range(self, full: bool = False, today: date = None) -> Dict[str, date]:
+        """Dates the next sync fetches: after the final watermark, or the backfill window"""
+        today = today or date.today()
+        watermark = None if full else self.get_final_watermark()
+
+        if watermark:
+            since = watermark + timedelta(days=1)
+        else:
+            since = today - timedelta(days=InsightsStoreConfig.BACKFILL_DAYS)
+
+        return {'since': since, 'until': today}
+
+    def needs_backfill(self, full: bool = False, today: date = None) -> bool:
+        """True if the next sync is a long-range (async report) fetch, for the CLI only"""
+        sync_range = self.sync_range(full, today)
+        return is_long_date_range(time_range={
+            'since': sync_range['since'].isoformat(),
+            'until': sync_range['until'].isoformat()
+        })
+
+    def sync(
+        self,
+        api_client: MetaApiClient,
+        full: bool = False,
+        today: date = None
+    ) -> Dict[str, Any]:
+        """
+        Fetch daily campaign metrics for every day that is not final yet
+
+        The first sync (or full=True) backfills BACKFILL_DAYS. Later syncs
+        start the day after the final watermark, so only the last
+        FINAL_AFTER_DAYS (plus any missed days) are refetched.
+
+        Args:
+            api_client: Meta API client
+            full: Ignore the watermark and refetch the backfill window
+            today: Override the current date (for backfills/testing)
+
+        Returns:
+            Sync summary with the fetched range and number of rows
+        """
+        today = today or date.today()
+        watermark = None if full else self.get_final_watermark()
+        sync_range = self.sync_range(full, today)
+        since, until = sync_range['since'], sync_range['until']
+        final_cutoff = today - timedelta(days=InsightsStoreConfig.FINAL_AFTER_DAYS)
+
+        logger.info(f"Syncing insights {since.isoformat()} .. {until.isoformat()}")
+
+        rows = api_client.iter_account_insights(
+            level='campaign',
+            fields=['campaign_id', 'campaign_name', 'spend', 'impressions', 'clicks', 'actions'],
+            time_range={'since': since.isoformat(), 'until': until.isoformat()},
+            time_increment=1
+        )
+
+        fetched_at = datetime.now().isoformat()
+        num_rows = 0
+        batch = []
+
+        with self._connect() as conn:
+            for row in rows:
+                batch.append((
+                    row.get('campaign_id'),
+                    row.get('date_start'),
+                    row.get('campaign_name'),
+                    float(row.get('spend', 0)),
+                    int(row.get('impressions', 0)),
+                    int(row.get('clicks', 0)),
+                    get_action_value(row.get('actions', [])),
+                    fetched_at
+                ))
+
+                if len(batch) >= InsightsStoreConfig.WRITE_BATCH_SIZE:
+                    num_rows += self._write_daily_rows(conn, batch)
+                    batch = []
+
+            num_rows += self._write_daily_rows(conn, batch)
+
+            for campaign in api_client.iter_campaigns(fields=['id', 'name', 'status', 'daily_budget']):
+                conn.execute(
+                    'INSERT OR REPLACE INTO campaigns (id, name, status, daily_budget, updated_at) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (
+                        campaign['id'],
+                        campaign.get('name'),
+                        campaign.get('status'),
+                        int(campaign['daily_budget']) if campaign.get('daily_budget') else None,
+                        fetched_at
+                    )
+                )
+
+            new_watermark = max(final_cutoff, watermark) if watermark else final_cutoff
+            self._set_sync_state(conn, 'final_watermark', new_watermark.isoformat())
+            self._set_sync_state(conn, 'last_sync', fetched_at)
+
+        logger.info(f"Synced {num_rows} daily insight rows, final through {new_watermark.isoformat()}")
+
+        return {
+            'since': since.isoformat(),
+            'until': until.isoformat(),
+            'rows': num_rows,
+            'final_watermark': new_watermark.isoformat(),
+            'synced_at': fetched_at
+        }
+
+    def _write_daily_rows(self, conn: sqlite3.Connection, batch: List[tuple]) -> int:
+        if not batch:
+            return 0
+        conn.executemany(
+            'INSERT OR REPLACE INTO campaign_daily '
+            '(campaign_id, date, campaign_name, spend, impressions, clicks, leads, fetched_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            batch
+        )
+        return len(batch)
+
+    # ==========================================================================
+    # QUERIES
+    # ==========================================================================
+
+    def campaign_totals(self, since: date, until: date) -> List[Dict[str, Any]]:
+        """
+        Sum daily metrics per campaign over a date range (inclusive)
+
+        Returns:
+            Rows with campaign_id, campaign_name, spend, impressions, clicks, leads
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                '''
+                SELECT campaign_id,
+                       MAX(campaign_name) AS campaign_name,
+                       SUM(spend) AS spend,
+                       SUM(impressions) AS impressions,
+                       SUM(clicks) AS clicks,
+                       SUM(leads) AS leads
+                FROM campaign_daily
+                WHERE date BETWEEN ? AND ?
+                GROUP BY campaign_id
+                ''',
+                (since.isoformat(), until.isoformat())
+            ).fetchall()
+
+        return [dict(row) for row in rows]
+
+    def campaign_daily(
+        self,
+        since: date,
+        until: date,
+        campaign_ids: List[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Daily metric rows ordered by campaign and date"""
+        query = 'SELECT * FROM campaign_daily WHERE date BETWEEN ? AND ?'
+        params: List[Any] = [since.isoformat(), until.isoformat()]
+
+        if campaign_ids:
+            query += f" AND campaign_id IN ({','.join('?' * len(campaign_ids))})"
+            params.extend(campaign_ids)
+
+        query += ' ORDER BY campaign_id, date'
+
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+
+        return [dict(row) for row in rows]
+
+    def get_campaigns(self) -> Dict[str, Dict[str, Any]]:
+        """Latest known campaign names, statuses and daily budgets (cents) keyed by campaign ID"""
+        with self._connect() as conn:
+            rows = conn.execute('SELECT id, name, status, daily_budget FROM campaigns').fetchall()
+
+        return {row['id']: dict(row) for row in rows}
+
+
+# ==============================================================================
+# CLI INTERFACE
+# ==============================================================================
+
+def main():
+    """Command line interface"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Sync Meta campaign insights into the local store"
+    )
+    parser.add_argument(
+        "command",
+        choices=["sync", "status"],
+        help="sync: fetch non-final days, status: show sync state"
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Ignore the watermark and refetch the backfill window"
+    )
+    parser.add_argument(
+        "--db",
+        default=InsightsStoreConfig.DB_PATH,
+        help="SQLite database path"
+    )
+
+    args = parser.parse_args()
+    store = InsightsStore(args.db)
+
+    if args.command == "sync":
+        result = store.sync(MetaApiClient(), full=args.full)
+    else:
+        watermark = store.get_final_watermark()
+        result = {
+            'db_path': store.db_path,
+            'final_watermark': watermark.isoformat() if watermark else None,
+            'last_sync': store.get_last_sync(),
+            'campaigns': len(store.get_campaigns())
+        }
+
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
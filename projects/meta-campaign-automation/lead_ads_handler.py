@@ -11,6 +11,7 @@ Features:
 - Pipedrive deal creation
 - Email notification to team
 - Zapier webhook forwarding
+- Failed integrations kept as dead letters for replay (integration_outbox.py)
 
 Webhook URL: https://your-domain.com/webhook/meta-leads
 """
@@ -22,10 +23,13 @@ import hashlib
 import logging
 from datetime import datetime
 from typing import Dict, Any, Optional, List
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 from flask import Flask, request, jsonify
 import requests
 
+from circuit_breaker import get_breaker, server_error, CircuitOpenError
+from integration_outbox import get_outbox, register_handler, ensure
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -222,7 +226,9 @@ class LeadAdsWebhookHandler:
         }
 
         try:
-            response = requests.get(url, params=params, timeout=30)
+            response = get_breaker('meta').call(
+                requests.get, url, params=params, timeout=30, failure_if=server_error
+            )
             result = response.json()
 
             if 'error' in result:
@@ -259,7 +265,7 @@ class LeadAdsWebhookHandler:
             logger.info(f"Fetched lead data: {lead_data.email}")
             return lead_data
 
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, CircuitOpenError) as e:
             logger.error(f"Failed to fetch lead data: {str(e)}")
             return None
 
@@ -271,39 +277,35 @@ class LeadAdsWebhookHandler:
         2. Create Pipedrive deal
         3. Forward to Zapier
         4. Send email notification
+
+        Each configured integration runs through the outbox: a failed call
+        is kept as a dead letter and can be replayed with
+        `python integration_outbox.py replay`.
         """
         success = True
-
-        # 1. Slack notification
-        try:
-            self.send_slack_notification(lead)
-        except Exception as e:
-            logger.error(f"Slack notification failed: {str(e)}")
-            success = False
-
-        # 2. Pipedrive deal
-        try:
-            self.create_pipedrive_deal(lead)
-        except Exception as e:
-            logger.error(f"Pipedrive deal creation failed: {str(e)}")
-            success = False
-
-        # 3. Zapier webhook
-        try:
-            self.forward_to_zapier(lead)
-        except Exception as e:
-            logger.error(f"Zapier forwarding failed: {str(e)}")
-            success = False
-
-        # 4. Email notification
-        try:
-            self.send_email_notification(lead)
-        except Exception as e:
-            logger.error(f"Email notification failed: {str(e)}")
-            success = False
+        payload = asdict(lead)
+
+        for kind, configured, step in self._integration_steps():
+            try:
+                if configured:
+                    get_outbox().run(kind, payload, lambda _: ensure(step(lead), kind))
+                else:
+                    step(lead)  # logs that it is skipped
+            except Exception as e:
+                logger.error(f"{kind} failed for lead {lead.lead_id}: {str(e)}")
+                success = False
 
         return success
 
+    def _integration_steps(self) -> List[tuple]:
+        """(outbox kind, configured, method) per integration, in processing order"""
+        return [
+            ('lead.slack', bool(LeadAdsConfig.SLACK_WEBHOOK_URL), self.send_slack_notification),
+            ('lead.pipedrive', bool(LeadAdsConfig.PIPEDRIVE_API_TOKEN), self.create_pipedrive_deal),
+            ('lead.zapier', bool(LeadAdsConfig.ZAPIER_WEBHOOK_URL), self.forward_to_zapier),
+            ('lead.email', bool(LeadAdsConfig.SMTP_PASS), self.send_email_notification)
+        ]
+
 
 # ==============================================================================
 # SLACK INTEGRATION
@@ -405,10 +407,12 @@ class LeadAdsWebhookHandler:
         }
 
         try:
-            response = requests.post(
+            response = get_breaker('slack').call(
+                requests.post,
                 LeadAdsConfig.SLACK_WEBHOOK_URL,
                 json=payload,
-                timeout=10
+                timeout=10,
+                failure_if=server_error
             )
 
             if response.status_code == 200:
@@ -418,7 +422,7 @@ class LeadAdsWebhookHandler:
                 logger.error(f"Slack notification failed: {response.status_code}")
                 return False
 
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, CircuitOpenError) as e:
             logger.error(f"Slack request failed: {str(e)}")
             return False
 
@@ -446,14 +450,16 @@ class LeadAdsWebhookHandler:
             if lead.email:
                 # Search for existing person
                 search_url = f"{base_url}/persons/search"
-                search_response = requests.get(
+                search_response = get_breaker('pipedrive').call(
+                    requests.get,
                     search_url,
                     params={
                         'api_token': api_token,
                         'term': lead.email,
                         'fields': 'email'
                     },
-                    timeout=30
+                    timeout=30,
+                    failure_if=server_error
                 )
                 search_result = search_response.json()
 
@@ -474,11 +480,13 @@ class LeadAdsWebhookHandler:
                     person_data['phone'] = [{'value': lead.phone, 'primary': True}]
 
                 create_url = f"{base_url}/persons"
-                create_response = requests.post(
+                create_response = get_breaker('pipedrive').call(
+                    requests.post,
                     create_url,
                     params={'api_token': api_token},
                     json=person_data,
-                    timeout=30
+                    timeout=30,
+                    failure_if=server_error
                 )
                 create_result = create_response.json()
 
@@ -491,13 +499,15 @@ class LeadAdsWebhookHandler:
             if lead.company_name:
                 # Search for existing org
                 search_url = f"{base_url}/organizations/search"
-                search_response = requests.get(
+                search_response = get_breaker('pipedrive').call(
+                    requests.get,
                     search_url,
                     params={
                         'api_token': api_token,
                         'term': lead.company_name
                     },
-                    timeout=30
+                    timeout=30,
+                    failure_if=server_error
                 )
                 search_result = search_response.json()
 
@@ -509,11 +519,13 @@ class LeadAdsWebhookHandler:
                 if not org_id:
                     # Create new organization
                     create_url = f"{base_url}/organizations"
-                    create_response = requests.post(
+                    create_response = get_breaker('pipedrive').call(
+                        requests.post,
                         create_url,
                         params={'api_token': api_token},
                         json={'name': lead.company_name},
-                        timeout=30
+                        timeout=30,
+                        failure_if=server_error
                     )
                     create_result = create_response.json()
 
@@ -536,11 +548,13 @@ class LeadAdsWebhookHandler:
             # deal_data['your_custom_field_key'] = lead.job_title
 
             create_url = f"{base_url}/deals"
-            create_response = requests.post(
+            create_response = get_breaker('pipedrive').call(
+                requests.post,
                 create_url,
                 params={'api_token': api_token},
                 json=deal_data,
-                timeout=30
+                timeout=30,
+                failure_if=server_error
             )
             create_result = create_response.json()
 
@@ -552,7 +566,7 @@ class LeadAdsWebhookHandler:
                 logger.error(f"Failed to create deal: {create_result}")
                 return None
 
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, CircuitOpenError) as e:
             logger.error(f"Pipedrive API error: {str(e)}")
             return None
 
@@ -590,10 +604,12 @@ class LeadAdsWebhookHandler:
         }
 
         try:
-            response = requests.post(
+            response = get_breaker('zapier').call(
+                requests.post,
                 LeadAdsConfig.ZAPIER_WEBHOOK_URL,
                 json=payload,
-                timeout=10
+                timeout=10,
+                failure_if=server_error
             )
 
             if response.status_code == 200:
@@ -603,7 +619,7 @@ class LeadAdsWebhookHandler:
                 logger.error(f"Zapier forwarding failed: {response.status_code}")
                 return False
 
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, CircuitOpenError) as e:
             logger.error(f"Zapier request failed: {str(e)}")
             return False
 
@@ -689,10 +705,13 @@ class LeadAdsWebhookHandler:
 
             msg.attach(MIMEText(html_content, 'html'))
 
-            with smtplib.SMTP(LeadAdsConfig.SMTP_HOST, LeadAdsConfig.SMTP_PORT) as server:
-                server.starttls()
-                server.login(LeadAdsConfig.SMTP_USER, LeadAdsConfig.SMTP_PASS)
-                server.send_message(msg)
+            def deliver():
+                with smtplib.SMTP(LeadAdsConfig.SMTP_HOST, LeadAdsConfig.SMTP_PORT, timeout=30) as server:
+                    server.starttls()
+                    server.login(LeadAdsConfig.SMTP_USER, LeadAdsConfig.SMTP_PASS)
+                    server.send_message(msg)
+
+            get_breaker('smtp').call(deliver)
 
             logger.info(f"Email notification sent for lead {lead.lead_id}")
             return True
@@ -702,6 +721,28 @@ class LeadAdsWebhookHandler:
             return False
 
 
+# ==============================================================================
+# OUTBOX REPLAY
+# ==============================================================================
+
+def _register_replay_handlers():
+    """Let integration_outbox replay failed lead integrations from the stored lead"""
+    # Circuit breaker each integration calls through
+    dependencies = {
+        'lead.slack': 'slack',
+        'lead.pipedrive': 'pipedrive',
+        'lead.zapier': 'zapier',
+        'lead.email': 'smtp'
+    }
+    for kind, _, step in LeadAdsWebhookHandler()._integration_steps():
+        def replay(payload, kind=kind, method=step.__name__):
+            return ensure(getattr(LeadAdsWebhookHandler(), method)(LeadData(**payload)), kind)
+        register_handler(kind, replay, dependency=dependencies[kind])
+
+
+_register_replay_handlers()
+
+
 # ==============================================================================
 # FLASK APP (for standalone deployment)
 # ==============================================================================
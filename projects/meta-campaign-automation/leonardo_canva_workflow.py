@@ -6,10 +6,12 @@ Automatiseer het genereren van Meta campagne visuals via Leonardo AI
 en push ze naar Canva templates.
 
 Workflow:
-1. Genereer images via Leonardo AI API
-2. Download gegenereerde images
-3. Upload naar Canva via API
-4. Update campagne templates
+1. Genereer images via Leonardo AI API (één master per prompt variant)
+2. Download gegenereerde images (en upscale de master als die kleiner is
+   dan het grootste formaat)
+3. Leid alle formaten (feed, square, story, LinkedIn) lokaal af van de master
+4. Upload naar Canva via API
+5. Update campagne templates
 
 Vereisten:
 - LEONARDO_API_KEY: Leonardo AI API key
@@ -18,14 +20,23 @@ Vereisten:
 
 import os
 import json
-import time
+import queue
 import logging
 import requests
+from concurrent.futures import ThreadPoolExecutor, Future
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
 
+from asset_store import AssetStore
+from generation_cache import GenerationCache, generation_key
+from generation_poller import get_generation_poller
+from image_variants import (
+    VariantSpec, submit_variants, master_size, generation_size, upscale_factor, image_size
+)
+from streaming_io import stream_download
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -49,6 +60,18 @@ class Config:
     # Output directory for generated images
     OUTPUT_DIR = os.getenv('IMAGE_OUTPUT_DIR', './generated_images')
 
+    # Pipeline concurrency: generations in flight at Leonardo, and parallel
+    # download + Canva upload workers
+    MAX_CONCURRENT_GENERATIONS = int(os.getenv('LEONARDO_MAX_CONCURRENT_GENERATIONS', '10'))
+    MAX_CONCURRENT_TRANSFERS = int(os.getenv('WORKFLOW_MAX_CONCURRENT_TRANSFERS', '4'))
+
+    # Max seconds to wait for a generation (polling is done by generation_poller)
+    GENERATION_TIMEOUT = 120
+
+    # Max seconds to wait for an upscale of a master that is smaller than
+    # the largest variant (image_variants.master_size)
+    UPSCALE_TIMEOUT = 300
+
 
 class AspectRatio(Enum):
     """Standard aspect ratios for Meta ads"""
@@ -58,6 +81,15 @@ class AspectRatio(Enum):
     LINKEDIN = "1.91:1"         # 1200x628
 
 
+# Delivered image size per aspect ratio
+VARIANT_SIZES = {
+    AspectRatio.FACEBOOK_FEED: (1200, 675),
+    AspectRatio.INSTAGRAM_SQUARE: (1080, 1080),
+    AspectRatio.INSTAGRAM_STORY: (1080, 1920),
+    AspectRatio.LINKEDIN: (1200, 628),
+}
+
+
 class LeonardoModel(Enum):
     """Leonardo AI Models"""
     LEONARDO_DIFFUSION_XL = "1e60896f-3c26-4296-8ecc-53e2afecc132"
@@ -206,9 +238,9 @@ class LeonardoClient:
         logger.info(f"Generation started: {generation_id}")
         return generation_id
 
-    def get_generation(self, generation_id: str, max_wait: int = 120) -> List[Dict]:
+    def get_generation(self, generation_id: str, max_wait: int = Config.GENERATION_TIMEOUT) -> List[Dict]:
         """
-        Poll for generation results
+        Wait for generation results
 
         Args:
             generation_id: ID from generate_image
@@ -217,46 +249,100 @@ class LeonardoClient:
         Returns:
             List of generated image data
         """
-        start_time = time.time()
+        return self.track_generation(generation_id, max_wait).result()
 
-        while time.time() - start_time < max_wait:
-            response = requests.get(
-                f"{Config.LEONARDO_BASE_URL}/generations/{generation_id}",
-                headers=self.headers,
-                timeout=30
-            )
+    def track_generation(self, generation_id: str, max_wait: int = Config.GENERATION_TIMEOUT) -> Future:
+        """
+        Hand a generation to the shared poller
 
-            if response.status_code != 200:
-                raise Exception(f"Failed to get generation: {response.status_code}")
+        Returns:
+            Future with the generated image data (raises GenerationFailedError
+            or TimeoutError)
+        """
+        return get_generation_poller().track(generation_id, self.get_generation_status, max_wait)
 
-            result = response.json()
-            generation = result.get("generations_by_pk", {})
-            status = generation.get("status")
+    def get_generation_status(self, generation_id: str) -> Tuple[str, List[Dict]]:
+        """
+        Check a generation once (no waiting)
 
-            if status == "COMPLETE":
-                images = generation.get("generated_images", [])
-                logger.info(f"Generation complete: {len(images)} images")
-                return images
+        Returns:
+            (status, images) - images is empty until status is COMPLETE
+        """
+        response = requests.get(
+            f"{Config.LEONARDO_BASE_URL}/generations/{generation_id}",
+            headers=self.headers,
+            timeout=30
+        )
+
+        if response.status_code != 200:
+            raise Exception(f"Failed to get generation: {response.status_code}")
 
-            elif status == "FAILED":
-                raise Exception("Generation failed")
+        generation = response.json().get("generations_by_pk", {})
+        status = generation.get("status")
+        images = generation.get("generated_images", []) if status == "COMPLETE" else []
 
-            logger.info(f"Generation status: {status}, waiting...")
-            time.sleep(5)
+        return status, images
 
-        raise TimeoutError("Generation timed out")
+    def upscale_image(self, image_id: str, factor: float, max_wait: int = Config.UPSCALE_TIMEOUT) -> str:
+        """
+        Upscale a generated image with Leonardo's universal upscaler
 
-    def download_image(self, image_url: str, output_path: str) -> str:
-        """Download generated image to local file"""
-        response = requests.get(image_url, timeout=60)
+        Args:
+            image_id: Generated image ID (from get_generation_status)
+            factor: Upscale multiplier (Leonardo accepts 1.0-2.0)
+
+        Returns:
+            URL of the upscaled image
+        """
+        response = requests.post(
+            f"{Config.LEONARDO_BASE_URL}/variations/universal-upscaler",
+            headers=self.headers,
+            json={
+                "generatedImageId": image_id,
+                "upscaleMultiplier": round(min(max(factor, 1.0), 2.0), 2),
+                "ultraUpscaleStyle": "REALISTIC"
+            },
+            timeout=60
+        )
+
+        if response.status_code != 200:
+            logger.error(f"Leonardo upscale error: {response.text}")
+            raise Exception(f"Leonardo upscale error: {response.status_code}")
+
+        variation_id = response.json().get("universalUpscaler", {}).get("id")
+        logger.info(f"Upscale started: {variation_id} (x{factor:.2f})")
+
+        images = get_generation_poller().track(variation_id, self.get_variation_status, max_wait).result()
+        return images[0]["url"]
+
+    def get_variation_status(self, variation_id: str) -> Tuple[str, List[Dict]]:
+        """
+        Check an upscale once (no waiting)
+
+        Returns:
+            (status, images) - images is empty until status is COMPLETE
+        """
+        response = requests.get(
+            f"{Config.LEONARDO_BASE_URL}/variations/{variation_id}",
+            headers=self.headers,
+            timeout=30
+        )
 
         if response.status_code != 200:
-            raise Exception(f"Failed to download image: {response.status_code}")
+            raise Exception(f"Failed to get variation: {response.status_code}")
 
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        variations = response.json().get("generated_image_variation_generic", [])
+        status = variations[0].get("status") if variations else None
+        images = [v for v in variations if v.get("url")] if status == "COMPLETE" else []
 
-        with open(output_path, 'wb') as f:
-            f.write(response.content)
+        return status, images
+
+    def download_image(self, image_url: str, output_path: str) -> str:
+        """Download generated image to local file (streamed in chunks)"""
+        try:
+            stream_download(image_url, output_path, timeout=60)
+        except requests.HTTPError as e:
+            raise Exception(f"Failed to download image: {e.response.status_code}")
 
         logger.info(f"Image saved: {output_path}")
         return output_path
@@ -325,11 +411,11 @@ class CanvaClient:
         upload_url = upload_data.get("upload_url")
         asset_id = upload_data.get("asset_id")
 
-        # Upload the file
+        # Upload the file (requests streams the handle from disk)
         with open(file_path, 'rb') as f:
             upload_response = requests.put(
                 upload_url,
-                data=f.read(),
+                data=f,
                 headers={"Content-Type": "image/png"},
                 timeout=120
             )
@@ -367,20 +453,69 @@ class CanvaClient:
 # WORKFLOW ORCHESTRATOR
 # ==============================================================================
 
+@dataclass
+class GenerationJob:
+    """One prompt variant to generate for a campaign, delivered in one or more aspect ratios"""
+    campaign_key: str
+    variant_name: str
+    prompt: str
+    aspect_ratios: List[AspectRatio]
+
+    @property
+    def ratio_label(self) -> str:
+        return ", ".join(ratio.value for ratio in self.aspect_ratios)
+
+    @property
+    def required_size(self) -> Tuple[int, int]:
+        """Smallest master the job's variants need: the variant itself, or a square covering all of them"""
+        if len(self.aspect_ratios) == 1:
+            return VARIANT_SIZES[self.aspect_ratios[0]]
+        return master_size([VARIANT_SIZES[ratio] for ratio in self.aspect_ratios])
+
+    def errors(self, error: Exception, index: int = None) -> List[Dict[str, Any]]:
+        """Error entries for every aspect ratio of the job (one image if index is given)"""
+        entry = {"variant": self.variant_name, "error": str(error)}
+        if index is not None:
+            entry["index"] = index + 1
+        return [dict(entry, aspect_ratio=ratio.value) for ratio in self.aspect_ratios]
+
+
 class CampaignImageWorkflow:
     """
     Orchestrate the complete workflow:
-    Leonardo AI generation → Download → Canva upload
+    Leonardo AI generation → Download → Aspect-ratio variants → Canva upload
+
+    Each prompt variant is generated once: with a single aspect ratio at
+    that ratio's native size, with several as a square master from which
+    every ratio is cropped locally (image_variants, in a process pool).
+    A master smaller than the largest variant on either axis (e.g. a
+    1536px square for a 1080x1920 story) is upscaled by Leonardo first,
+    so no variant is an upscaled crop.
+
+    All generations of a run are submitted up front (up to
+    MAX_CONCURRENT_GENERATIONS in flight) and polled together by the
+    shared generation poller; finished
+    images are downloaded and uploaded to Canva by a worker pool while the
+    other generations are still running. Wall time approaches that of the
+    slowest generation instead of the sum of all of them.
+
+    Completed generations are recorded in the generation cache; with
+    reuse=True, cached prompt/model/size combinations are served from it
+    and only missing ones are sent to Leonardo.
 
     Usage:
-        workflow = CampaignImageWorkflow()
+        workflow = CampaignImageWorkflow(max_concurrent_transfers=args.concurrency)
         results = workflow.generate_campaign_images("voor_na_vergelijking")
     """
 
-    def __init__(self):
+    def __init__(self, max_concurrent_transfers: int = None, reuse: bool = False):
         self.leonardo = LeonardoClient() if Config.LEONARDO_API_KEY else None
         self.canva = CanvaClient() if Config.CANVA_ACCESS_TOKEN else None
         self.output_dir = Config.OUTPUT_DIR
+        self.asset_store = AssetStore()
+        self.generation_cache = GenerationCache()
+        self.reuse = reuse
+        self.max_concurrent_transfers = max_concurrent_transfers or Config.MAX_CONCURRENT_TRANSFERS
 
     def generate_campaign_images(
         self,
@@ -402,107 +537,274 @@ class CampaignImageWorkflow:
         if not self.leonardo:
             raise ValueError("Leonardo API key not configured")
 
+        jobs = self._campaign_jobs(campaign_key, [aspect_ratio])
+        job_results = self._run_pipeline(jobs, upload_to_canva)
+
+        return self._campaign_result(campaign_key, aspect_ratio, job_results)
+
+    def generate_all_campaigns(
+        self,
+        aspect_ratios: List[AspectRatio] = None,
+        upload_to_canva: bool = True,
+        campaign_keys: List[str] = None
+    ) -> Dict[str, Any]:
+        """Generate images for all (or the given) campaigns, one generation per prompt variant in one pipeline"""
+        if not self.leonardo:
+            raise ValueError("Leonardo API key not configured")
+
+        if aspect_ratios is None:
+            aspect_ratios = [AspectRatio.FACEBOOK_FEED]
+
+        all_results = {
+            "generated_at": datetime.now().isoformat(),
+            "campaigns": {}
+        }
+
+        groups = [
+            (campaign_key, self._campaign_jobs(campaign_key, aspect_ratios))
+            for campaign_key in (campaign_keys or CAMPAIGN_PROMPTS.keys())
+        ]
+        job_results = self._run_pipeline(
+            [job for _, jobs in groups for job in jobs],
+            upload_to_canva
+        )
+
+        offset = 0
+        for campaign_key, jobs in groups:
+            all_results["campaigns"][campaign_key] = [
+                self._campaign_result(campaign_key, ratio, job_results[offset:offset + len(jobs)])
+                for ratio in aspect_ratios
+            ]
+            offset += len(jobs)
+
+        return all_results
+
+    def _campaign_jobs(self, campaign_key: str, aspect_ratios: List[AspectRatio]) -> List[GenerationJob]:
         campaign = CAMPAIGN_PROMPTS.get(campaign_key)
         if not campaign:
             raise ValueError(f"Unknown campaign: {campaign_key}")
 
-        results = {
-            "campaign": campaign["name"],
+        return [
+            GenerationJob(campaign_key, variant_name, prompt, aspect_ratios)
+            for variant_name, prompt in campaign["prompts"].items()
+        ]
+
+    def _generation_params(self, job: GenerationJob) -> Dict[str, Any]:
+        """Leonardo parameters for a job (also the generation cache key)"""
+        if len(job.aspect_ratios) == 1:
+            width, height = self.leonardo.get_dimensions_for_ratio(job.aspect_ratios[0])
+        else:
+            width, height = generation_size(job.required_size)
+        return {
+            "prompt": job.prompt,
+            "negative_prompt": NEGATIVE_PROMPT,
+            "model_id": LeonardoModel.PHOTOREAL.value,
+            "width": width,
+            "height": height,
+            "guidance_scale": 7.0,
+            "preset_style": "PHOTOGRAPHY"
+        }
+
+    def _campaign_result(
+        self,
+        campaign_key: str,
+        aspect_ratio: AspectRatio,
+        job_results: List[List[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        return {
+            "campaign": CAMPAIGN_PROMPTS[campaign_key]["name"],
             "timestamp": datetime.now().isoformat(),
             "aspect_ratio": aspect_ratio.value,
-            "images": []
+            "images": [
+                image
+                for images in job_results
+                for image in images
+                if image["aspect_ratio"] == aspect_ratio.value
+            ]
         }
 
-        width, height = self.leonardo.get_dimensions_for_ratio(aspect_ratio)
-
-        for variant_name, prompt in campaign["prompts"].items():
-            logger.info(f"Generating {campaign['name']} - {variant_name}")
+    def _run_pipeline(
+        self,
+        jobs: List[GenerationJob],
+        upload_to_canva: bool
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Submit, poll, download and upload all jobs concurrently
 
-            try:
-                # Generate images
-                generation_id = self.leonardo.generate_image(
-                    prompt=prompt,
-                    width=width,
-                    height=height,
-                    num_images=4
-                )
+        Returns:
+            Image results per job (in job order); a failed generation or
+            transfer yields one {"variant", "aspect_ratio", "error"} entry
+            per aspect ratio it was meant to deliver
+        """
+        job_results: List[List[Dict[str, Any]]] = [[] for _ in jobs]
+        transfers: List[Tuple[int, int, Future]] = []
+        generations: Dict[int, Tuple[str, Dict[str, Any], str]] = {}
+        completed: queue.Queue = queue.Queue()
+        next_job, in_flight = 0, 0
+
+        def fail(job_index: int, error: Exception) -> None:
+            job = jobs[job_index]
+            logger.error(f"Error generating {job.campaign_key} {job.variant_name} ({job.ratio_label}): {str(error)}")
+            job_results[job_index] = job.errors(error)
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_transfers) as executor:
+            while next_job < len(jobs) or in_flight:
+                # Keep Leonardo busy up to the concurrency cap
+                while next_job < len(jobs) and in_flight < Config.MAX_CONCURRENT_GENERATIONS:
+                    job_index, job = next_job, jobs[next_job]
+                    next_job += 1
+                    params = self._generation_params(job)
+                    cache_key = generation_key(**params)
+
+                    cached = self.generation_cache.get(cache_key) if self.reuse else None
+                    if cached and cached["images"]:
+                        logger.info(f"Reusing generation {cached['generation_id']} for {job.campaign_key} - {job.variant_name} ({job.ratio_label})")
+                        for image in cached["images"]:
+                            transfers.append((job_index, image["index"], executor.submit(
+                                self._transfer_image, job, image["index"], image["url"],
+                                upload_to_canva, cache_key, sha256=image["sha256"]
+                            )))
+                        continue
 
-                # Wait for completion
-                generated_images = self.leonardo.get_generation(generation_id)
+                    logger.info(f"Generating {job.campaign_key} - {job.variant_name} ({job.ratio_label})")
 
-                for i, img_data in enumerate(generated_images):
-                    image_url = img_data.get("url")
-                    if not image_url:
+                    try:
+                        generation_id = self.leonardo.generate_image(**params, num_images=4)
+                    except Exception as e:
+                        fail(job_index, e)
                         continue
 
-                    # Download image
-                    filename = f"{campaign_key}_{variant_name}_{i+1}.png"
-                    output_path = os.path.join(
-                        self.output_dir,
-                        campaign_key,
-                        filename
+                    generations[job_index] = (cache_key, params, generation_id)
+
+                    # The shared poller resolves the future; hand it back to this thread
+                    self.leonardo.track_generation(generation_id).add_done_callback(
+                        lambda future, job_index=job_index: completed.put((job_index, future))
                     )
+                    in_flight += 1
 
-                    local_path = self.leonardo.download_image(image_url, output_path)
+                if not in_flight:
+                    continue
 
-                    image_result = {
-                        "variant": variant_name,
-                        "index": i + 1,
-                        "local_path": local_path,
-                        "leonardo_url": image_url,
-                        "canva_asset_id": None
-                    }
+                job_index, future = completed.get()
+                in_flight -= 1
 
-                    # Upload to Canva
-                    if upload_to_canva and self.canva:
-                        asset_name = f"{campaign['name']} - {variant_name} #{i+1}"
-                        canva_id = self.canva.upload_asset(local_path, asset_name)
-                        image_result["canva_asset_id"] = canva_id
+                try:
+                    images = future.result()
+                except Exception as e:
+                    fail(job_index, e)
+                    continue
 
-                    results["images"].append(image_result)
+                cache_key, params, generation_id = generations[job_index]
+                images = [img for img in images if img.get("url")]
+                self.generation_cache.put(cache_key, params, generation_id, [img["url"] for img in images])
 
-            except Exception as e:
-                logger.error(f"Error generating {variant_name}: {str(e)}")
-                results["images"].append({
-                    "variant": variant_name,
-                    "error": str(e)
-                })
+                for i, image in enumerate(images):
+                    transfers.append((job_index, i, executor.submit(
+                        self._transfer_image, jobs[job_index], i, image["url"], upload_to_canva, cache_key,
+                        image_id=image.get("id")
+                    )))
 
-        return results
+            for job_index, index, future in transfers:
+                try:
+                    job_results[job_index].extend(future.result())
+                except Exception as e:
+                    logger.error(f"Error transferring {jobs[job_index].variant_name} image: {str(e)}")
+                    job_results[job_index].extend(jobs[job_index].errors(e, index))
 
-    def generate_all_campaigns(
+        return job_results
+
+    def _transfer_image(
         self,
-        aspect_ratios: List[AspectRatio] = None
-    ) -> Dict[str, Any]:
-        """Generate images for all campaigns"""
-        if aspect_ratios is None:
-            aspect_ratios = [AspectRatio.FACEBOOK_FEED]
+        job: GenerationJob,
+        index: int,
+        image_url: str,
+        upload_to_canva: bool,
+        cache_key: str,
+        sha256: str = None,
+        image_id: str = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Download one generated image, derive its aspect ratios and upload them to Canva
 
-        all_results = {
-            "generated_at": datetime.now().isoformat(),
-            "campaigns": {}
-        }
+        A cached image (sha256 given) is restored from the asset store
+        instead of downloaded when the store still has its bytes; the
+        stored master is the upscaled one, so reuse does not upscale again.
+        Variants render deterministically, so a rerun reproduces identical
+        files and the asset store skips their Canva uploads.
 
-        for campaign_key in CAMPAIGN_PROMPTS.keys():
-            campaign_results = []
+        Returns:
+            One result per aspect ratio of the job (an error entry for a
+            ratio whose rendering or upload failed)
+        """
+        master_name = f"{job.campaign_key}_{job.variant_name}_master_{index+1}.png"
+        master_path = os.path.join(self.output_dir, job.campaign_key, master_name)
+
+        reused = bool(sha256) and self.asset_store.materialize(sha256, master_path)
+        if not reused:
+            master_path = self.leonardo.download_image(image_url, master_path)
+
+        required = job.required_size
+        factor = upscale_factor(image_size(master_path), required)
+        if factor > 1.0:
+            if image_id:
+                self.leonardo.download_image(self.leonardo.upscale_image(image_id, factor), master_path)
+            else:
+                logger.warning(
+                    f"{master_name} is smaller than {required[0]}x{required[1]} and has no "
+                    f"Leonardo image ID to upscale; variants will be upscaled crops"
+                )
 
-            for ratio in aspect_ratios:
-                try:
-                    result = self.generate_campaign_images(
-                        campaign_key,
-                        aspect_ratio=ratio
-                    )
-                    campaign_results.append(result)
-                except Exception as e:
-                    logger.error(f"Failed {campaign_key} ({ratio}): {str(e)}")
-                    campaign_results.append({
-                        "aspect_ratio": ratio.value,
-                        "error": str(e)
-                    })
+        sha256 = self.asset_store.add(master_path)
+        self.generation_cache.set_image_file(cache_key, index, master_path, sha256)
+
+        specs = []
+        for ratio in job.aspect_ratios:
+            ratio_slug = ratio.value.replace(':', 'x')
+            filename = f"{job.campaign_key}_{job.variant_name}_{ratio_slug}_{index+1}.png"
+            width, height = VARIANT_SIZES[ratio]
+            specs.append(VariantSpec(
+                master_path,
+                os.path.join(self.output_dir, job.campaign_key, filename),
+                width,
+                height
+            ))
+
+        image_results = []
+        for ratio, future in zip(job.aspect_ratios, submit_variants(specs)):
+            try:
+                local_path = future.result()
+            except Exception as e:
+                logger.error(f"Error rendering {job.variant_name} #{index+1} ({ratio.value}): {str(e)}")
+                image_results.append({
+                    "variant": job.variant_name,
+                    "index": index + 1,
+                    "aspect_ratio": ratio.value,
+                    "error": str(e)
+                })
+                continue
+
+            image_result = {
+                "variant": job.variant_name,
+                "index": index + 1,
+                "aspect_ratio": ratio.value,
+                "local_path": local_path,
+                "master_path": master_path,
+                "leonardo_url": image_url,
+                "sha256": self.asset_store.add(local_path),
+                "reused": reused,
+                "canva_asset_id": None
+            }
+
+            if upload_to_canva and self.canva:
+                campaign_name = CAMPAIGN_PROMPTS[job.campaign_key]["name"]
+                asset_name = f"{campaign_name} - {job.variant_name} #{index+1} ({ratio.value})"
+                image_result["canva_asset_id"] = self.asset_store.upload_once(
+                    local_path, 'canva', lambda path: self.canva.upload_asset(path, asset_name)
+                )
 
-            all_results["campaigns"][campaign_key] = campaign_results
+            image_results.append(image_result)
 
-        return all_results
+        return image_results
 
 
 # ==============================================================================
@@ -524,15 +826,26 @@ def main():
     )
     parser.add_argument(
         "--ratio",
-        choices=["16:9", "1:1", "9:16", "1.91:1"],
+        choices=["16:9", "1:1", "9:16", "1.91:1", "all"],
         default="16:9",
-        help="Aspect ratio"
+        help="Aspect ratio (all: every ratio cropped from one master per variant)"
     )
     parser.add_argument(
         "--no-canva",
         action="store_true",
         help="Skip Canva upload"
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=Config.MAX_CONCURRENT_TRANSFERS,
+        help="Parallel image downloads/Canva uploads"
+    )
+    parser.add_argument(
+        "--reuse",
+        action="store_true",
+        help="Serve cached generations, only generate missing prompt/size combinations"
+    )
     parser.add_argument(
         "--list",
         action="store_true",
@@ -560,11 +873,15 @@ def main():
     }
     aspect_ratio = ratio_map.get(args.ratio, AspectRatio.FACEBOOK_FEED)
 
-    workflow = CampaignImageWorkflow()
+    workflow = CampaignImageWorkflow(max_concurrent_transfers=args.concurrency, reuse=args.reuse)
 
-    if args.campaign == "all":
-        print("\nGenerating all campaigns...")
-        results = workflow.generate_all_campaigns([aspect_ratio])
+    if args.campaign == "all" or args.ratio == "all":
+        print("\nGenerating all campaigns..." if args.campaign == "all" else f"\nGenerating {args.campaign}...")
+        results = workflow.generate_all_campaigns(
+            list(AspectRatio) if args.ratio == "all" else [aspect_ratio],
+            upload_to_canva=not args.no_canva,
+            campaign_keys=None if args.campaign == "all" else [args.campaign]
+        )
     else:
         print(f"\nGenerating {args.campaign}...")
         results = workflow.generate_campaign_images(
@@ -13,22 +13,26 @@ Endpoints:
 - /api/conversion/assessment        - Send assessment conversion event
 - /api/campaigns                    - List/create campaigns
 - /api/campaigns/<id>/insights      - Get campaign insights
-- /api/audiences                    - List audience segments
+- /api/audiences                    - List audience segments (with cached reach estimates)
+- /api/audiences/reach/refresh      - Refetch reach estimates
 - /api/report                       - Get performance report
+- /api/report/jobs                  - Submit/poll async performance reports
+- /api/report/sync                  - Sync daily insights into the local store
 
 Deploy to: Render, Railway, or Heroku
 """
 
 import os
 import json
+import time
 import logging
 from datetime import datetime
-from typing import Dict, Any
-from flask import Flask, request, jsonify
+from typing import Dict, Any, Optional
+from flask import Flask, request, jsonify, url_for
 from flask_cors import CORS
 
 # Import our modules
-from meta_api_client import MetaApiClient, MetaApiError, CampaignObjective
+from meta_api_client import MetaApiClient, MetaApiError, InsightsReportPending, CampaignObjective
 from pixel_tracking import (
     PixelCodeGenerator,
     ConversionAPI,
@@ -36,12 +40,17 @@ from pixel_tracking import (
     CustomData,
     PixelConfig
 )
+from pixel_snippets import PixelSnippetCache, snippet_response
 from lead_ads_handler import LeadAdsWebhookHandler, LeadAdsConfig
 from campaign_automation import (
     CampaignAutomationService,
     CampaignTemplates,
-    AudienceBuilder
+    AudienceBuilder,
+    SEGMENT_DEFINITIONS
 )
+from insights_store import InsightsStore
+from circuit_breaker import breaker_states, any_open
+from audience_reach import ReachEstimateCache
 
 # Configure logging
 logging.basicConfig(
@@ -56,6 +65,7 @@ CORS(app)
 
 # Initialize services
 pixel_generator = PixelCodeGenerator()
+pixel_snippets = PixelSnippetCache(pixel_generator)
 conversion_api = ConversionAPI()
 lead_handler = LeadAdsWebhookHandler()
 audience_builder = AudienceBuilder()
@@ -63,24 +73,76 @@ audience_builder = AudienceBuilder()
 # Lazy initialization for services that require tokens
 _api_client = None
 _campaign_service = None
+_insights_store = None
+
+_reach_cache = None
+_reach_disabled = False
+
+# (reach cache version, serialized /api/audiences response)
+_audiences_response = None
 
 
 def get_api_client() -> MetaApiClient:
-    """Get or create Meta API client"""
+    """
+    Get or create Meta API client (starts its background token refresh)
+
+    Interactive: long insights ranges are handed out as report runs
+    (InsightsReportPending -> 202) instead of blocking the worker.
+    """
     global _api_client
     if _api_client is None:
-        _api_client = MetaApiClient()
+        _api_client = MetaApiClient(interactive=True)
+        _api_client.start_token_refresher()
     return _api_client
 
 
+def get_insights_store() -> InsightsStore:
+    """Get or create the local insights store"""
+    global _insights_store
+    if _insights_store is None:
+        _insights_store = InsightsStore()
+    return _insights_store
+
+
+def get_reach_cache() -> Optional[ReachEstimateCache]:
+    """Get or create the reach estimate cache (starts its background refresh)"""
+    global _reach_cache, _reach_disabled
+    if _reach_cache is None:
+        if _reach_disabled:
+            return None
+        try:
+            _reach_cache = ReachEstimateCache(get_api_client(), audience_builder)
+        except ValueError as e:
+            # No access token: serve the static estimates from now on
+            logger.warning(f"Reach estimates disabled: {str(e)}")
+            _reach_disabled = True
+            return None
+        _reach_cache.start_background_refresh()
+    return _reach_cache
+
+
 def get_campaign_service() -> CampaignAutomationService:
     """Get or create campaign automation service"""
     global _campaign_service
     if _campaign_service is None:
-        _campaign_service = CampaignAutomationService(get_api_client())
+        _campaign_service = CampaignAutomationService(get_api_client(), get_insights_store())
     return _campaign_service
 
 
+@app.errorhandler(InsightsReportPending)
+def insights_report_pending(e: InsightsReportPending):
+    """Long insights ranges run as report jobs: return the job instead of waiting for it"""
+    poll_url = f'/api/report/jobs/{e.report_run_id}'
+    if request.args.get('breakdowns'):
+        poll_url += f"?breakdowns={request.args['breakdowns']}"
+
+    return jsonify({
+        'status': 'submitted',
+        'report_run_id': e.report_run_id,
+        'poll_url': poll_url
+    }), 202
+
+
 # ==============================================================================
 # HEALTH CHECK ENDPOINTS
 # ==============================================================================
@@ -104,8 +166,11 @@ def health_check():
 
 @app.route('/health', methods=['GET'])
 def health():
-    """Simple health check"""
-    return jsonify({'status': 'ok'})
+    """Simple health check, with the circuit breaker state per dependency"""
+    return jsonify({
+        'status': 'degraded' if any_open() else 'ok',
+        'dependencies': breaker_states()
+    })
 
 
 # ==============================================================================
@@ -233,33 +298,34 @@ def extract_user_data_from_typeform(answers: list) -> UserData:
 @app.route('/api/pixel/code', methods=['GET'])
 def get_pixel_code():
     """Get base Meta Pixel installation code"""
-    return jsonify({
-        'pixel_id': PixelConfig.PIXEL_ID,
-        'code': pixel_generator.get_base_pixel_code(),
-        'instructions': 'Add this code to the <head> section of your website'
-    })
+    return snippet_response(pixel_snippets.base_code(
+        {'instructions': 'Add this code to the <head> section of your website'},
+        raw=request.args.get('raw') == '1'
+    ))
 
 
 @app.route('/api/pixel/netlify', methods=['GET'])
 def get_netlify_pixel_code():
     """Get complete Netlify-ready pixel integration code"""
-    return jsonify({
-        'pixel_id': PixelConfig.PIXEL_ID,
-        'code': pixel_generator.get_netlify_integration_code(),
-        'deploy_to': 'kandidatentekortv2.netlify.app',
-        'instructions': [
-            '1. Copy the code from the "code" field',
-            '2. Add to your index.html or layout template',
-            '3. Deploy to Netlify',
-            '4. Verify in Facebook Pixel Helper extension'
-        ]
-    })
+    return snippet_response(pixel_snippets.netlify_code(
+        {
+            'deploy_to': 'kandidatentekortv2.netlify.app',
+            'instructions': [
+                '1. Copy the code from the "code" field',
+                '2. Add to your index.html or layout template',
+                '3. Deploy to Netlify',
+                '4. Verify in Facebook Pixel Helper extension'
+            ]
+        },
+        raw=request.args.get('raw') == '1'
+    ))
 
 
 @app.route('/api/pixel/event/<event_name>', methods=['GET'])
 def get_event_code(event_name: str):
     """Get JavaScript code for a specific event"""
     custom_data = request.args.to_dict()
+    raw = custom_data.pop('raw', None) == '1'
 
     # Convert string values to appropriate types
     for key in ['value', 'num_items']:
@@ -269,13 +335,7 @@ def get_event_code(event_name: str):
             except ValueError:
                 pass
 
-    code = pixel_generator.get_event_code(event_name, custom_data if custom_data else None)
-
-    return jsonify({
-        'event_name': event_name,
-        'custom_data': custom_data,
-        'code': code
-    })
+    return snippet_response(pixel_snippets.event_code(event_name, custom_data, raw=raw))
 
 
 # ==============================================================================
@@ -438,11 +498,22 @@ def campaigns():
 
 @app.route('/api/campaigns/<campaign_id>/insights', methods=['GET'])
 def campaign_insights(campaign_id: str):
-    """Get insights for a specific campaign"""
+    """
+    Get insights for a specific campaign
+
+    Ranges longer than 30 days run as a report job: the 202 response carries
+    a poll_url (this endpoint with report_run_id) that returns the campaign's
+    insights once the job is done.
+    """
     try:
         days = request.args.get('days', 7, type=int)
+        report_run_id = request.args.get('report_run_id')
         client = get_api_client()
-        insights = client.get_campaign_insights(campaign_id, f'last_{days}d')
+        if report_run_id:
+            rows = client.completed_insights_report(report_run_id)
+            insights = next((row for row in rows if row.get('campaign_id', campaign_id) == campaign_id), {})
+        else:
+            insights = client.get_campaign_insights(campaign_id, f'last_{days}d')
 
         return jsonify({
             'status': 'success',
@@ -451,6 +522,17 @@ def campaign_insights(campaign_id: str):
             'insights': insights
         })
 
+    except InsightsReportPending as e:
+        return jsonify({
+            'status': 'submitted',
+            'report_run_id': e.report_run_id,
+            'percent_complete': e.percent_complete,
+            'poll_url': url_for(
+                'campaign_insights',
+                campaign_id=campaign_id,
+                **dict(request.args, report_run_id=e.report_run_id)
+            )
+        }), 202
     except MetaApiError as e:
         return jsonify({'error': e.message}), 400
 
@@ -482,22 +564,53 @@ def get_templates():
 
 @app.route('/api/audiences', methods=['GET'])
 def get_audiences():
-    """Get all pre-defined audience segments"""
-    segments = audience_builder.get_all_segments()
+    """Get all pre-defined audience segments with cached reach estimates"""
+    global _audiences_response
+
+    # Estimates come from the background-refreshed cache, never from Meta directly
+    reach_cache = get_reach_cache()
+
+    # Serialize once per set of estimates (and minute, for the stale flags), serve the cached bytes
+    version = (reach_cache.version if reach_cache else None, int(time.time() // 60))
+    if _audiences_response is None or _audiences_response[0] != version:
+        estimates = reach_cache.get_all() if reach_cache else {}
+        segments = []
+
+        for name, description, segment, estimated_reach, recommended_budget in SEGMENT_DEFINITIONS:
+            estimate = estimates.get(segment.value)
+            segments.append({
+                'name': name,
+                'description': description,
+                'segment_key': segment.value,
+                'estimated_reach': estimate['estimated_reach'] if estimate else estimated_reach,
+                'reach_estimate': estimate,
+                'recommended_budget_eur': recommended_budget / 100
+            })
 
-    return jsonify({
-        'status': 'success',
-        'segments': [
-            {
-                'name': s.name,
-                'description': s.description,
-                'segment_key': s.segment.value,
-                'estimated_reach': s.estimated_reach,
-                'recommended_budget_eur': s.recommended_budget / 100
-            }
-            for s in segments
-        ]
-    })
+        body = json.dumps({'status': 'success', 'segments': segments}).encode('utf-8')
+        _audiences_response = (version, body)
+
+    return app.response_class(_audiences_response[1], mimetype='application/json')
+
+
+@app.route('/api/audiences/reach/refresh', methods=['POST'])
+def refresh_audience_reach():
+    """Refetch all reach estimates now (normally done in the background)"""
+    try:
+        reach_cache = get_reach_cache()
+        if reach_cache is None:
+            return jsonify({'error': 'META_ACCESS_TOKEN is not configured'}), 400
+
+        fetched = reach_cache.refresh(force=True)
+
+        return jsonify({
+            'status': 'success',
+            'fetched': fetched,
+            'errors': reach_cache.get_errors()
+        })
+
+    except MetaApiError as e:
+        return jsonify({'error': e.message}), 400
 
 
 @app.route('/api/audiences/<segment_key>/targeting', methods=['GET'])
@@ -507,13 +620,17 @@ def get_audience_targeting(segment_key: str):
 
     try:
         segment = AudienceSegment(segment_key)
-        targeting = audience_builder.get_targeting(segment)
 
-        return jsonify({
-            'status': 'success',
-            'segment': segment_key,
-            'targeting': targeting
-        })
+        # Targeting JSON is cached by the builder; only the envelope is added here
+        body = b''.join([
+            b'{"status":"success","segment":',
+            json.dumps(segment.value).encode('utf-8'),
+            b',"targeting":',
+            audience_builder.get_targeting_json(segment),
+            b'}'
+        ])
+
+        return app.response_class(body, mimetype='application/json')
 
     except ValueError:
         return jsonify({
@@ -531,8 +648,13 @@ def get_report():
     """Get performance report for all campaigns"""
     try:
         days = request.args.get('days', 7, type=int)
+        breakdowns = request.args.get('breakdowns')
         service = get_campaign_service()
-        report = service.get_performance_report(days)
+        report = service.get_performance_report(
+            days,
+            breakdowns=breakdowns.split(',') if breakdowns else None,
+            use_store=request.args.get('source') != 'live'
+        )
 
         return jsonify({
             'status': 'success',
@@ -543,19 +665,133 @@ def get_report():
         return jsonify({'error': e.message}), 400
 
 
+@app.route('/api/report/sync', methods=['POST'])
+def sync_report_store():
+    """
+    Incrementally sync daily campaign insights into the local store
+
+    Call from a cron job (e.g. Render Cron or Zapier schedule) every few
+    hours; /api/report and /api/report/recommendations read from the store.
+
+    The backfill (first or full sync, or a gap longer than 30 days) is a
+    long async report job and runs from the CLI only:
+    `python insights_store.py sync [--full]`.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        store = get_insights_store()
+        full = data.get('full', False)
+
+        if store.needs_backfill(full):
+            return jsonify({
+                'error': 'Backfill needed: run `python insights_store.py sync'
+                         + (' --full' if full else '') + '` from the CLI',
+                'sync_range': {key: value.isoformat() for key, value in store.sync_range(full).items()}
+            }), 409
+
+        result = store.sync(get_api_client(), full=full)
+
+        return jsonify({
+            'status': 'success',
+            'sync': result
+        })
+
+    except MetaApiError as e:
+        return jsonify({'error': e.message}), 400
+
+
+@app.route('/api/report/jobs', methods=['POST'])
+def submit_report_job():
+    """
+    Submit a performance report as an async insights job
+
+    Use for long ranges (last_90d, custom ranges) so the request returns
+    immediately; poll /api/report/jobs/<report_run_id> for the result.
+
+    Request body:
+    {
+        "days": 90,
+        "since": "2024-01-01",      (optional, with "until")
+        "until": "2024-03-31",
+        "breakdowns": ["age", "gender"]
+    }
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        time_range = None
+        if data.get('since') and data.get('until'):
+            time_range = {'since': data['since'], 'until': data['until']}
+
+        service = get_campaign_service()
+        report_run_id = service.submit_performance_report(
+            days=data.get('days', 7),
+            time_range=time_range,
+            breakdowns=data.get('breakdowns')
+        )
+
+        return jsonify({
+            'status': 'submitted',
+            'report_run_id': report_run_id,
+            'poll_url': f'/api/report/jobs/{report_run_id}'
+        }), 202
+
+    except MetaApiError as e:
+        return jsonify({'error': e.message}), 400
+
+
+@app.route('/api/report/jobs/<report_run_id>', methods=['GET'])
+def get_report_job(report_run_id: str):
+    """Get status of an async performance report, including the report once complete"""
+    try:
+        breakdowns = request.args.get('breakdowns')
+        service = get_campaign_service()
+        job = service.get_performance_report_job(
+            report_run_id,
+            breakdowns=breakdowns.split(',') if breakdowns else None
+        )
+
+        return jsonify({
+            'status': 'success',
+            'job': job
+        })
+
+    except MetaApiError as e:
+        return jsonify({'error': e.message}), 400
+
+
 @app.route('/api/report/recommendations', methods=['GET'])
 def get_recommendations():
-    """Get budget optimization recommendations"""
+    """
+    Get budget optimization recommendations
+
+    Without a synced insights store, lookbacks longer than 30 days run as a
+    report job: the 202 response carries a poll_url (this endpoint with
+    report_run_id) that returns the recommendations once the job is done.
+    """
     try:
         target_cpl = request.args.get('target_cpl', 25.0, type=float)
+        total_budget = request.args.get('total_budget', None, type=float)
+        days = request.args.get('days', None, type=int)
         service = get_campaign_service()
-        recommendations = service.optimize_budgets(target_cpl)
+        recommendations = service.optimize_budgets(
+            target_cpl,
+            total_budget=total_budget,
+            days=days,
+            report_run_id=request.args.get('report_run_id')
+        )
 
         return jsonify({
             'status': 'success',
             'recommendations': recommendations
         })
 
+    except InsightsReportPending as e:
+        return jsonify({
+            'status': 'submitted',
+            'report_run_id': e.report_run_id,
+            'percent_complete': e.percent_complete,
+            'poll_url': url_for('get_recommendations', **dict(request.args, report_run_id=e.report_run_id))
+        }), 202
     except MetaApiError as e:
         return jsonify({'error': e.message}), 400
 
@@ -566,7 +802,7 @@ def get_recommendations():
 
 @app.route('/api/token/status', methods=['GET'])
 def token_status():
-    """Check OAuth token status"""
+    """Check OAuth token status (served from the client's token info cache)"""
     try:
         client = get_api_client()
         token_info = client.get_token_info()
@@ -575,8 +811,9 @@ def token_status():
             'status': 'success',
             'token_valid': client.is_token_valid(),
             'token_type': token_info.token_type,
-            'expires_at': token_info.expires_at.isoformat(),
-            'scopes': token_info.scopes
+            'expires_at': None if token_info.expires_at == datetime.max else token_info.expires_at.isoformat(),
+            'scopes': token_info.scopes,
+            'checked_at': datetime.fromtimestamp(token_info.checked_at).isoformat()
         })
 
     except MetaApiError as e:
@@ -612,6 +849,15 @@ def refresh_token():
         }), 400
 
 
+@app.route('/api/meta/usage', methods=['GET'])
+def meta_usage():
+    """Rate limit utilization per Meta quota, as reported by the usage headers"""
+    return jsonify({
+        'status': 'success',
+        'buckets': get_api_client().throttle.snapshot()
+    })
+
+
 # ==============================================================================
 # TEST ENDPOINTS
 # ==============================================================================
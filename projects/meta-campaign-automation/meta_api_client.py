@@ -7,6 +7,7 @@ OAuth token management and Graph API integration for Meta campaigns.
 Features:
 - OAuth 2.0 token management with auto-refresh
 - Graph API wrapper for ads, audiences, and insights
+- Rate limit pacing from Meta's usage headers (see meta_throttle.py)
 - Lead Ads webhook processing
 - Conversion API for server-side tracking
 
@@ -24,12 +25,18 @@ import time
 import hmac
 import hashlib
 import logging
+import threading
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, List
+from urllib.parse import urlencode, quote
+from typing import Dict, Any, Optional, List, Iterator
 import requests
 from dataclasses import dataclass
 from enum import Enum
 
+from pii_hashing import hash_pii
+from circuit_breaker import get_breaker, server_error, CircuitOpenError
+from meta_throttle import MetaThrottle, ThrottleBlocked, ThrottleConfig, RATE_LIMIT_CODES, shared_throttle
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -52,11 +59,39 @@ class MetaConfig:
 
     # API Settings
     API_VERSION = 'v18.0'
-    BASE_URL = f'https://graph.facebook.com/{API_VERSION}'
+    # Override to point at a local fake Graph server (see fake_graph_server.py)
+    BASE_URL = os.getenv('META_GRAPH_BASE_URL', f'https://graph.facebook.com/{API_VERSION}')
 
     # Token refresh threshold (7 days before expiry)
     TOKEN_REFRESH_THRESHOLD_DAYS = 7
 
+    # debug_token results are reused for this long (and never past expires_at),
+    # so a revoked token is noticed within the hour
+    TOKEN_INFO_TTL = int(os.getenv('META_TOKEN_INFO_TTL', '3600'))  # seconds
+
+    # The background refresher renews the token this many days before the
+    # refresh threshold, so is_token_valid() never turns False on its own
+    TOKEN_REFRESH_AHEAD_DAYS = 3
+    TOKEN_REFRESH_CHECK_INTERVAL = int(os.getenv('META_TOKEN_REFRESH_INTERVAL', '3600'))  # seconds
+
+    # Default page size for list endpoints (Graph API max is 500 for most edges)
+    DEFAULT_PAGE_SIZE = 100
+
+    # Insights ranges longer than this run as async report jobs
+    ASYNC_INSIGHTS_THRESHOLD_DAYS = 30
+    ASYNC_POLL_INITIAL_INTERVAL = 2  # seconds
+    ASYNC_POLL_MAX_INTERVAL = 30  # seconds
+    ASYNC_POLL_MAX_WAIT = 900  # seconds
+
+    # Date presets that always cover more than ASYNC_INSIGHTS_THRESHOLD_DAYS
+    LONG_DATE_PRESETS = ['last_quarter', 'this_year', 'last_year', 'maximum']
+
+    # Graph API batch requests accept at most 50 operations
+    BATCH_MAX_SIZE = 50
+
+    # Rows per customer-file audience users request
+    AUDIENCE_USERS_MAX_BATCH = 10000
+
 
 class CampaignObjective(Enum):
     """Meta Campaign Objectives"""
@@ -84,8 +119,9 @@ class TokenInfo:
     """OAuth Token Information"""
     access_token: str
     token_type: str
-    expires_at: datetime
+    expires_at: datetime  # datetime.max for tokens that never expire
     scopes: List[str]
+    checked_at: float = 0.0  # time.time() of the debug_token call
 
 
 # ==============================================================================
@@ -99,10 +135,16 @@ class MetaApiClient:
     Usage:
         client = MetaApiClient()
 
-        # Check token status
+        # Check token status (cached, no Graph call on repeat checks)
         if not client.is_token_valid():
             client.refresh_long_lived_token()
 
+        # Or keep the token renewed in the background
+        client.start_token_refresher()
+
+        # In HTTP request handlers: never block on long insights ranges
+        client = MetaApiClient(interactive=True)
+
         # Create campaign
         campaign = client.create_campaign(
             name="Kandidatentekort - HR Directors",
@@ -110,11 +152,23 @@ class MetaApiClient:
         )
     """
 
-    def __init__(self, access_token: str = None):
+    def __init__(self, access_token: str = None, throttle: MetaThrottle = None, interactive: bool = False):
         self.access_token = access_token or MetaConfig.ACCESS_TOKEN
+        # Serving an HTTP request: long insights ranges are submitted as
+        # report runs and raise InsightsReportPending instead of being polled,
+        # and throttled calls fail fast instead of sleeping and retrying
+        self.interactive = interactive
+        self.max_wait = ThrottleConfig.INTERACTIVE_MAX_WAIT if interactive else ThrottleConfig.MAX_WAIT
+        self.max_retries = 0 if interactive else ThrottleConfig.MAX_RETRIES
         self.ad_account_id = MetaConfig.AD_ACCOUNT_ID
         self.pixel_id = MetaConfig.PIXEL_ID
+        # Usage model and pacing (see meta_throttle.py), shared per process by default
+        self.throttle = throttle or shared_throttle
         self._token_info: Optional[TokenInfo] = None
+        # Serializes debug_token fetches and token swaps
+        self._token_lock = threading.RLock()
+        self._refresh_thread: Optional[threading.Thread] = None
+        self._stop_refresh = threading.Event()
 
         if not self.access_token:
             raise ValueError("META_ACCESS_TOKEN environment variable is required")
@@ -126,65 +180,168 @@ class MetaApiClient:
         params: Dict = None,
         data: Dict = None
     ) -> Dict[str, Any]:
-        """Make authenticated request to Meta Graph API"""
+        """
+        Make authenticated request to Meta Graph API
+
+        Calls are paced by the throttle from the usage headers of earlier
+        responses; rate limited calls wait for the block and are retried
+        (up to ThrottleConfig.MAX_RETRIES, never longer than MAX_WAIT). An
+        interactive client waits at most INTERACTIVE_MAX_WAIT and does not
+        retry, so a request handler gets a MetaApiError within seconds.
+
+        Requests go through the 'meta' circuit breaker shared with the lead
+        and Conversion API handlers; while it is open they fail at once
+        with MetaApiError.
+        """
         url = f"{MetaConfig.BASE_URL}/{endpoint}"
+        ad_account_id = endpoint.split('/')[0] if endpoint.startswith('act_') else self.ad_account_id
 
         params = params or {}
         params['access_token'] = self.access_token
 
-        try:
-            if method == 'GET':
-                response = requests.get(url, params=params, timeout=30)
-            elif method == 'POST':
-                response = requests.post(url, params=params, json=data, timeout=30)
-            elif method == 'DELETE':
-                response = requests.delete(url, params=params, timeout=30)
-            else:
-                raise ValueError(f"Unsupported HTTP method: {method}")
-
-            result = response.json()
-
-            if 'error' in result:
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.throttle.acquire(ad_account_id, self.max_wait)
+            except ThrottleBlocked as e:
+                logger.error(f"Meta API call to {endpoint or 'batch'} not sent: {str(e)}")
+                raise MetaApiError(message=str(e), code=e.code or 17)
+
+            breaker = get_breaker('meta')
+            try:
+                if method == 'GET':
+                    response = breaker.call(requests.get, url, params=params, timeout=30, failure_if=server_error)
+                elif method == 'POST':
+                    response = breaker.call(
+                        requests.post, url, params=params, json=data, timeout=30, failure_if=server_error
+                    )
+                elif method == 'DELETE':
+                    response = breaker.call(
+                        requests.delete, url, params=params, json=data, timeout=30, failure_if=server_error
+                    )
+                else:
+                    raise ValueError(f"Unsupported HTTP method: {method}")
+
+                self.throttle.update_from_headers(ad_account_id, response.headers)
+                result = response.json()
+
+            except (requests.exceptions.RequestException, CircuitOpenError) as e:
+                logger.error(f"Request failed: {str(e)}")
+                raise MetaApiError(message=str(e))
+
+            if isinstance(result, dict) and 'error' in result:
                 error = result['error']
-                logger.error(f"Meta API Error: {error.get('message')} (code: {error.get('code')})")
+                code = error.get('code')
+
+                if code in RATE_LIMIT_CODES or error.get('error_subcode') in RATE_LIMIT_CODES:
+                    wait = self.throttle.record_rate_limit(ad_account_id, code)
+                    if attempt < self.max_retries and wait <= self.max_wait:
+                        logger.warning(f"Meta API rate limited (code: {code}), retrying in {wait:.0f}s")
+                        continue
+
+                logger.error(f"Meta API Error: {error.get('message')} (code: {code})")
                 raise MetaApiError(
                     message=error.get('message'),
-                    code=error.get('code'),
+                    code=code,
                     error_subcode=error.get('error_subcode')
                 )
 
             return result
 
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Request failed: {str(e)}")
-            raise MetaApiError(message=str(e))
+    def _paginate(
+        self,
+        endpoint: str,
+        params: Dict = None,
+        page_size: int = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily iterate over all objects of a Graph API list edge
+
+        Follows the `paging.cursors.after` cursor until `paging.next` is
+        absent. Only one page is held in memory at a time.
+
+        Args:
+            endpoint: Graph API edge (e.g. act_XXX/campaigns)
+            params: Query parameters (fields, filtering, ...)
+            page_size: Objects per page (defaults to MetaConfig.DEFAULT_PAGE_SIZE)
+
+        Yields:
+            One object dict per item in the edge
+        """
+        params = dict(params or {})
+        params['limit'] = page_size or MetaConfig.DEFAULT_PAGE_SIZE
+
+        while True:
+            result = self._make_request('GET', endpoint, params=dict(params))
+
+            for item in result.get('data', []):
+                yield item
+
+            paging = result.get('paging', {})
+            after = paging.get('cursors', {}).get('after')
+            if not paging.get('next') or not after:
+                return
+
+            params['after'] = after
 
     # ==========================================================================
     # TOKEN MANAGEMENT
     # ==========================================================================
 
-    def get_token_info(self) -> TokenInfo:
-        """Get information about the current access token"""
-        result = self._make_request(
-            'GET',
-            'debug_token',
-            params={'input_token': self.access_token}
+    def _is_fresh(self, token_info: Optional[TokenInfo]) -> bool:
+        """True if cached token info still describes the current token"""
+        return (
+            token_info is not None
+            and token_info.access_token == self.access_token
+            and time.time() - token_info.checked_at < MetaConfig.TOKEN_INFO_TTL
+            and datetime.now() < token_info.expires_at
         )
 
-        data = result.get('data', {})
-        expires_at = datetime.fromtimestamp(data.get('expires_at', 0))
+    def get_token_info(self, force: bool = False) -> TokenInfo:
+        """
+        Get information about the current access token
 
-        self._token_info = TokenInfo(
-            access_token=self.access_token,
-            token_type=data.get('type', 'unknown'),
-            expires_at=expires_at,
-            scopes=data.get('scopes', [])
-        )
+        The debug_token result is cached for MetaConfig.TOKEN_INFO_TTL (and
+        never past expires_at), so repeated checks are memory reads.
+
+        Args:
+            force: Skip the cache and ask Graph API
+        """
+        token_info = self._token_info
+        if not force and self._is_fresh(token_info):
+            return token_info
+
+        with self._token_lock:
+            # Another thread may have fetched it while we waited
+            token_info = self._token_info
+            if not force and self._is_fresh(token_info):
+                return token_info
+
+            access_token = self.access_token
+            result = self._make_request(
+                'GET',
+                'debug_token',
+                params={'input_token': access_token}
+            )
+
+            data = result.get('data', {})
+            # expires_at 0 means the token never expires (system users)
+            expires_at = (
+                datetime.fromtimestamp(data['expires_at']) if data.get('expires_at')
+                else datetime.max
+            )
+
+            self._token_info = TokenInfo(
+                access_token=access_token,
+                token_type=data.get('type', 'unknown'),
+                expires_at=expires_at,
+                scopes=data.get('scopes', []),
+                checked_at=time.time()
+            )
 
         return self._token_info
 
     def is_token_valid(self) -> bool:
-        """Check if the current token is valid and not expiring soon"""
+        """Check if the current token is valid and not expiring soon (cached)"""
         try:
             token_info = self.get_token_info()
             threshold = datetime.now() + timedelta(days=MetaConfig.TOKEN_REFRESH_THRESHOLD_DAYS)
@@ -221,8 +378,71 @@ class MetaApiClient:
         return new_token
 
     def refresh_long_lived_token(self) -> str:
-        """Refresh the long-lived token (requires app permissions)"""
-        return self.exchange_for_long_lived_token(self.access_token)
+        """
+        Refresh the long-lived token (requires app permissions)
+
+        The new token replaces the current one for all threads using this
+        client. It only lives in memory: update META_ACCESS_TOKEN to keep
+        it across restarts.
+        """
+        with self._token_lock:
+            new_token = self.exchange_for_long_lived_token(self.access_token)
+            if not new_token:
+                raise MetaApiError(message="Token exchange returned no access_token")
+
+            # A single attribute assignment: requests read either the old or the new token
+            self.access_token = new_token
+            self._token_info = None
+
+            try:
+                self.get_token_info(force=True)
+            except MetaApiError as e:
+                logger.warning(f"Could not fetch info for the refreshed token: {e.message}")
+
+        logger.info("Access token refreshed (update META_ACCESS_TOKEN to keep it after a restart)")
+        return new_token
+
+    def token_needs_refresh(self) -> bool:
+        """True when the token is within the refresh window of the background refresher"""
+        token_info = self.get_token_info()
+        window = timedelta(days=MetaConfig.TOKEN_REFRESH_THRESHOLD_DAYS + MetaConfig.TOKEN_REFRESH_AHEAD_DAYS)
+        return token_info.expires_at <= datetime.now() + window
+
+    # ==========================================================================
+    # BACKGROUND TOKEN REFRESH
+    # ==========================================================================
+
+    def start_token_refresher(self, interval: int = None) -> None:
+        """Start the daemon token refresh thread (no-op if it is already running)"""
+        if self._refresh_thread and self._refresh_thread.is_alive():
+            return
+
+        if not MetaConfig.APP_ID or not MetaConfig.APP_SECRET:
+            logger.warning("META_APP_ID/META_APP_SECRET not set - token will not be refreshed automatically")
+            return
+
+        interval = interval or MetaConfig.TOKEN_REFRESH_CHECK_INTERVAL
+        self._stop_refresh.clear()
+        self._refresh_thread = threading.Thread(
+            target=self._token_refresh_loop,
+            args=(interval,),
+            name='meta-token-refresh',
+            daemon=True
+        )
+        self._refresh_thread.start()
+
+    def stop_token_refresher(self) -> None:
+        self._stop_refresh.set()
+
+    def _token_refresh_loop(self, interval: int) -> None:
+        while not self._stop_refresh.is_set():
+            try:
+                # Also re-validates the cached token info once it is older than the TTL
+                if self.token_needs_refresh():
+                    self.refresh_long_lived_token()
+            except Exception as e:
+                logger.error(f"Token refresh failed: {str(e)}")
+            self._stop_refresh.wait(interval)
 
     def get_required_permissions(self) -> List[str]:
         """Return list of required permissions for full functionality"""
@@ -262,6 +482,35 @@ class MetaApiClient:
         Returns:
             Created campaign data including ID
         """
+        result = self._make_request(
+            'POST',
+            f'{self.ad_account_id}/campaigns',
+            data=self._campaign_data(
+                name, objective, status, daily_budget, lifetime_budget, special_ad_categories
+            )
+        )
+
+        logger.info(f"Created campaign: {result.get('id')}")
+        return result
+
+    def create_campaign_request(self, batch_name: str = None, **kwargs) -> Dict[str, Any]:
+        """Batch operation creating a campaign (same arguments as create_campaign)"""
+        return batch_operation(
+            'POST',
+            f'{self.ad_account_id}/campaigns',
+            body=self._campaign_data(**kwargs),
+            name=batch_name
+        )
+
+    @staticmethod
+    def _campaign_data(
+        name: str,
+        objective: CampaignObjective = CampaignObjective.OUTCOME_LEADS,
+        status: str = 'PAUSED',
+        daily_budget: int = None,
+        lifetime_budget: int = None,
+        special_ad_categories: List[str] = None
+    ) -> Dict[str, Any]:
         data = {
             'name': name,
             'objective': objective.value,
@@ -274,14 +523,7 @@ class MetaApiClient:
         if lifetime_budget:
             data['lifetime_budget'] = lifetime_budget
 
-        result = self._make_request(
-            'POST',
-            f'{self.ad_account_id}/campaigns',
-            data=data
-        )
-
-        logger.info(f"Created campaign: {result.get('id')}")
-        return result
+        return data
 
     def get_campaign(self, campaign_id: str) -> Dict[str, Any]:
         """Get campaign details"""
@@ -295,10 +537,27 @@ class MetaApiClient:
         """Update campaign settings"""
         return self._make_request('POST', campaign_id, data=updates)
 
-    def get_campaigns(self, status_filter: str = None) -> List[Dict]:
-        """List all campaigns in the ad account"""
+    def iter_campaigns(
+        self,
+        status_filter: str = None,
+        fields: List[str] = None,
+        page_size: int = None
+    ) -> Iterator[Dict]:
+        """
+        Iterate over all campaigns in the ad account, page by page
+
+        Args:
+            status_filter: Only return campaigns with this effective_status
+            fields: Fields to select (defaults to the campaign summary fields)
+            page_size: Campaigns per Graph API page
+        """
+        default_fields = [
+            'id', 'name', 'objective', 'status', 'daily_budget',
+            'lifetime_budget', 'created_time', 'insights{spend,impressions,clicks}'
+        ]
+
         params = {
-            'fields': 'id,name,objective,status,daily_budget,lifetime_budget,created_time,insights{spend,impressions,clicks}'
+            'fields': ','.join(fields or default_fields)
         }
 
         if status_filter:
@@ -308,8 +567,11 @@ class MetaApiClient:
                 'value': [status_filter]
             }])
 
-        result = self._make_request('GET', f'{self.ad_account_id}/campaigns', params=params)
-        return result.get('data', [])
+        return self._paginate(f'{self.ad_account_id}/campaigns', params, page_size)
+
+    def get_campaigns(self, status_filter: str = None) -> List[Dict]:
+        """List all campaigns in the ad account"""
+        return list(self.iter_campaigns(status_filter))
 
     # ==========================================================================
     # AD SET MANAGEMENT
@@ -343,6 +605,45 @@ class MetaApiClient:
             start_time: When to start running
             end_time: When to stop running
         """
+        result = self._make_request(
+            'POST',
+            f'{self.ad_account_id}/adsets',
+            data=self._ad_set_data(
+                name, campaign_id, daily_budget, targeting, optimization_goal,
+                billing_event, bid_amount, status, start_time, end_time
+            )
+        )
+
+        logger.info(f"Created ad set: {result.get('id')}")
+        return result
+
+    def create_ad_set_request(self, batch_name: str = None, **kwargs) -> Dict[str, Any]:
+        """
+        Batch operation creating an ad set (same arguments as create_ad_set)
+
+        campaign_id may reference an earlier operation in the same batch,
+        e.g. batch_reference('campaign_0').
+        """
+        return batch_operation(
+            'POST',
+            f'{self.ad_account_id}/adsets',
+            body=self._ad_set_data(**kwargs),
+            name=batch_name
+        )
+
+    @staticmethod
+    def _ad_set_data(
+        name: str,
+        campaign_id: str,
+        daily_budget: int,
+        targeting: Dict,
+        optimization_goal: OptimizationGoal = OptimizationGoal.LEAD_GENERATION,
+        billing_event: str = 'IMPRESSIONS',
+        bid_amount: int = None,
+        status: str = 'PAUSED',
+        start_time: datetime = None,
+        end_time: datetime = None
+    ) -> Dict[str, Any]:
         data = {
             'name': name,
             'campaign_id': campaign_id,
@@ -360,14 +661,11 @@ class MetaApiClient:
         if end_time:
             data['end_time'] = end_time.isoformat()
 
-        result = self._make_request(
-            'POST',
-            f'{self.ad_account_id}/adsets',
-            data=data
-        )
+        return data
 
-        logger.info(f"Created ad set: {result.get('id')}")
-        return result
+    def delete_object(self, object_id: str) -> Dict[str, Any]:
+        """Delete a campaign, ad set or ad"""
+        return self._make_request('DELETE', object_id)
 
     # ==========================================================================
     # CUSTOM AUDIENCES
@@ -424,14 +722,64 @@ class MetaApiClient:
             data=data
         )
 
-    def get_custom_audiences(self) -> List[Dict]:
-        """List all custom audiences"""
-        result = self._make_request(
-            'GET',
+    def iter_custom_audiences(
+        self,
+        fields: List[str] = None,
+        page_size: int = None
+    ) -> Iterator[Dict]:
+        """Iterate over all custom audiences, page by page"""
+        default_fields = ['id', 'name', 'description', 'subtype', 'approximate_count']
+
+        return self._paginate(
             f'{self.ad_account_id}/customaudiences',
-            params={'fields': 'id,name,description,subtype,approximate_count'}
+            {'fields': ','.join(fields or default_fields)},
+            page_size
         )
-        return result.get('data', [])
+
+    def get_custom_audiences(self) -> List[Dict]:
+        """List all custom audiences"""
+        return list(self.iter_custom_audiences())
+
+    def add_audience_users(
+        self,
+        audience_id: str,
+        schema: List[str],
+        rows: List[List[str]],
+        session: Dict[str, Any] = None
+    ) -> Dict[str, Any]:
+        """
+        Add hashed users to a customer-file audience
+
+        Args:
+            audience_id: Custom audience ID
+            schema: Columns of each row, e.g. ['EMAIL', 'PHONE']
+            rows: SHA-256 hashed values per column ('' when unknown), at most
+                  MetaConfig.AUDIENCE_USERS_MAX_BATCH rows
+            session: {'session_id', 'batch_seq', 'last_batch_flag',
+                      'estimated_num_total'} for multi-request uploads
+
+        Returns:
+            {'audience_id', 'session_id', 'num_received', 'num_invalid_entries', ...}
+        """
+        data = {'payload': {'schema': schema, 'data': rows}}
+        if session:
+            data['session'] = session
+
+        return self._make_request('POST', f'{audience_id}/users', data=data)
+
+    def remove_audience_users(
+        self,
+        audience_id: str,
+        schema: List[str],
+        rows: List[List[str]],
+        session: Dict[str, Any] = None
+    ) -> Dict[str, Any]:
+        """Remove hashed users from a customer-file audience (same arguments as add_audience_users)"""
+        data = {'payload': {'schema': schema, 'data': rows}}
+        if session:
+            data['session'] = session
+
+        return self._make_request('DELETE', f'{audience_id}/users', data=data)
 
     # ==========================================================================
     # TARGETING TEMPLATES
@@ -499,6 +847,30 @@ class MetaApiClient:
             }]
         }
 
+    def get_reach_estimate(
+        self,
+        targeting: Any,
+        optimization_goal: OptimizationGoal = None
+    ) -> Dict[str, Any]:
+        """
+        Estimate the audience size of a targeting spec
+
+        Args:
+            targeting: Targeting spec dict or its JSON string
+            optimization_goal: Optional goal to estimate for
+
+        Returns:
+            {'users_lower_bound': int, 'users_upper_bound': int, 'estimate_ready': bool}
+        """
+        params = {
+            'targeting_spec': targeting if isinstance(targeting, str) else json.dumps(targeting)
+        }
+        if optimization_goal:
+            params['optimization_goal'] = optimization_goal.value
+
+        result = self._make_request('GET', f'{self.ad_account_id}/reachestimate', params=params)
+        return result.get('data', {})
+
     # ==========================================================================
     # INSIGHTS & REPORTING
     # ==========================================================================
@@ -515,16 +887,13 @@ class MetaApiClient:
             'cpc', 'cpm', 'ctr', 'actions', 'cost_per_action_type'
         ]
 
-        result = self._make_request(
-            'GET',
+        rows = self._insights(
             f'{campaign_id}/insights',
-            params={
-                'fields': ','.join(fields or default_fields),
-                'date_preset': date_preset
-            }
+            {'fields': ','.join(fields or default_fields)},
+            date_preset=date_preset
         )
 
-        return result.get('data', [{}])[0] if result.get('data') else {}
+        return next(rows, {})
 
     def get_account_insights(self, date_preset: str = 'last_30d') -> Dict[str, Any]:
         """Get performance insights for the entire ad account"""
@@ -533,16 +902,291 @@ class MetaApiClient:
             'clicks', 'reach', 'cpc', 'cpm', 'ctr'
         ]
 
-        result = self._make_request(
-            'GET',
+        rows = self._insights(
+            f'{self.ad_account_id}/insights',
+            {'fields': ','.join(fields)},
+            date_preset=date_preset
+        )
+
+        return next(rows, {})
+
+    def iter_account_insights(
+        self,
+        level: str = 'campaign',
+        date_preset: str = 'last_7d',
+        fields: List[str] = None,
+        breakdowns: List[str] = None,
+        time_range: Dict[str, str] = None,
+        page_size: int = None,
+        use_async: bool = None,
+        time_increment: int = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over account insights broken down per campaign/ad set/ad
+
+        One paginated act_<id>/insights query replaces a get_campaign_insights
+        round-trip per campaign. Long ranges run as an async report job.
+
+        Args:
+            level: campaign, adset or ad
+            date_preset: Graph API date preset (ignored when time_range is set)
+            fields: Insight fields to select
+            breakdowns: Optional breakdowns (age, gender, publisher_platform, ...)
+            time_range: Custom range {'since': 'YYYY-MM-DD', 'until': 'YYYY-MM-DD'}
+            page_size: Rows per Graph API page
+            use_async: Force (True) or disable (False) the async report flow;
+                None decides based on the length of the range
+            time_increment: Split rows per N days (1 = daily rows)
+
+        Yields:
+            One insights row per object (and breakdown value)
+        """
+        return self._insights(
             f'{self.ad_account_id}/insights',
-            params={
-                'fields': ','.join(fields),
-                'date_preset': date_preset
-            }
+            self._account_insights_params(level, fields, breakdowns, time_increment),
+            date_preset=date_preset,
+            time_range=time_range,
+            page_size=page_size,
+            use_async=use_async
         )
 
-        return result.get('data', [{}])[0] if result.get('data') else {}
+    def _account_insights_params(
+        self,
+        level: str,
+        fields: List[str] = None,
+        breakdowns: List[str] = None,
+        time_increment: int = None
+    ) -> Dict[str, Any]:
+        """Build query parameters for an account-level insights query"""
+        default_fields = [
+            'campaign_id', 'campaign_name', 'impressions', 'clicks', 'spend',
+            'reach', 'cpc', 'cpm', 'ctr', 'actions'
+        ]
+
+        params = {
+            'level': level,
+            'fields': ','.join(fields or default_fields)
+        }
+
+        if breakdowns:
+            params['breakdowns'] = ','.join(breakdowns)
+
+        if time_increment:
+            params['time_increment'] = time_increment
+
+        return params
+
+    def _insights(
+        self,
+        endpoint: str,
+        params: Dict[str, Any],
+        date_preset: str = 'last_7d',
+        time_range: Dict[str, str] = None,
+        page_size: int = None,
+        use_async: bool = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Run an insights query synchronously or as an async report job
+
+        Raises:
+            InsightsReportPending: For async jobs on an interactive client,
+                right after submitting (poll with completed_insights_report)
+        """
+        params = self._with_date_range(params, date_preset, time_range)
+
+        if use_async is None:
+            use_async = is_long_date_range(date_preset, time_range)
+
+        if not use_async:
+            return self._paginate(endpoint, params, page_size)
+
+        report_run_id = self.submit_insights_report(endpoint, params)
+        if self.interactive:
+            raise InsightsReportPending(report_run_id)
+
+        self.wait_for_insights_report(report_run_id)
+        return self.iter_insights_report(report_run_id, page_size)
+
+    @staticmethod
+    def _with_date_range(
+        params: Dict[str, Any],
+        date_preset: str = 'last_7d',
+        time_range: Dict[str, str] = None
+    ) -> Dict[str, Any]:
+        """Return a copy of params with either time_range or date_preset set"""
+        params = dict(params)
+
+        if time_range:
+            params['time_range'] = json.dumps(time_range)
+        else:
+            params['date_preset'] = date_preset
+
+        return params
+
+    # ==========================================================================
+    # ASYNC INSIGHTS REPORTS
+    # ==========================================================================
+
+    def submit_account_insights_report(
+        self,
+        level: str = 'campaign',
+        date_preset: str = 'last_7d',
+        fields: List[str] = None,
+        breakdowns: List[str] = None,
+        time_range: Dict[str, str] = None
+    ) -> str:
+        """Submit an account-level insights query as an async report run"""
+        params = self._with_date_range(
+            self._account_insights_params(level, fields, breakdowns),
+            date_preset,
+            time_range
+        )
+
+        return self.submit_insights_report(f'{self.ad_account_id}/insights', params)
+
+    def submit_insights_report(self, endpoint: str, params: Dict[str, Any]) -> str:
+        """
+        Submit an async insights report run
+
+        Args:
+            endpoint: Insights edge (e.g. act_XXX/insights or <campaign_id>/insights)
+            params: Insights query parameters
+
+        Returns:
+            report_run_id to poll with get_insights_report_status
+        """
+        result = self._make_request('POST', endpoint, params=dict(params))
+        report_run_id = result.get('report_run_id')
+
+        if not report_run_id:
+            raise MetaApiError(message=f"No report_run_id returned for {endpoint}")
+
+        logger.info(f"Submitted async insights report: {report_run_id}")
+        return report_run_id
+
+    def get_insights_report_status(self, report_run_id: str) -> Dict[str, Any]:
+        """Get async_status and async_percent_completion of a report run"""
+        return self._make_request(
+            'GET',
+            report_run_id,
+            params={'fields': 'id,async_status,async_percent_completion,date_start,date_stop'}
+        )
+
+    def completed_insights_report(
+        self,
+        report_run_id: str,
+        page_size: int = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Rows of a report run, checking its status once (no waiting)
+
+        Raises:
+            InsightsReportPending: While the job is still running
+            MetaApiError: When the job failed or was skipped
+        """
+        status = self.get_insights_report_status(report_run_id)
+        async_status = status.get('async_status')
+
+        if async_status in ('Job Failed', 'Job Skipped'):
+            raise MetaApiError(message=f"Insights report {report_run_id}: {async_status}")
+        if async_status != 'Job Completed':
+            raise InsightsReportPending(report_run_id, status.get('async_percent_completion', 0))
+
+        return self.iter_insights_report(report_run_id, page_size)
+
+    def wait_for_insights_report(
+        self,
+        report_run_id: str,
+        max_wait: int = None
+    ) -> Dict[str, Any]:
+        """
+        Poll a report run with exponential backoff until it completes
+
+        Blocks for up to ASYNC_POLL_MAX_WAIT: for CLI and cron jobs only,
+        request handlers use completed_insights_report.
+
+        Raises:
+            MetaApiError: When the job fails or is skipped
+            TimeoutError: When the job does not finish within max_wait seconds
+        """
+        max_wait = max_wait or MetaConfig.ASYNC_POLL_MAX_WAIT
+        interval = MetaConfig.ASYNC_POLL_INITIAL_INTERVAL
+        start_time = time.time()
+
+        while time.time() - start_time < max_wait:
+            status = self.get_insights_report_status(report_run_id)
+            async_status = status.get('async_status')
+
+            if async_status == 'Job Completed':
+                return status
+            if async_status in ('Job Failed', 'Job Skipped'):
+                raise MetaApiError(message=f"Insights report {report_run_id}: {async_status}")
+
+            logger.info(
+                f"Insights report {report_run_id}: {async_status} "
+                f"({status.get('async_percent_completion', 0)}%), waiting {interval}s..."
+            )
+            time.sleep(interval)
+            interval = min(interval * 2, MetaConfig.ASYNC_POLL_MAX_INTERVAL)
+
+        raise TimeoutError(f"Insights report {report_run_id} timed out")
+
+    def iter_insights_report(
+        self,
+        report_run_id: str,
+        page_size: int = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Stream the rows of a completed report run, page by page"""
+        return self._paginate(f'{report_run_id}/insights', page_size=page_size)
+
+    # ==========================================================================
+    # BATCH REQUESTS
+    # ==========================================================================
+
+    def batch(self, operations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Execute up to BATCH_MAX_SIZE operations in one Graph API call
+
+        Operations are built with batch_operation() (or the *_request
+        builders) and may depend on earlier named operations through
+        batch_reference(). Meta runs them in order; an operation whose
+        dependency failed is not executed.
+
+        Returns:
+            One result per operation, in order. Failed or skipped operations
+            are returned as {'error': {...}} instead of raising, so callers
+            can tell exactly which objects were created.
+        """
+        if len(operations) > MetaConfig.BATCH_MAX_SIZE:
+            raise ValueError(
+                f"Batch has {len(operations)} operations (max {MetaConfig.BATCH_MAX_SIZE})"
+            )
+
+        responses = self._make_request(
+            'POST',
+            '',
+            data={'batch': json.dumps(operations), 'include_headers': 'false'}
+        )
+
+        results = []
+        for operation, response in zip(operations, responses):
+            if response is None:
+                results.append({'error': {
+                    'message': f"Not executed: {operation.get('name') or operation['relative_url']}"
+                }})
+                continue
+
+            try:
+                body = json.loads(response.get('body') or '{}')
+            except ValueError:
+                body = {'error': {'message': response.get('body'), 'code': response.get('code')}}
+
+            if response.get('code', 200) >= 400 and 'error' not in body:
+                body = {'error': {'message': f"HTTP {response.get('code')}", 'code': response.get('code')}}
+
+            results.append(body)
+
+        return results
 
 
 # ==============================================================================
@@ -564,13 +1208,22 @@ class MetaApiError(Exception):
 
     def is_rate_limited(self) -> bool:
         """Check if error is due to rate limiting"""
-        return self.code == 17 or self.code == 4
+        return self.code in RATE_LIMIT_CODES
 
     def is_permission_error(self) -> bool:
         """Check if error is due to missing permissions"""
         return self.code in [10, 200, 294]
 
 
+class InsightsReportPending(Exception):
+    """An async insights report run was submitted and is not complete yet"""
+
+    def __init__(self, report_run_id: str, percent_complete: int = 0):
+        self.report_run_id = report_run_id
+        self.percent_complete = percent_complete
+        super().__init__(f"Insights report {report_run_id} is running ({percent_complete}%)")
+
+
 # ==============================================================================
 # STANDALONE FUNCTIONS
 # ==============================================================================
@@ -596,27 +1249,107 @@ def verify_webhook_signature(payload: bytes, signature: str, app_secret: str) ->
     return hmac.compare_digest(f'sha256={expected_signature}', signature)
 
 
-def hash_user_data(value: str, data_type: str = 'email') -> str:
+def get_action_value(actions: List[Dict], action_type: str = 'lead') -> int:
     """
-    Hash user data for Conversion API
+    Get the count for an action type from an insights 'actions' list
 
     Args:
-        value: Value to hash
-        data_type: Type of data (email, phone, etc.)
+        actions: Insights actions [{'action_type': ..., 'value': ...}]
+        action_type: Action type to look up (lead, link_click, ...)
 
     Returns:
-        SHA256 hashed and lowercase value
+        Action count, 0 if absent
     """
-    normalized = value.lower().strip()
+    value = next(
+        (a.get('value', 0) for a in actions or [] if a.get('action_type') == action_type),
+        0
+    )
+    return int(float(value))
+
+
+def batch_operation(
+    method: str,
+    relative_url: str,
+    body: Dict[str, Any] = None,
+    name: str = None
+) -> Dict[str, Any]:
+    """
+    Build one Graph API batch operation
+
+    Body values that are lists/dicts are JSON encoded; {result=...}
+    references are kept literal so Meta can resolve them. Named operations
+    set omit_response_on_success to false: Meta otherwise returns null for
+    them, and the caller would lose the ID of the object they created.
+    """
+    operation = {'method': method, 'relative_url': relative_url}
 
-    if data_type == 'phone':
-        # Remove non-digits
-        normalized = ''.join(filter(str.isdigit, normalized))
-        # Add country code if missing
-        if not normalized.startswith('31'):
-            normalized = '31' + normalized.lstrip('0')
+    if body:
+        operation['body'] = urlencode(
+            {
+                key: json.dumps(value) if isinstance(value, (list, dict)) else value
+                for key, value in body.items()
+            },
+            safe='{}=:$.',
+            quote_via=quote
+        )
+    if name:
+        operation['name'] = name
+        operation['omit_response_on_success'] = False
 
-    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+    return operation
+
+
+def batch_reference(name: str, path: str = '$.id') -> str:
+    """Reference a field of an earlier named operation in the same batch"""
+    return f'{{result={name}:{path}}}'
+
+
+def is_long_date_range(date_preset: str = None, time_range: Dict[str, str] = None) -> bool:
+    """
+    Check whether an insights range should run as an async report job
+
+    Args:
+        date_preset: Graph API date preset (e.g. last_90d)
+        time_range: Custom range {'since': 'YYYY-MM-DD', 'until': 'YYYY-MM-DD'}
+
+    Returns:
+        True if the range spans more than ASYNC_INSIGHTS_THRESHOLD_DAYS
+    """
+    threshold = MetaConfig.ASYNC_INSIGHTS_THRESHOLD_DAYS
+
+    if time_range:
+        since = datetime.strptime(time_range['since'], '%Y-%m-%d')
+        until = datetime.strptime(time_range['until'], '%Y-%m-%d')
+        return (until - since).days + 1 > threshold
+
+    if not date_preset:
+        return False
+
+    if date_preset in MetaConfig.LONG_DATE_PRESETS:
+        return True
+
+    # last_Nd presets
+    if date_preset.startswith('last_') and date_preset.endswith('d'):
+        try:
+            return int(date_preset[5:-1]) > threshold
+        except ValueError:
+            return False
+
+    return False
+
+
+def hash_user_data(value: str, data_type: str = 'email') -> Optional[str]:
+    """
+    Hash user data for Conversion API
+
+    Args:
+        value: Value to hash
+        data_type: Type of data (email, phone, first_name, ... or em, ph, fn, ...)
+
+    Returns:
+        SHA256 hash of the normalized value (see pii_hashing), None if nothing usable is left
+    """
+    return hash_pii(value, data_type)
 
 
 # ==============================================================================
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+META API THROTTLE
+=================
+Pre-emptive pacing of Graph API calls from Meta's usage headers.
+
+Every Graph response reports how much of the rate limit quotas is used:
+- x-app-usage                 {"call_count": 28, "total_time": 25, "total_cputime": 25}
+- x-ad-account-usage          {"acc_id_util_pct": 9.67, "reset_time_duration": 0}
+- x-business-use-case-usage   {"<business_id>": [{"type": "ads_management", "call_count": 95,
+                                "total_time": 20, "total_cputime": 20,
+                                "estimated_time_to_regain_access": 0}]}
+
+Each quota is a bucket with a live utilization (the highest of its
+counters, in percent). Calls for an ad account pass through the limiter of
+every bucket that applies to it (the app, the ad account and the business
+use cases seen for that account):
+
+- below SOFT_LIMIT_PCT calls go out immediately
+- between SOFT_LIMIT_PCT and HARD_LIMIT_PCT calls are spaced out, up to
+  MAX_SPACING seconds apart at the hard limit
+- after a rate limit error, or when Meta reports a time to regain access
+  (or sends Retry-After), the bucket is blocked until then
+
+So bulk jobs slow down before Meta blocks them instead of after. Calls that
+would have to wait longer than MAX_WAIT fail straight away with
+ThrottleBlocked. MAX_WAIT (two minutes) suits the bulk CLIs; callers that
+serve an HTTP request pass INTERACTIVE_MAX_WAIT (a few seconds) instead,
+so a blocked account never ties up request threads
+(MetaApiClient(interactive=True) does this and does not retry).
+
+Usage:
+    throttle = MetaThrottle()
+    throttle.acquire('act_123')                        # sleeps if needed
+    throttle.acquire('act_123', max_wait=ThrottleConfig.INTERACTIVE_MAX_WAIT)
+    response = requests.get(...)
+    throttle.update_from_headers('act_123', response.headers)
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from dataclasses import dataclass, asdict
+from typing import Dict, Any, Optional, List, Mapping, Set
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+# ==============================================================================
+# CONFIGURATION
+# ==============================================================================
+
+class ThrottleConfig:
+    """Meta API Throttle Configuration"""
+    # Utilization (percent of a quota) where pacing starts, and where it is at its slowest
+    SOFT_LIMIT_PCT = float(os.getenv('META_THROTTLE_SOFT_PCT', '60'))
+    HARD_LIMIT_PCT = float(os.getenv('META_THROTTLE_HARD_PCT', '90'))
+
+    # Seconds between calls of one bucket at the hard limit
+    MAX_SPACING = 5.0
+
+    # Meta's usage windows are rolling hours: an observation counts for
+    # less the older it is (no calls means no fresh headers)
+    USAGE_WINDOW = 3600  # seconds
+
+    # Block after a rate limit error that gives no time to regain access
+    DEFAULT_BLOCK = 60  # seconds
+
+    # Longest a call is held back; longer blocks raise ThrottleBlocked
+    MAX_WAIT = float(os.getenv('META_THROTTLE_MAX_WAIT', '120'))  # seconds
+
+    # Longest a call made while serving an HTTP request is held back
+    # (well below the worker timeout; such calls are never retried)
+    INTERACTIVE_MAX_WAIT = float(os.getenv('META_THROTTLE_INTERACTIVE_MAX_WAIT', '5'))  # seconds
+
+    # Retries of a call that was rate limited (each waits for the block)
+    MAX_RETRIES = 3
+
+
+# Graph API error codes for throttling: app (4), user (17), page (32),
+# custom-level (613) and business use case (80000-80014) limits
+RATE_LIMIT_CODES = {4, 17, 32, 613} | set(range(80000, 80015))
+
+APP_BUCKET = 'app'
+
+
+class ThrottleBlocked(Exception):
+    """A bucket is blocked for longer than the caller may wait (ThrottleConfig.MAX_WAIT)"""
+
+    def __init__(self, bucket: str, retry_after: float, code: int = None):
+        self.bucket = bucket
+        self.retry_after = retry_after
+        self.code = code
+        super().__init__(f"Meta rate limit: {bucket} is blocked for another {retry_after:.0f}s")
+
+
+@dataclass
+class BucketUsage:
+    """Live utilization of one quota"""
+    key: str
+    utilization: float = 0.0  # percent, highest counter at observed_at
+    observed_at: float = 0.0
+    blocked_until: float = 0.0
+    next_call_at: float = 0.0
+    last_error_code: Optional[int] = None
+
+    def current(self, now: float) -> float:
+        """Utilization now, decayed linearly over the usage window"""
+        age = now - self.observed_at
+        return self.utilization * max(0.0, 1 - age / ThrottleConfig.USAGE_WINDOW)
+
+    def spacing(self, now: float) -> float:
+        """Seconds to keep between calls at the current utilization"""
+        utilization = self.current(now)
+        if utilization < ThrottleConfig.SOFT_LIMIT_PCT:
+            return 0.0
+        ratio = (utilization - ThrottleConfig.SOFT_LIMIT_PCT) / \
+            (ThrottleConfig.HARD_LIMIT_PCT - ThrottleConfig.SOFT_LIMIT_PCT)
+        return ThrottleConfig.MAX_SPACING * min(1.0, ratio)
+
+
+def _parse_header(headers: Mapping[str, str], name: str) -> Any:
+    value = headers.get(name)
+    if not value:
+        return None
+    try:
+        return json.loads(value)
+    except ValueError:
+        logger.debug(f"Unparseable {name} header: {value}")
+        return None
+
+
+def _utilization(usage: Dict[str, Any], *fields: str) -> float:
+    return max((float(usage.get(field) or 0) for field in fields), default=0.0)
+
+
+# ==============================================================================
+# THROTTLE
+# ==============================================================================
+
+class MetaThrottle:
+    """
+    Utilization model and per-bucket limiter, shared by all clients of a process
+
+    Thread-safe: concurrent callers reserve consecutive slots, so a pool of
+    provisioning threads is paced as a whole.
+    """
+
+    def __init__(self):
+        self._buckets: Dict[str, BucketUsage] = {}
+        # ad account -> business use case buckets seen in its responses
+        self._account_buckets: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, key: str) -> BucketUsage:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = BucketUsage(key=key)
+        return bucket
+
+    def _keys(self, ad_account_id: Optional[str]) -> List[str]:
+        """Buckets a call for an ad account counts against"""
+        if not ad_account_id:
+            return [APP_BUCKET]
+        return [APP_BUCKET, f'ad_account:{ad_account_id}'] + sorted(self._account_buckets.get(ad_account_id, ()))
+
+    # ==========================================================================
+    # PACING
+    # ==========================================================================
+
+    def reserve(self, ad_account_id: Optional[str] = None, max_wait: float = None) -> float:
+        """
+        Reserve the next call slot for an ad account
+
+        Args:
+            ad_account_id: Ad account the call is for (None: app bucket only)
+            max_wait: Longest acceptable wait (default ThrottleConfig.MAX_WAIT)
+
+        Returns:
+            Seconds the caller has to wait before calling
+
+        Raises:
+            ThrottleBlocked if that would be longer than max_wait
+        """
+        max_wait = ThrottleConfig.MAX_WAIT if max_wait is None else max_wait
+        with self._lock:
+            now = time.time()
+            buckets = [self._bucket(key) for key in self._keys(ad_account_id)]
+
+            blocking = max(buckets, key=lambda bucket: max(bucket.blocked_until, bucket.next_call_at))
+            start = max(now, blocking.blocked_until, blocking.next_call_at)
+            if start - now > max_wait:
+                raise ThrottleBlocked(blocking.key, start - now, blocking.last_error_code)
+
+            for bucket in buckets:
+                spacing = bucket.spacing(now)
+                # Buckets with headroom put no constraint on other accounts' calls
+                if spacing:
+                    bucket.next_call_at = start + spacing
+
+        return start - now
+
+    def acquire(self, ad_account_id: Optional[str] = None, max_wait: float = None) -> float:
+        """Wait for the next call slot of an ad account; returns the seconds waited"""
+        wait = self.reserve(ad_account_id, max_wait)
+        if wait > 0:
+            if wait >= 1:
+                logger.info(f"Pacing Meta API calls for {ad_account_id or 'app'}: waiting {wait:.1f}s")
+            time.sleep(wait)
+        return wait
+
+    # ==========================================================================
+    # OBSERVATIONS
+    # ==========================================================================
+
+    def update_from_headers(self, ad_account_id: Optional[str], headers: Mapping[str, str]) -> None:
+        """Update the model from the usage headers of a Graph response"""
+        app_usage = _parse_header(headers, 'x-app-usage')
+        account_usage = _parse_header(headers, 'x-ad-account-usage')
+        business_usage = _parse_header(headers, 'x-business-use-case-usage')
+        retry_after = headers.get('Retry-After')
+
+        if not (app_usage or account_usage or business_usage or retry_after):
+            return
+
+        now = time.time()
+        with self._lock:
+            if isinstance(app_usage, dict):
+                self._observe(APP_BUCKET, now, _utilization(app_usage, 'call_count', 'total_time', 'total_cputime'))
+
+            if isinstance(account_usage, dict) and ad_account_id:
+                self._observe(
+                    f'ad_account:{ad_account_id}', now,
+                    _utilization(account_usage, 'acc_id_util_pct'),
+                    regain_after=float(account_usage.get('reset_time_duration') or 0)
+                )
+
+            if isinstance(business_usage, dict):
+                for business_id, use_cases in business_usage.items():
+                    for use_case in use_cases or []:
+                        key = f"business:{business_id}:{use_case.get('type', 'unknown')}"
+                        if ad_account_id:
+                            self._account_buckets.setdefault(ad_account_id, set()).add(key)
+                        self._observe(
+                            key, now,
+                            _utilization(use_case, 'call_count', 'total_time', 'total_cputime'),
+                            # Reported in minutes
+                            regain_after=float(use_case.get('estimated_time_to_regain_access') or 0) * 60
+                        )
+
+            if retry_after:
+                try:
+                    self._block(self._keys(ad_account_id)[-1], now + float(retry_after))
+                except ValueError:
+                    pass
+
+    def _observe(self, key: str, now: float, utilization: float, regain_after: float = 0.0) -> None:
+        bucket = self._bucket(key)
+        bucket.utilization = utilization
+        bucket.observed_at = now
+        if regain_after > 0:
+            self._block(key, now + regain_after)
+
+    def _block(self, key: str, until: float) -> None:
+        bucket = self._bucket(key)
+        if until > bucket.blocked_until:
+            bucket.blocked_until = until
+            logger.warning(f"Meta API {key} blocked for {until - time.time():.0f}s")
+
+    def record_rate_limit(self, ad_account_id: Optional[str], code: int = None) -> float:
+        """
+        Register a rate limit error for an ad account
+
+        Blocks the most specific bucket for DEFAULT_BLOCK seconds, unless the
+        usage headers of the same response already gave a longer block.
+
+        Returns:
+            Seconds until calls for the account are allowed again
+        """
+        now = time.time()
+        with self._lock:
+            keys = self._keys(ad_account_id)
+            if code == 4:
+                key = APP_BUCKET
+            elif code is not None and code >= 80000:
+                key = keys[-1]
+            else:
+                key = keys[1] if len(keys) > 1 else APP_BUCKET
+
+            bucket = self._bucket(key)
+            bucket.last_error_code = code
+            if not any(self._buckets[k].blocked_until > now for k in keys if k in self._buckets):
+                self._block(key, now + ThrottleConfig.DEFAULT_BLOCK)
+
+            return max(0.0, max(self._buckets[k].blocked_until for k in keys if k in self._buckets) - now)
+
+    # ==========================================================================
+    # STATUS
+    # ==========================================================================
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Current utilization, spacing and block per bucket"""
+        now = time.time()
+        with self._lock:
+            return {
+                key: dict(
+                    asdict(bucket),
+                    current_utilization=round(bucket.current(now), 2),
+                    spacing=round(bucket.spacing(now), 3),
+                    blocked_for=round(max(0.0, bucket.blocked_until - now), 1)
+                )
+                for key, bucket in self._buckets.items()
+            }
+
+
+# One model per process: all clients share the same app and account quotas
+shared_throttle = MetaThrottle()
+
+
+# ==============================================================================
+# MAIN (for testing)
+# ==============================================================================
+
+if __name__ == '__main__':
+    throttle = MetaThrottle()
+
+    throttle.update_from_headers('act_1', {
+        'x-app-usage': json.dumps({'call_count': 10, 'total_time': 5, 'total_cputime': 5}),
+        'x-business-use-case-usage': json.dumps({'999': [{'type': 'ads_management', 'call_count': 75}]})
+    })
+    assert throttle.reserve('act_1') == 0
+    assert throttle.reserve('act_1') > 0, "calls are spaced at 75% utilization"
+    assert throttle.reserve('act_2') == 0, "other ad accounts are not slowed down"
+
+    throttle.update_from_headers('act_1', {
+        'x-ad-account-usage': json.dumps({'acc_id_util_pct': 100, 'reset_time_duration': 300})
+    })
+    try:
+        throttle.reserve('act_1')
+        raise AssertionError("blocked account should fail fast")
+    except ThrottleBlocked as e:
+        print(f"Blocked as expected: {e}")
+
+    print(json.dumps(throttle.snapshot(), indent=2))
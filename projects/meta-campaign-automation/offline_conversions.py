@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+OFFLINE CONVERSIONS
+===================
+Send won Pipedrive deals to the Meta Conversion API, so campaigns can
+optimize on deals that were actually won instead of web events only.
+
+Each run streams the deals changed since the stored watermark (Pipedrive
+/recents) and turns every deal that reached a won stage ("Gewonnen", as
+set up by configure_pipedrive_apk.DEAL_STAGES) or has status 'won' into a
+server event with action_source=system_generated. Events are sent in
+batches of 1,000 (the Conversion API maximum per request).
+
+State lives in SQLite: the deals already sent (so each deal converts once,
+even when a run is repeated) and the watermark, which only moves forward
+after a run completes. A failed run can simply be started again.
+
+Meant to run on a schedule, e.g. every 30 minutes from cron:
+    */30 * * * * cd /app && python offline_conversions.py run
+
+Usage:
+    uploader = OfflineConversionUploader(PipedriveClient(), ConversionAPI())
+    summary = uploader.run()
+
+CLI:
+    python offline_conversions.py run
+    python offline_conversions.py run --since "2024-06-01 00:00:00"
+    python offline_conversions.py status
+"""
+
+import os
+import json
+import sqlite3
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Iterator, Set
+
+from pixel_tracking import ConversionAPI, UserData, CustomData, ActionSource, StandardEvent, PixelConfig
+from pipedrive_client import PipedriveClient
+from customer_list_upload import primary_value
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+# ==============================================================================
+# CONFIGURATION
+# ==============================================================================
+
+class OfflineConversionConfig:
+    """Offline Conversion Configuration"""
+    DB_PATH = os.getenv('OFFLINE_CONVERSIONS_DB_PATH', './data/offline_conversions.db')
+
+    # Stage names that count as won (see configure_pipedrive_apk.DEAL_STAGES)
+    WON_STAGE_NAMES = [
+        name.strip() for name in os.getenv('OFFLINE_CONVERSION_WON_STAGES', 'Gewonnen').split(',')
+        if name.strip()
+    ]
+
+    EVENT_NAME = os.getenv('OFFLINE_CONVERSION_EVENT', StandardEvent.PURCHASE.value)
+    DEFAULT_CURRENCY = 'EUR'
+
+    # Events per Conversion API request
+    BATCH_SIZE = PixelConfig.MAX_EVENTS_PER_REQUEST
+
+    # Meta rejects system_generated events older than this
+    MAX_EVENT_AGE_DAYS = 7
+
+    # Pipedrive timestamp format (UTC)
+    TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sent_conversions (
+    deal_id INTEGER PRIMARY KEY,
+    event_id TEXT NOT NULL,
+    event_time INTEGER NOT NULL,
+    value REAL,
+    sent_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class OfflineConversionError(Exception):
+    """A Conversion API batch was rejected"""
+
+
+def parse_pipedrive_time(value: Optional[str]) -> Optional[datetime]:
+    """Pipedrive UTC timestamp as an aware datetime"""
+    if not value:
+        return None
+    return datetime.strptime(value, OfflineConversionConfig.TIMESTAMP_FORMAT).replace(tzinfo=timezone.utc)
+
+
+# ==============================================================================
+# UPLOADER
+# ==============================================================================
+
+class OfflineConversionUploader:
+    """
+    Incremental won-deal -> Conversion API job
+
+    Usage:
+        uploader = OfflineConversionUploader(PipedriveClient(), ConversionAPI())
+        uploader.run()
+    """
+
+    def __init__(
+        self,
+        pipedrive: PipedriveClient,
+        conversion_api: ConversionAPI,
+        db_path: str = None,
+        batch_size: int = None
+    ):
+        self.pipedrive = pipedrive
+        self.conversion_api = conversion_api
+        self.db_path = db_path or OfflineConversionConfig.DB_PATH
+        self.batch_size = batch_size or OfflineConversionConfig.BATCH_SIZE
+        self._persons: Dict[int, Dict[str, Any]] = {}
+
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection per unit of work"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    # ==========================================================================
+    # STATE
+    # ==========================================================================
+
+    def get_watermark(self) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM sync_state WHERE key = 'watermark'").fetchone()
+        return row['value'] if row else None
+
+    def _set_watermark(self, watermark: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sync_state (key, value) VALUES ('watermark', ?)",
+                (watermark,)
+            )
+
+    def _sent_deal_ids(self, deal_ids: List[int]) -> Set[int]:
+        if not deal_ids:
+            return set()
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT deal_id FROM sent_conversions WHERE deal_id IN ({','.join('?' * len(deal_ids))})",
+                deal_ids
+            ).fetchall()
+        return {row['deal_id'] for row in rows}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            sent = conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(value), 0), MAX(sent_at) FROM sent_conversions'
+            ).fetchone()
+        return {
+            'db_path': self.db_path,
+            'watermark': self.get_watermark(),
+            'sent_conversions': sent[0],
+            'sent_value': sent[1],
+            'last_sent_at': sent[2]
+        }
+
+    # ==========================================================================
+    # RUN
+    # ==========================================================================
+
+    def run(self, since: str = None, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Send all won deals changed since the watermark (or `since`)
+
+        Args:
+            since: UTC timestamp 'YYYY-MM-DD HH:MM:SS' overriding the watermark
+            dry_run: Build events but send and store nothing
+
+        Returns:
+            {'since', 'watermark', 'deals_seen', 'sent', 'skipped_too_old'}
+
+        Raises:
+            OfflineConversionError when a batch is rejected (the watermark
+            is kept, deals of accepted batches are not sent again)
+        """
+        oldest = datetime.now(timezone.utc) - timedelta(days=OfflineConversionConfig.MAX_EVENT_AGE_DAYS)
+        since = since or self.get_watermark() or oldest.strftime(OfflineConversionConfig.TIMESTAMP_FORMAT)
+        won_stage_ids = self._won_stage_ids()
+
+        watermark = since
+        summary = {'since': since, 'deals_seen': 0, 'sent': 0, 'skipped_too_old': 0}
+        batch: List[Dict[str, Any]] = []
+
+        logger.info(f"Streaming deals changed since {since} (won stages: {sorted(won_stage_ids)})")
+
+        for _, deals in self.pipedrive.iter_recent_deal_pages(since):
+            summary['deals_seen'] += len(deals)
+            watermark = max([watermark] + [deal['update_time'] for deal in deals if deal.get('update_time')])
+
+            won = [deal for deal in deals if deal.get('status') == 'won' or deal.get('stage_id') in won_stage_ids]
+            already_sent = self._sent_deal_ids([deal['id'] for deal in won])
+
+            for deal in won:
+                if deal['id'] in already_sent:
+                    continue
+                event = self._deal_event(deal, oldest)
+                if event is None:
+                    summary['skipped_too_old'] += 1
+                    continue
+                already_sent.add(deal['id'])
+                batch.append(event)
+
+                if len(batch) == self.batch_size:
+                    summary['sent'] += self._send(batch, dry_run)
+                    batch = []
+
+        if batch:
+            summary['sent'] += self._send(batch, dry_run)
+
+        if not dry_run:
+            self._set_watermark(watermark)
+        summary['watermark'] = watermark
+
+        logger.info(f"Offline conversions: {summary['sent']} sent from {summary['deals_seen']} changed deals")
+        return summary
+
+    def _won_stage_ids(self) -> Set[int]:
+        names = set(OfflineConversionConfig.WON_STAGE_NAMES)
+        return {stage['id'] for stage in self.pipedrive.get_stages() if stage.get('name') in names}
+
+    def _person(self, person: Any) -> Dict[str, Any]:
+        """Person of a deal (embedded object, or fetched once per run by ID)"""
+        if isinstance(person, dict):
+            if person.get('email') or person.get('phone'):
+                return person
+            person = person.get('value')
+        if not person:
+            return {}
+        if person not in self._persons:
+            self._persons[person] = self.pipedrive.get_person(person)
+        return self._persons[person]
+
+    def _deal_event(self, deal: Dict[str, Any], oldest: datetime) -> Optional[Dict[str, Any]]:
+        """Conversion API event for a won deal, None if it is too old to send"""
+        won_at = parse_pipedrive_time(deal.get('won_time') or deal.get('update_time'))
+        if won_at is None or won_at < oldest:
+            return None
+
+        person = self._person(deal.get('person_id'))
+        person_id = person.get('id') or person.get('value')
+
+        return self.conversion_api.build_event(
+            event_name=OfflineConversionConfig.EVENT_NAME,
+            user_data=UserData(
+                email=primary_value(person.get('email')),
+                phone=primary_value(person.get('phone')),
+                external_id=str(person_id) if person_id else None
+            ),
+            custom_data=CustomData(
+                content_name='Pipedrive Deal Gewonnen',
+                content_category='deal',
+                content_ids=[str(deal['id'])],
+                value=float(deal.get('value') or 0),
+                currency=deal.get('currency') or OfflineConversionConfig.DEFAULT_CURRENCY
+            ),
+            action_source=ActionSource.SYSTEM_GENERATED,
+            event_id=f"pipedrive-deal-{deal['id']}-won",
+            event_time=int(won_at.timestamp())
+        )
+
+    def _send(self, events: List[Dict[str, Any]], dry_run: bool) -> int:
+        """Send one batch and record its deals as sent"""
+        if dry_run:
+            logger.info(f"[dry run] Would send {len(events)} events")
+            return len(events)
+
+        result = self.conversion_api.send_events(events)
+        if 'error' in result:
+            raise OfflineConversionError(f"Conversion API rejected {len(events)} events: {result['error']}")
+
+        sent_at = datetime.now().isoformat()
+        with self._connect() as conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO sent_conversions (deal_id, event_id, event_time, value, sent_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                [
+                    (
+                        int(event['custom_data']['content_ids'][0]),
+                        event['event_id'],
+                        event['event_time'],
+                        event['custom_data'].get('value'),
+                        sent_at
+                    )
+                    for event in events
+                ]
+            )
+
+        logger.info(f"Sent {len(events)} offline conversions ({result.get('events_received')} received)")
+        return len(events)
+
+
+# ==============================================================================
+# CLI INTERFACE
+# ==============================================================================
+
+def main():
+    """Command line interface"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Send won Pipedrive deals to the Meta Conversion API")
+    parser.add_argument("command", choices=["run", "status"], help="run: incremental upload, status: watermark and totals")
+    parser.add_argument("--since", help="Override the watermark (UTC 'YYYY-MM-DD HH:MM:SS')")
+    parser.add_argument("--dry-run", action="store_true", help="Build events without sending or storing anything")
+    parser.add_argument("--db", default=OfflineConversionConfig.DB_PATH, help="SQLite state path")
+
+    args = parser.parse_args()
+
+    if args.command == "status":
+        uploader = OfflineConversionUploader(pipedrive=None, conversion_api=None, db_path=args.db)
+        print(json.dumps(uploader.stats(), indent=2))
+        return
+
+    uploader = OfflineConversionUploader(PipedriveClient(), ConversionAPI(), db_path=args.db)
+    print(json.dumps(uploader.run(since=args.since, dry_run=args.dry_run), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+PIPEDRIVE CLIENT
+================
+Paged read access to Pipedrive for bulk jobs (audience uploads, offline
+conversions) that walk through the whole CRM.
+
+Pages are fetched one at a time over a shared HTTP session, so a job holds
+at most one page in memory no matter how many records Pipedrive has.
+Every page is yielded with the offset it was fetched from, so a job can
+record where it stopped and resume there.
+
+Requests go through the 'pipedrive' circuit breaker shared with the lead
+handlers (circuit_breaker.py). While it is open, a bulk job waits for the
+breaker to probe again instead of adding load to an unhealthy Pipedrive.
+
+Usage:
+    client = PipedriveClient()
+    for start, persons in client.iter_person_pages():
+        ...
+"""
+
+import os
+import time
+import logging
+from typing import Dict, Any, List, Iterator, Tuple
+
+import requests
+
+from circuit_breaker import get_breaker, server_error, CircuitOpenError
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+# ==============================================================================
+# CONFIGURATION
+# ==============================================================================
+
+class PipedriveConfig:
+    """Pipedrive API Configuration"""
+    API_TOKEN = os.getenv('PIPEDRIVE_API_TOKEN')
+    # Override to point at a local fake server
+    BASE_URL = os.getenv('PIPEDRIVE_BASE_URL', 'https://api.pipedrive.com/v1')
+
+    # Records per page (Pipedrive max is 500)
+    PAGE_SIZE = 500
+
+    TIMEOUT = 30  # seconds
+
+    # Retries for rate-limited (429) and 5xx responses
+    MAX_RETRIES = 5
+    RETRY_BASE_DELAY = 2  # seconds, doubled per attempt
+
+
+class PipedriveError(Exception):
+    """Pipedrive API request failed"""
+
+
+# ==============================================================================
+# PIPEDRIVE CLIENT
+# ==============================================================================
+
+class PipedriveClient:
+    """
+    Pipedrive v1 API client for paged bulk reads
+
+    Usage:
+        client = PipedriveClient()
+        for start, persons in client.iter_person_pages(start=1000):
+            ...
+    """
+
+    def __init__(self, api_token: str = None, base_url: str = None):
+        self.api_token = api_token or PipedriveConfig.API_TOKEN
+        self.base_url = (base_url or PipedriveConfig.BASE_URL).rstrip('/')
+        self.session = requests.Session()
+
+        if not self.api_token:
+            raise ValueError("PIPEDRIVE_API_TOKEN environment variable is required")
+
+    def _get(self, endpoint: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
+        """GET an endpoint, retrying rate limits and server errors"""
+        params = dict(params or {}, api_token=self.api_token)
+
+        for attempt in range(PipedriveConfig.MAX_RETRIES + 1):
+            try:
+                response = get_breaker('pipedrive').call(
+                    self.session.get,
+                    f"{self.base_url}/{endpoint}",
+                    params=params,
+                    timeout=PipedriveConfig.TIMEOUT,
+                    failure_if=server_error
+                )
+            except (requests.exceptions.RequestException, CircuitOpenError) as e:
+                if attempt == PipedriveConfig.MAX_RETRIES:
+                    raise PipedriveError(str(e))
+                delay = max(PipedriveConfig.RETRY_BASE_DELAY * 2 ** attempt, getattr(e, 'retry_after', 0))
+                logger.warning(f"Pipedrive request failed ({str(e)}), retrying in {delay}s")
+                time.sleep(delay)
+                continue
+
+            if (response.status_code == 429 or response.status_code >= 500) \
+                    and attempt < PipedriveConfig.MAX_RETRIES:
+                delay = float(response.headers.get('Retry-After') or
+                              PipedriveConfig.RETRY_BASE_DELAY * 2 ** attempt)
+                logger.warning(f"Pipedrive returned {response.status_code}, retrying in {delay}s")
+                time.sleep(delay)
+                continue
+
+            result = response.json()
+            if not result.get('success'):
+                raise PipedriveError(result.get('error') or f"HTTP {response.status_code}")
+            return result
+
+        raise PipedriveError(f"Giving up on {endpoint}")
+
+    def iter_pages(
+        self,
+        endpoint: str,
+        params: Dict[str, Any] = None,
+        start: int = 0,
+        page_size: int = None
+    ) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+        """
+        Iterate over a list endpoint page by page
+
+        Args:
+            endpoint: List endpoint ('persons', 'deals')
+            params: Extra query parameters (filters, sort)
+            start: Offset of the first page (to resume a previous run)
+            page_size: Records per page
+
+        Yields:
+            (offset of the page, records on the page)
+        """
+        limit = page_size or PipedriveConfig.PAGE_SIZE
+
+        while True:
+            result = self._get(endpoint, dict(params or {}, start=start, limit=limit))
+            records = result.get('data') or []
+            if records:
+                yield start, records
+
+            pagination = (result.get('additional_data') or {}).get('pagination') or {}
+            if not pagination.get('more_items_in_collection'):
+                return
+            start = pagination.get('next_start', start + limit)
+
+    def iter_person_pages(
+        self,
+        start: int = 0,
+        page_size: int = None
+    ) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+        """All persons in a stable order (ascending ID), page by page"""
+        return self.iter_pages('persons', {'sort': 'id ASC'}, start, page_size)
+
+    def iter_recent_deal_pages(
+        self,
+        since: str,
+        start: int = 0,
+        page_size: int = None
+    ) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+        """
+        Deals changed since a timestamp, page by page
+
+        Args:
+            since: UTC timestamp 'YYYY-MM-DD HH:MM:SS'
+
+        Yields:
+            (offset of the page, deals on the page)
+        """
+        for page_start, items in self.iter_pages(
+            'recents',
+            {'since_timestamp': since, 'items': 'deal'},
+            start,
+            page_size
+        ):
+            yield page_start, [item['data'] for item in items if item.get('data')]
+
+    def get_stages(self) -> List[Dict[str, Any]]:
+        """All deal stages of all pipelines"""
+        return self._get('stages').get('data') or []
+
+    def get_person(self, person_id: int) -> Dict[str, Any]:
+        return self._get(f'persons/{person_id}').get('data') or {}
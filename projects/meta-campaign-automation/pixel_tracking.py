@@ -17,7 +17,6 @@ Website: kandidatentekort.nl
 import os
 import json
 import time
-import hashlib
 import logging
 from datetime import datetime
 from typing import Dict, Any, Optional, List
@@ -26,6 +25,10 @@ from enum import Enum
 import requests
 import uuid
 
+from pii_hashing import hash_pii, hash_fields
+from circuit_breaker import get_breaker, server_error, CircuitOpenError
+from integration_outbox import get_outbox, register_handler, ensure, IntegrationError
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -48,6 +51,9 @@ class PixelConfig:
     # Test event code for debugging (set in Events Manager)
     TEST_EVENT_CODE = os.getenv('META_TEST_EVENT_CODE')
 
+    # Conversion API accepts at most 1,000 events per request
+    MAX_EVENTS_PER_REQUEST = 1000
+
 
 class StandardEvent(Enum):
     """Meta Standard Events"""
@@ -378,44 +384,29 @@ class ConversionAPI:
         if not self.access_token:
             logger.warning("META_ACCESS_TOKEN not set - Conversion API will not work")
 
-    def _hash_value(self, value: str) -> str:
-        """Hash a value using SHA256 (as required by Meta)"""
-        if not value:
-            return None
-        normalized = value.lower().strip()
-        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+    def _hash_value(self, value: str, field: str = 'em') -> str:
+        """Normalize and hash a value using SHA256 (as required by Meta, memoized)"""
+        return hash_pii(value, field)
 
     def _hash_phone(self, phone: str) -> str:
         """Hash phone number with proper formatting"""
-        if not phone:
-            return None
-        # Remove non-digits
-        digits = ''.join(filter(str.isdigit, phone))
-        # Add Netherlands country code if missing
-        if not digits.startswith('31'):
-            digits = '31' + digits.lstrip('0')
-        return hashlib.sha256(digits.encode('utf-8')).hexdigest()
+        return hash_pii(phone, 'ph')
 
     def _prepare_user_data(self, user_data: UserData) -> Dict[str, Any]:
         """Prepare and hash user data for API"""
-        data = {}
+        hashed = hash_fields({
+            'em': user_data.email,
+            'ph': user_data.phone,
+            'fn': user_data.first_name,
+            'ln': user_data.last_name,
+            'ct': user_data.city,
+            'st': user_data.state,
+            'country': user_data.country,
+            'zp': user_data.zip_code,
+            'external_id': user_data.external_id
+        })
+        data = {field: [digest] for field, digest in hashed.items() if field != 'external_id'}
 
-        if user_data.email:
-            data['em'] = [self._hash_value(user_data.email)]
-        if user_data.phone:
-            data['ph'] = [self._hash_phone(user_data.phone)]
-        if user_data.first_name:
-            data['fn'] = [self._hash_value(user_data.first_name)]
-        if user_data.last_name:
-            data['ln'] = [self._hash_value(user_data.last_name)]
-        if user_data.city:
-            data['ct'] = [self._hash_value(user_data.city)]
-        if user_data.state:
-            data['st'] = [self._hash_value(user_data.state)]
-        if user_data.country:
-            data['country'] = [self._hash_value(user_data.country)]
-        if user_data.zip_code:
-            data['zp'] = [self._hash_value(user_data.zip_code)]
         if user_data.client_ip_address:
             data['client_ip_address'] = user_data.client_ip_address
         if user_data.client_user_agent:
@@ -424,8 +415,8 @@ class ConversionAPI:
             data['fbc'] = user_data.fbc
         if user_data.fbp:
             data['fbp'] = user_data.fbp
-        if user_data.external_id:
-            data['external_id'] = [self._hash_value(user_data.external_id)]
+        if 'external_id' in hashed:
+            data['external_id'] = [hashed['external_id']]
 
         return data
 
@@ -456,6 +447,41 @@ class ConversionAPI:
 
         return data
 
+    def build_event(
+        self,
+        event_name: str,
+        user_data: UserData = None,
+        custom_data: CustomData = None,
+        event_source_url: str = None,
+        action_source: ActionSource = ActionSource.WEBSITE,
+        event_id: str = None,
+        event_time: int = None
+    ) -> Dict[str, Any]:
+        """
+        Build one server event (user data hashed) for send_events
+
+        Args:
+            event_time: Unix timestamp of the event (default: now)
+            Other arguments as in send_event
+        """
+        event = {
+            'event_name': event_name,
+            'event_time': event_time or int(time.time()),
+            'action_source': action_source.value,
+            'event_id': event_id or str(uuid.uuid4())
+        }
+
+        if event_source_url:
+            event['event_source_url'] = event_source_url
+
+        if user_data:
+            event['user_data'] = self._prepare_user_data(user_data)
+
+        if custom_data:
+            event['custom_data'] = self._prepare_custom_data(custom_data)
+
+        return event
+
     def send_event(
         self,
         event_name: str,
@@ -479,28 +505,47 @@ class ConversionAPI:
         Returns:
             API response dict
         """
+        event = self.build_event(
+            event_name=event_name,
+            user_data=user_data,
+            custom_data=custom_data,
+            event_source_url=event_source_url,
+            action_source=action_source,
+            event_id=event_id
+        )
+
         if not self.access_token:
-            logger.error("Cannot send event: META_ACCESS_TOKEN not set")
-            return {'error': 'No access token'}
+            return self.send_events([event])
 
-        event = {
-            'event_name': event_name,
-            'event_time': int(time.time()),
-            'action_source': action_source.value,
-            'event_id': event_id or str(uuid.uuid4())
-        }
+        # Kept as a dead letter when it fails (python integration_outbox.py replay)
+        try:
+            result = get_outbox().run(
+                'conversion_api.events',
+                {'pixel_id': self.pixel_id, 'events': [event]},
+                lambda payload: ensure(self.send_events(payload['events']), 'Conversion API')
+            )
+        except IntegrationError as e:
+            return e.result
 
-        if event_source_url:
-            event['event_source_url'] = event_source_url
+        logger.info(f"Event sent successfully: {event_name} (id: {event['event_id']})")
+        return result
 
-        if user_data:
-            event['user_data'] = self._prepare_user_data(user_data)
+    def send_events(self, events: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Send up to MAX_EVENTS_PER_REQUEST events (from build_event) in one request
 
-        if custom_data:
-            event['custom_data'] = self._prepare_custom_data(custom_data)
+        Returns:
+            API response dict ({'events_received', ...} or {'error'})
+        """
+        if not self.access_token:
+            logger.error("Cannot send event: META_ACCESS_TOKEN not set")
+            return {'error': 'No access token'}
+
+        if len(events) > PixelConfig.MAX_EVENTS_PER_REQUEST:
+            raise ValueError(f"At most {PixelConfig.MAX_EVENTS_PER_REQUEST} events per request")
 
         payload = {
-            'data': [event],
+            'data': events,
             'access_token': self.access_token
         }
 
@@ -509,22 +554,22 @@ class ConversionAPI:
             payload['test_event_code'] = PixelConfig.TEST_EVENT_CODE
 
         try:
-            response = requests.post(
+            response = get_breaker('meta').call(
+                requests.post,
                 self.api_url,
                 json=payload,
-                timeout=30
+                timeout=30,
+                failure_if=server_error
             )
 
             result = response.json()
 
             if 'error' in result:
                 logger.error(f"Conversion API error: {result['error']}")
-            else:
-                logger.info(f"Event sent successfully: {event_name} (id: {event['event_id']})")
 
             return result
 
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, CircuitOpenError) as e:
             logger.error(f"Conversion API request failed: {str(e)}")
             return {'error': str(e)}
 
@@ -619,6 +664,14 @@ class ConversionAPI:
         )
 
 
+def _replay_events(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """integration_outbox handler: resend stored events to their pixel"""
+    return ensure(ConversionAPI(pixel_id=payload['pixel_id']).send_events(payload['events']), 'Conversion API')
+
+
+register_handler('conversion_api.events', _replay_events, dependency='meta')
+
+
 # ==============================================================================
 # INTEGRATION HELPER
 # ==============================================================================
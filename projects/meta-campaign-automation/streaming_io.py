@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+STREAMING FILE TRANSFERS
+========================
+Chunked download/upload helpers for creative assets, so a transfer holds
+at most one chunk in memory regardless of image size.
+
+- Downloads are written chunk by chunk to a temporary '.part' file next to
+  the target and renamed into place when complete; a failed or aborted
+  download never leaves a partial file behind.
+- Uploads pass open file handles to requests, which streams them from
+  disk. MultipartFileReader does the same for multipart/form-data bodies
+  (requests' files= would build the whole body in memory).
+- httpx.AsyncClient needs async iterables instead: aiter_file and
+  MultipartFileReader's async iteration read the file in a worker thread
+  so the event loop is not blocked on disk.
+
+Usage:
+    stream_download(url, './images/ad.png')
+
+    with MultipartFileReader('filename', './images/ad.png') as body:
+        requests.post(url, data=body, headers={'Content-Type': body.content_type})
+"""
+
+import os
+import uuid
+import asyncio
+import logging
+import tempfile
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, AsyncIterator, BinaryIO, Optional
+
+import requests
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Bytes per read/write while transferring
+CHUNK_SIZE = int(os.getenv('TRANSFER_CHUNK_SIZE', str(1024 * 1024)))
+
+
+@contextmanager
+def atomic_output(output_path: str) -> Iterator[BinaryIO]:
+    """
+    Open a temporary file that replaces output_path only if the block succeeds
+
+    The temporary file lives in the target directory (same filesystem, so
+    the final rename is atomic) and is removed on any error.
+    """
+    directory = os.path.dirname(output_path) or '.'
+    os.makedirs(directory, exist_ok=True)
+
+    fd, temp_path = tempfile.mkstemp(
+        dir=directory,
+        prefix=f".{os.path.basename(output_path)}.",
+        suffix='.part'
+    )
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            yield f
+        os.replace(temp_path, output_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def stream_download(url: str, output_path: str, timeout: int = 60) -> int:
+    """
+    Download a URL to a file in CHUNK_SIZE pieces
+
+    Returns:
+        Number of bytes written
+
+    Raises:
+        requests.HTTPError on a non-2xx response
+    """
+    with requests.get(url, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+
+        size = 0
+        with atomic_output(output_path) as f:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                f.write(chunk)
+                size += len(chunk)
+
+    return size
+
+
+async def aiter_file(file_path: str) -> AsyncIterator[bytes]:
+    """
+    Read a file in CHUNK_SIZE pieces without blocking the event loop
+
+    Usage:
+        await client.put(url, content=aiter_file(path),
+                         headers={'Content-Length': str(os.path.getsize(path))})
+    """
+    with open(file_path, 'rb') as f:
+        while True:
+            chunk = await asyncio.to_thread(f.read, CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+class MultipartFileReader:
+    """
+    File-like multipart/form-data body that streams one file from disk
+
+    requests reads it in blocks and, because it has a length, sends a
+    normal Content-Length request instead of chunked encoding.
+
+    Usage:
+        with MultipartFileReader('filename', path, fields={'name': 'ad'}) as body:
+            requests.post(url, data=body, headers={'Content-Type': body.content_type})
+    """
+
+    def __init__(
+        self,
+        field_name: str,
+        file_path: str,
+        fields: Dict[str, Any] = None,
+        content_type: str = 'application/octet-stream'
+    ):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f'multipart/form-data; boundary={self.boundary}'
+
+        preamble = b''.join(
+            f'--{self.boundary}\r\n'
+            f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+            f'{value}\r\n'.encode('utf-8')
+            for name, value in (fields or {}).items()
+        )
+        preamble += (
+            f'--{self.boundary}\r\n'
+            f'Content-Disposition: form-data; name="{field_name}"; '
+            f'filename="{os.path.basename(file_path)}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n'
+        ).encode('utf-8')
+        epilogue = f'\r\n--{self.boundary}--\r\n'.encode('utf-8')
+
+        self._file: Optional[BinaryIO] = open(file_path, 'rb')
+        self._parts = [preamble, None, epilogue]  # None = the file
+        self._buffer = b''
+        self._length = len(preamble) + os.fstat(self._file.fileno()).st_size + len(epilogue)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = CHUNK_SIZE
+
+        while len(self._buffer) < size and self._parts:
+            part = self._parts[0]
+            if part is None:
+                data = self._file.read(size - len(self._buffer))
+                if data:
+                    self._buffer += data
+                    continue
+            else:
+                self._buffer += part
+            self._parts.pop(0)
+
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        """Body chunks for httpx.AsyncClient (content=body, with Content-Length: len(body))"""
+        while True:
+            chunk = await asyncio.to_thread(self.read, CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+    def close(self) -> None:
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> 'MultipartFileReader':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
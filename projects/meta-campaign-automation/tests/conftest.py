@@ -0,0 +1,50 @@
+"""
+Shared fixtures: the project modules on sys.path and a fake Graph API
+server (fake_graph_server.py) on a free local port.
+"""
+
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.serving import make_server
+
+import fake_graph_server
+from meta_api_client import MetaApiClient, MetaConfig
+from meta_throttle import MetaThrottle
+
+
+@pytest.fixture(scope='session')
+def fake_graph_url():
+    """Base URL of a fake Graph API server running for the whole session"""
+    server = make_server('127.0.0.1', 0, fake_graph_server.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}/{MetaConfig.API_VERSION}'
+    server.shutdown()
+
+
+@pytest.fixture
+def fake_graph(fake_graph_url, monkeypatch):
+    """Point MetaApiClient at the fake server, with fast report polling"""
+    monkeypatch.setattr(MetaConfig, 'BASE_URL', fake_graph_url)
+    monkeypatch.setattr(MetaConfig, 'AD_ACCOUNT_ID', 'act_123')
+    monkeypatch.setattr(MetaConfig, 'ASYNC_POLL_INITIAL_INTERVAL', 0.01)
+    monkeypatch.setattr(MetaConfig, 'ASYNC_POLL_MAX_INTERVAL', 0.01)
+    return fake_graph_server
+
+
+@pytest.fixture
+def meta_client(fake_graph):
+    """Client for batch/CLI code paths against the fake server"""
+    return MetaApiClient('fake-token', throttle=MetaThrottle())
+
+
+@pytest.fixture
+def interactive_client(fake_graph):
+    """Client as used by the Flask request handlers"""
+    return MetaApiClient('fake-token', throttle=MetaThrottle(), interactive=True)
@@ -0,0 +1,65 @@
+"""Asset store copies: stored objects are independent of callers' files"""
+
+import os
+import stat
+
+import pytest
+
+from asset_store import AssetStore, file_sha256
+
+
+@pytest.fixture
+def store(tmp_path):
+    return AssetStore(str(tmp_path / 'store'))
+
+
+def write(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def test_editing_the_source_keeps_the_object(store, tmp_path):
+    source = str(tmp_path / 'master.png')
+    write(source, b'original bytes')
+
+    sha = store.add(source)
+    object_path = store.get(sha)['object_path']
+    write(source, b'edited in place')
+
+    assert not os.path.samefile(source, object_path)
+    assert not os.stat(object_path).st_mode & stat.S_IWUSR
+    assert file_sha256(object_path) == sha
+
+
+def test_editing_a_materialized_file_keeps_the_object(store, tmp_path):
+    source = str(tmp_path / 'master.png')
+    write(source, b'original bytes')
+    sha = store.add(source)
+
+    output = str(tmp_path / 'out' / 'master.png')
+    assert store.materialize(sha, output)
+    write(output, b'edited in place')
+
+    assert file_sha256(store.get(sha)['object_path']) == sha
+    assert store.materialize(sha, output)
+    assert file_sha256(output) == sha
+
+
+def test_corrupt_object_is_not_materialized(store, tmp_path):
+    source = str(tmp_path / 'master.png')
+    write(source, b'original bytes')
+    sha = store.add(source)
+    store.set_remote_id(sha, 'canva', 'asset_1')
+
+    object_path = store.get(sha)['object_path']
+    os.chmod(object_path, 0o644)
+    write(object_path, b'corrupted')
+
+    output = str(tmp_path / 'out.png')
+    assert not store.materialize(sha, output)
+    assert not os.path.exists(output)
+    assert store.get(sha) is None
+
+    # Re-adding the original bytes restores the object and keeps the upload
+    assert store.add(source) == sha
+    assert store.get(sha)['remote_ids'] == {'canva': 'asset_1'}
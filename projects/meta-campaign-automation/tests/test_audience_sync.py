@@ -0,0 +1,44 @@
+"""Incremental audience sync: order of users requests and the hash index"""
+
+import pytest
+
+import audience_sync
+from audience_sync import AudienceSync
+
+
+class RecordingMeta:
+    """Stands in for MetaApiClient's audience users calls"""
+
+    def __init__(self):
+        self.calls = []
+
+    def add_audience_users(self, audience_id, schema, rows, session):
+        self.calls.append(('add', [tuple(row) for row in rows]))
+
+    def remove_audience_users(self, audience_id, schema, rows, session):
+        self.calls.append(('remove', [tuple(row) for row in rows]))
+
+
+@pytest.fixture
+def export(monkeypatch):
+    """Rows the next sync sees as the hashed Pipedrive export"""
+    rows = []
+    monkeypatch.setattr(audience_sync, 'iter_hashed_pages', lambda pipedrive: iter([(0, list(rows))]))
+    return rows
+
+
+def test_changed_phone_is_removed_before_it_is_added(tmp_path, export):
+    meta = RecordingMeta()
+    sync = AudienceSync(meta, pipedrive=None, db_path=str(tmp_path / 'index.db'))
+
+    export[:] = [['email_a', 'phone_old'], ['email_b', 'phone_b']]
+    sync.sync('aud_1', seed=True)
+
+    export[:] = [['email_a', 'phone_new'], ['email_b', 'phone_b']]
+    result = sync.sync('aud_1')
+
+    assert meta.calls == [
+        ('remove', [('email_a', 'phone_old')]),
+        ('add', [('email_a', 'phone_new')]),
+    ]
+    assert (result['added'], result['removed'], result['members']) == (1, 1, 2)
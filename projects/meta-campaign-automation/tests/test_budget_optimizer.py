@@ -0,0 +1,87 @@
+"""Budget optimizer bounds and speed"""
+
+import time
+
+import numpy as np
+import pytest
+
+from budget_optimizer import BudgetOptimizer, MetricArrays
+
+
+def daily_rows(num_entities, num_days=14, leads=True, seed=7):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for entity in range(num_entities):
+        budget = 10 + entity % 40
+        for day in range(num_days):
+            spend = budget * rng.uniform(0.7, 1.1)
+            rows.append({
+                'campaign_id': f'adset_{entity}',
+                'campaign_name': f'Ad set {entity}',
+                'date': f'2024-01-{day + 1:02d}',
+                'spend': spend,
+                'leads': int(rng.poisson(spend / (15 + entity % 25))) if leads else 0
+            })
+    return rows
+
+
+def budgets_for(metrics):
+    return np.array([10.0 + int(entity_id.split('_')[1]) % 40 for entity_id in metrics.ids])
+
+
+def assert_within_bounds(optimizer, current, recommended, total):
+    lower = np.maximum(current * (1 - optimizer.max_decrease), optimizer.min_budget)
+    upper = np.maximum(current * (1 + optimizer.max_increase), lower)
+    assert np.all(recommended >= lower - 1e-6)
+    assert np.all(recommended <= upper + 1e-6)
+    assert recommended.sum() == pytest.approx(np.clip(total, lower.sum(), upper.sum()), rel=1e-6)
+
+
+@pytest.mark.parametrize('factor', [0.2, 0.9, 1.3, 3.0])
+def test_allocation_respects_bounds(factor):
+    metrics = MetricArrays.from_daily_rows(daily_rows(200))
+    current = budgets_for(metrics)
+    optimizer = BudgetOptimizer()
+
+    plan = optimizer.optimize(metrics, current, total_budget=current.sum() * factor)
+
+    assert_within_bounds(optimizer, current, plan.recommended_budget, current.sum() * factor)
+
+
+@pytest.mark.parametrize('factor', [0.2, 0.9, 1.3, 3.0])
+def test_no_leads_scales_within_the_same_bounds(factor):
+    metrics = MetricArrays.from_daily_rows(daily_rows(200, leads=False))
+    current = budgets_for(metrics)
+    optimizer = BudgetOptimizer()
+
+    plan = optimizer.optimize(metrics, current, total_budget=current.sum() * factor)
+
+    assert_within_bounds(optimizer, current, plan.recommended_budget, current.sum() * factor)
+    # Proportional: entities that are not at a bound keep their budget ratios
+    ratio = plan.recommended_budget / current
+    free = (ratio > 1 - optimizer.max_decrease + 1e-6) & (ratio < 1 + optimizer.max_increase - 1e-6) & \
+        (plan.recommended_budget > optimizer.min_budget + 1e-6)
+    if free.any():
+        assert np.ptp(ratio[free]) < 1e-6
+
+
+def test_no_leads_without_total_keeps_budgets():
+    metrics = MetricArrays.from_daily_rows(daily_rows(20, leads=False))
+    current = budgets_for(metrics)
+
+    plan = BudgetOptimizer().optimize(metrics, current)
+
+    np.testing.assert_allclose(plan.recommended_budget, current)
+
+
+def test_thousands_of_ad_sets_well_under_a_second():
+    rows = daily_rows(5000)
+
+    started = time.perf_counter()
+    metrics = MetricArrays.from_daily_rows(rows)
+    plan = BudgetOptimizer().optimize(metrics, budgets_for(metrics), total_budget=120000)
+    plan.to_records()
+    elapsed = time.perf_counter() - started
+
+    assert len(plan.ids) == 5000
+    assert elapsed < 1.0, f"5000 ad sets x 14 days took {elapsed:.2f}s"
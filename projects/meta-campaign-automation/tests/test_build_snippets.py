@@ -0,0 +1,51 @@
+"""Static snippet build: hashed files and --clean"""
+
+import json
+import os
+
+import pytest
+
+import build_snippets
+from build_snippets import build_snippets as build
+
+
+@pytest.fixture
+def out(tmp_path):
+    return str(tmp_path / 'pixel')
+
+
+def test_clean_removes_only_files_of_the_previous_build(out, monkeypatch):
+    first = build(out, typeform_ids=['formA'])
+
+    # Unrelated content in the output directory
+    os.makedirs(os.path.join(out, 'assets'))
+    for name in ('robots.txt', 'pixel-base.old.html'):
+        with open(os.path.join(out, name), 'w') as f:
+            f.write('keep')
+
+    # The next build changes the typeform embed and drops formA
+    monkeypatch.setattr(build_snippets.PixelConfig, 'PIXEL_ID', '999')
+    second = build(out, typeform_ids=['formB'], clean=True)
+
+    listed = {entry['file'] for entry in second['files'].values()}
+    remaining = set(os.listdir(out))
+    assert listed <= remaining
+    assert {'assets', 'robots.txt', 'pixel-base.old.html', 'manifest.json'} <= remaining
+    replaced = {entry['file'] for entry in first['files'].values()} - listed
+    assert replaced and not replaced & remaining
+
+
+def test_clean_ignores_manifest_entries_outside_the_naming_scheme(out):
+    build(out, typeform_ids=[])
+    with open(os.path.join(out, 'manifest.json')) as f:
+        manifest = json.load(f)
+    manifest['files']['pixel-base']['file'] = 'robots.txt'
+    manifest['files']['evil'] = {'file': '../outside.0123456789ab.js'}
+    with open(os.path.join(out, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f)
+    with open(os.path.join(out, 'robots.txt'), 'w') as f:
+        f.write('keep')
+
+    build(out, typeform_ids=[], clean=True)
+
+    assert os.path.exists(os.path.join(out, 'robots.txt'))
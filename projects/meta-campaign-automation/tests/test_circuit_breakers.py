@@ -0,0 +1,51 @@
+"""Bulk API clients share the per-dependency circuit breakers"""
+
+import socket
+
+import pytest
+
+import circuit_breaker
+from circuit_breaker import CircuitBreakerConfig
+from meta_api_client import MetaApiClient, MetaApiError, MetaConfig
+from meta_throttle import MetaThrottle
+from pipedrive_client import PipedriveClient, PipedriveConfig, PipedriveError
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers(monkeypatch):
+    monkeypatch.setattr(circuit_breaker, '_breakers', {})
+
+
+@pytest.fixture
+def dead_url():
+    """URL of a local port nothing listens on"""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    return f'http://127.0.0.1:{port}'
+
+
+def test_meta_requests_go_through_the_breaker(dead_url, monkeypatch):
+    monkeypatch.setattr(MetaConfig, 'BASE_URL', dead_url)
+    client = MetaApiClient('fake-token', throttle=MetaThrottle())
+
+    for _ in range(CircuitBreakerConfig.MIN_CALLS):
+        with pytest.raises(MetaApiError, match='Connection'):
+            client.get_campaigns()
+
+    assert circuit_breaker.get_breaker('meta').state == circuit_breaker.OPEN
+    with pytest.raises(MetaApiError, match='meta circuit is open'):
+        client.get_campaigns()
+
+
+def test_pipedrive_requests_go_through_the_breaker(dead_url, monkeypatch):
+    monkeypatch.setattr(PipedriveConfig, 'MAX_RETRIES', 0)
+    client = PipedriveClient('fake-token', base_url=dead_url)
+
+    for _ in range(CircuitBreakerConfig.MIN_CALLS):
+        with pytest.raises(PipedriveError, match='Connection'):
+            client._get('persons')
+
+    assert circuit_breaker.get_breaker('pipedrive').state == circuit_breaker.OPEN
+    with pytest.raises(PipedriveError, match='pipedrive circuit is open'):
+        client._get('persons')
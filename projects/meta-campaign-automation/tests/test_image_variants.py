@@ -0,0 +1,64 @@
+"""Master sizing for derived formats and per-ratio result attribution"""
+
+import pytest
+
+from image_variants import master_size, generation_size, upscale_factor
+from leonardo_canva_workflow import (
+    VARIANT_SIZES, AspectRatio, CampaignImageWorkflow, GenerationJob
+)
+
+
+def crop_size(master, size):
+    """Size of the full-resolution crop of size's aspect ratio from master"""
+    ratio = size[0] / size[1]
+    if ratio < master[0] / master[1]:
+        return round(master[1] * ratio), master[1]
+    return master[0], round(master[0] / ratio)
+
+
+@pytest.mark.parametrize('ratios', [list(AspectRatio), [AspectRatio.INSTAGRAM_STORY, AspectRatio.FACEBOOK_FEED]])
+def test_master_covers_every_variant(ratios):
+    sizes = [VARIANT_SIZES[ratio] for ratio in ratios]
+    master = master_size(sizes)
+
+    assert master == (1920, 1920)
+    for size in sizes:
+        width, height = crop_size(master, size)
+        assert width >= size[0] and height >= size[1]
+
+
+def test_generated_master_is_upscaled_to_cover():
+    required = master_size(VARIANT_SIZES.values())
+    generated = generation_size(required)
+
+    assert max(generated) <= 1536 and all(side % 8 == 0 for side in generated)
+    factor = upscale_factor(generated, required)
+    assert generated[0] * factor >= required[0] and generated[1] * factor >= required[1]
+    assert upscale_factor(required, required) == 1.0
+
+
+def test_errors_are_listed_under_their_own_ratio():
+    ratios = [AspectRatio.FACEBOOK_FEED, AspectRatio.INSTAGRAM_STORY]
+    job = GenerationJob('voor_na_vergelijking', 'a', 'prompt', ratios)
+    job_results = [[
+        {"variant": "a", "index": 1, "aspect_ratio": "16:9", "local_path": "feed.png"},
+        {"variant": "a", "index": 1, "aspect_ratio": "9:16", "error": "render failed"},
+        *job.errors(Exception("download failed"), index=1),
+    ]]
+
+    workflow = CampaignImageWorkflow.__new__(CampaignImageWorkflow)
+    feed = workflow._campaign_result('voor_na_vergelijking', AspectRatio.FACEBOOK_FEED, job_results)
+    story = workflow._campaign_result('voor_na_vergelijking', AspectRatio.INSTAGRAM_STORY, job_results)
+
+    assert [image.get("error") for image in feed["images"]] == [None, "download failed"]
+    assert [image["error"] for image in story["images"]] == ["render failed", "download failed"]
+
+
+def test_single_ratio_master_is_sized_for_its_own_variant():
+    job = GenerationJob('voor_na_vergelijking', 'a', 'prompt', [AspectRatio.FACEBOOK_FEED])
+
+    assert job.required_size == VARIANT_SIZES[AspectRatio.FACEBOOK_FEED]
+    assert upscale_factor((1344, 768), job.required_size) == 1.0
+
+    job.aspect_ratios.append(AspectRatio.INSTAGRAM_STORY)
+    assert job.required_size == (1920, 1920)
@@ -0,0 +1,104 @@
+"""Async insights reports and paging against the fake Graph API server"""
+
+import pytest
+
+import main_server
+from meta_api_client import InsightsReportPending, MetaApiError, is_long_date_range
+
+
+def test_paginate_follows_cursors(meta_client, fake_graph):
+    campaigns = list(meta_client.iter_campaigns(page_size=40))
+
+    assert [c['id'] for c in campaigns] == [c['id'] for c in fake_graph.CAMPAIGNS]
+
+
+def test_short_range_is_synchronous(meta_client, fake_graph):
+    rows = list(meta_client.iter_account_insights(date_preset='last_7d', page_size=100))
+
+    assert len(rows) == len(fake_graph.CAMPAIGNS)
+    assert not is_long_date_range('last_7d')
+
+
+def test_long_range_submits_polls_and_paginates(meta_client, fake_graph):
+    before = set(fake_graph.REPORT_RUNS)
+
+    rows = list(meta_client.iter_account_insights(date_preset='last_90d', page_size=100))
+
+    (report_run_id,) = set(fake_graph.REPORT_RUNS) - before
+    assert fake_graph.REPORT_RUNS[report_run_id]['polls'] >= fake_graph.JOB_POLLS
+    assert len(rows) == len(fake_graph.CAMPAIGNS)
+    assert len({row['campaign_id'] for row in rows}) == len(fake_graph.CAMPAIGNS)
+
+
+def test_interactive_client_never_polls(interactive_client, fake_graph):
+    with pytest.raises(InsightsReportPending) as pending:
+        interactive_client.iter_account_insights(date_preset='last_90d')
+
+    report_run_id = pending.value.report_run_id
+    assert fake_graph.REPORT_RUNS[report_run_id]['polls'] == 0
+
+    # Each check is one status call; rows come once the job is complete
+    for _ in range(fake_graph.JOB_POLLS - 1):
+        with pytest.raises(InsightsReportPending):
+            interactive_client.completed_insights_report(report_run_id)
+    rows = list(interactive_client.completed_insights_report(report_run_id, page_size=100))
+
+    assert len(rows) == len(fake_graph.CAMPAIGNS)
+
+
+def test_unknown_report_run_raises(interactive_client):
+    with pytest.raises(MetaApiError):
+        interactive_client.completed_insights_report('404404404')
+
+
+@pytest.fixture
+def server(interactive_client, monkeypatch):
+    """Flask test client of main_server, without an insights store"""
+    service = main_server.CampaignAutomationService(interactive_client)
+    monkeypatch.setattr(main_server, '_api_client', interactive_client)
+    monkeypatch.setattr(main_server, '_campaign_service', service)
+    return main_server.app.test_client()
+
+
+def test_long_live_report_returns_job(server, fake_graph):
+    response = server.get('/api/report?days=90&source=live')
+
+    assert response.status_code == 202
+    job = response.get_json()
+    assert job['report_run_id'] in fake_graph.REPORT_RUNS
+
+    for _ in range(fake_graph.JOB_POLLS):
+        result = server.get(job['poll_url']).get_json()['job']
+    assert result['status'] == 'Job Completed'
+    assert len(result['report']['campaigns']) == len(fake_graph.CAMPAIGNS)
+
+
+def test_long_recommendations_return_job(server, fake_graph):
+    response = server.get('/api/report/recommendations?days=60')
+
+    assert response.status_code == 202
+    poll_url = response.get_json()['poll_url']
+    assert 'report_run_id=' in poll_url and 'days=60' in poll_url
+
+    for _ in range(fake_graph.JOB_POLLS - 1):
+        assert server.get(poll_url).status_code == 202
+    response = server.get(poll_url)
+
+    assert response.status_code == 200
+    assert response.get_json()['recommendations']['lookback_days'] == 60
+
+
+def test_long_campaign_insights_poll_the_campaign_route(server, fake_graph):
+    campaign_id = fake_graph.CAMPAIGNS[7]['id']
+    response = server.get(f'/api/campaigns/{campaign_id}/insights?days=90')
+
+    assert response.status_code == 202
+    poll_url = response.get_json()['poll_url']
+    assert poll_url.startswith(f'/api/campaigns/{campaign_id}/insights?')
+
+    for _ in range(fake_graph.JOB_POLLS - 1):
+        assert server.get(poll_url).status_code == 202
+    result = server.get(poll_url).get_json()
+
+    assert result['period'] == 'last_90d'
+    assert result['insights']['campaign_id'] == campaign_id
@@ -0,0 +1,66 @@
+"""Insights store sync and the request paths that read from it"""
+
+import pytest
+
+import main_server
+from insights_store import InsightsStore, InsightsStoreConfig
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(InsightsStoreConfig, 'BACKFILL_DAYS', 40)
+    return InsightsStore(str(tmp_path / 'insights.db'))
+
+
+@pytest.fixture
+def server(store, interactive_client, monkeypatch):
+    service = main_server.CampaignAutomationService(interactive_client, store)
+    monkeypatch.setattr(main_server, '_api_client', interactive_client)
+    monkeypatch.setattr(main_server, '_insights_store', store)
+    monkeypatch.setattr(main_server, '_campaign_service', service)
+    return main_server.app.test_client()
+
+
+def test_backfill_only_from_cli(server, store, meta_client, fake_graph):
+    assert store.needs_backfill()
+
+    response = server.post('/api/report/sync', json={})
+    assert response.status_code == 409
+    assert not store.has_data()
+
+    # CLI: blocking async report run
+    result = store.sync(meta_client)
+    assert result['rows'] == len(fake_graph.CAMPAIGNS) * (InsightsStoreConfig.BACKFILL_DAYS + 1)
+
+    response = server.post('/api/report/sync', json={})
+    assert response.status_code == 200
+    assert server.post('/api/report/sync', json={'full': True}).status_code == 409
+
+
+def test_recommendations_read_campaigns_from_store(server, store, meta_client, interactive_client, fake_graph):
+    store.sync(meta_client)
+    campaigns = store.get_campaigns()
+    assert campaigns[fake_graph.CAMPAIGNS[0]['id']]['daily_budget'] == int(fake_graph.CAMPAIGNS[0]['daily_budget'])
+
+    def no_graph_calls(*args, **kwargs):
+        raise AssertionError("campaigns should come from the store")
+
+    interactive_client.iter_campaigns = no_graph_calls
+
+    response = server.get('/api/report/recommendations?days=14')
+
+    assert response.status_code == 200
+    allocation = response.get_json()['recommendations']['allocation']
+    assert len(allocation) == len(fake_graph.CAMPAIGNS)
+
+
+def test_old_store_gets_daily_budget_column(tmp_path):
+    import sqlite3
+
+    db_path = str(tmp_path / 'old.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute('CREATE TABLE campaigns (id TEXT PRIMARY KEY, name TEXT, status TEXT, updated_at TEXT NOT NULL)')
+    conn.commit()
+    conn.close()
+
+    assert InsightsStore(db_path).get_campaigns() == {}
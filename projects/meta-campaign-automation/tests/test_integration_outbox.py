@@ -0,0 +1,77 @@
+"""Dead letters: retention of unreplayed letters and replay with open circuits"""
+
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+import circuit_breaker
+import integration_outbox
+from circuit_breaker import CircuitBreakerConfig, get_breaker
+from integration_outbox import IntegrationError, Outbox, ensure, register_handler
+
+
+@pytest.fixture
+def outbox(tmp_path, monkeypatch):
+    monkeypatch.setattr(circuit_breaker, '_breakers', {})
+    monkeypatch.setattr(integration_outbox, '_handlers', {})
+    monkeypatch.setattr(integration_outbox, '_dependencies', {})
+    monkeypatch.setattr(integration_outbox.OutboxConfig, 'HANDLER_MODULES', [])
+    return Outbox(str(tmp_path / 'outbox.db'))
+
+
+def dead_letter(outbox, kind, payload, age_days=0):
+    def failing(_):
+        raise IntegrationError(f"{kind} failed")
+
+    with pytest.raises(IntegrationError):
+        outbox.run(kind, payload, failing)
+
+    created_at = (datetime.now() - timedelta(days=age_days)).isoformat()
+    with sqlite3.connect(outbox.db_path) as conn:
+        conn.execute('UPDATE dead_letters SET created_at = ? WHERE created_at > ?', (created_at, created_at))
+
+
+def test_unreplayed_letters_expire(outbox):
+    dead_letter(outbox, 'lead.slack', {'email': 'old@example.nl'}, age_days=45)
+    dead_letter(outbox, 'lead.slack', {'email': 'new@example.nl'}, age_days=2)
+
+    purged = outbox.purge(days=30, retention_days=30)
+
+    assert purged == {'replayed': 0, 'expired': 1}
+    (letter,) = outbox.dead_letters()
+    assert 'new@example.nl' in letter['payload']
+
+
+def test_zero_retention_keeps_letters(outbox):
+    dead_letter(outbox, 'lead.slack', {'email': 'old@example.nl'}, age_days=400)
+
+    assert outbox.expire(retention_days=0) == 0
+    assert len(outbox.dead_letters()) == 1
+
+
+def test_replay_skips_kinds_with_an_open_circuit(outbox):
+    calls = []
+
+    def replay_slack(payload):
+        calls.append(payload)
+        # Like the lead handlers: an open circuit becomes an error result
+        return ensure({'error': 'slack circuit is open'}, 'lead.slack')
+
+    register_handler('lead.slack', replay_slack, dependency='slack')
+    register_handler('lead.zapier', lambda payload: calls.append(payload) or True, dependency='zapier')
+    dead_letter(outbox, 'lead.slack', {'lead_id': 1})
+    dead_letter(outbox, 'lead.zapier', {'lead_id': 2})
+
+    breaker = get_breaker('slack')
+    for _ in range(CircuitBreakerConfig.MIN_CALLS):
+        with pytest.raises(ConnectionError):
+            breaker.call(lambda: (_ for _ in ()).throw(ConnectionError('down')))
+    assert breaker.is_open()
+
+    summary = outbox.replay(rate=1000)
+
+    assert summary == {'selected': 2, 'replayed': 1, 'failed': 0, 'skipped': 1}
+    assert calls == [{'lead_id': 2}]
+    (letter,) = outbox.dead_letters()
+    assert letter['kind'] == 'lead.slack' and letter['attempts'] == 1
@@ -0,0 +1,122 @@
+"""Meta customer-information normalization and hashing (pii_hashing)"""
+
+import hashlib
+
+import pytest
+
+from pii_hashing import cache_info, hash_fields, hash_many, hash_pii, is_hashed, normalize
+
+
+def sha256(value):
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('0612345678', '31612345678'),
+    ('06-1234 5678', '31612345678'),
+    ('+31 6 12345678', '31612345678'),
+    ('31612345678', '31612345678'),
+    ('612345678', '31612345678'),
+    ('0313 123456', '31313123456'),
+    # Trunk zero written after the country code
+    ('+31 (0)6 12345678', '31612345678'),
+    ('+310612345678', '31612345678'),
+    # 00 international dialing prefix
+    ('0031 6 12345678', '31612345678'),
+    ('0031 (0)6 12345678', '31612345678'),
+    # Foreign numbers keep their own country code
+    ('+44 20 7946 0958', '442079460958'),
+    ('0044 20 7946 0958', '442079460958'),
+    ('+32 470 12 34 56', '32470123456'),
+    ('n.v.t.', None),
+    ('', None),
+])
+def test_phone(value, expected):
+    assert normalize(value, 'ph') == expected
+
+
+@pytest.mark.parametrize('field, value, expected', [
+    ('fn', ' Jan-Willem ', 'janwillem'),
+    ('ln', "D'Hondt", 'dhondt'),
+    ('ln', 'van der Berg', 'vanderberg'),
+    ('fn', 'Zoë', 'zoë'),
+    ('fn', 'José', 'josé'),
+    ('ln', 'Çelik-Öztürk', 'çeliköztürk'),
+    ('fn', 'Anne-Marie, Jr.', 'annemariejr'),
+    ('ct', 'Den Haag', 'denhaag'),
+    ('ct', "'s-Hertogenbosch", 'shertogenbosch'),
+    ('fn', ' - ', None),
+])
+def test_names_and_places(field, value, expected):
+    assert normalize(value, field) == expected
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('1234 AB', '1234ab'),
+    ('1234AB', '1234ab'),
+    (' 1234-ab ', '1234ab'),
+    ('SW1A 1AA', 'sw1a1aa'),
+    (1234, '1234'),
+])
+def test_zip_code(value, expected):
+    assert normalize(value, 'zp') == expected
+    assert normalize(value, 'zip_code') == expected
+
+
+@pytest.mark.parametrize('field, value, expected', [
+    ('em', ' Jan.Jansen@Example.NL ', 'jan.jansen@example.nl'),
+    ('email', 'JAN@EXAMPLE.NL', 'jan@example.nl'),
+    ('em', '   ', None),
+    ('country', 'NL', 'nl'),
+    ('external_id', ' CRM-42 ', 'crm-42'),
+])
+def test_other_fields(field, value, expected):
+    assert normalize(value, field) == expected
+
+
+def test_hash_pii():
+    assert hash_pii('JAN@example.nl ', 'em') == sha256('jan@example.nl')
+    assert hash_pii('06-1234 5678', 'phone') == sha256('31612345678')
+    assert hash_pii('', 'em') is None
+    assert hash_pii(None, 'ph') is None
+
+
+def test_hashed_values_pass_through():
+    digest = sha256('jan@example.nl')
+
+    assert is_hashed(digest)
+    assert hash_pii(digest, 'em') == digest
+    assert hash_pii(f' {digest}\n', 'ph') == digest
+    assert hash_fields({'em': digest, 'ph': digest}) == {'em': digest, 'ph': digest}
+    # Uppercase hex is not Meta's format: normalized and hashed like any value
+    assert not is_hashed(digest.upper())
+    assert hash_pii(digest.upper(), 'em') == sha256(digest)
+
+
+def test_hash_many_and_fields():
+    assert hash_many(['0612345678', '+31 6 12345678', None], 'phone') == [sha256('31612345678')] * 2 + [None]
+    assert hash_fields({'email': 'jan@example.nl', 'city': '', 'zp': '1234 AB'}) == {
+        'em': sha256('jan@example.nl'),
+        'zp': sha256('1234ab')
+    }
+
+
+def test_repeated_values_come_from_the_cache():
+    hash_pii('cache.check@example.nl', 'em')
+    before = cache_info()
+
+    # Differently written forms of the same value share one cache entry
+    assert hash_pii(' Cache.Check@Example.NL', 'em') == hash_pii('cache.check@example.nl', 'email')
+
+    after = cache_info()
+    assert after.hits == before.hits + 2
+    assert after.misses == before.misses
+
+
+def test_cache_is_per_field():
+    before = cache_info()
+
+    hash_pii('amsterdam-field-check', 'ct')
+    hash_pii('amsterdam-field-check', 'st')
+
+    assert cache_info().misses == before.misses + 2
@@ -0,0 +1,64 @@
+"""Template provisioning with Graph batch requests, against the fake Graph API server"""
+
+import pytest
+
+from campaign_automation import CampaignAutomationService, CampaignTemplates
+from meta_api_client import batch_operation
+
+
+@pytest.fixture
+def service(meta_client):
+    return CampaignAutomationService(meta_client)
+
+
+def test_named_operations_keep_their_response():
+    operation = batch_operation('POST', 'act_123/campaigns', body={'name': 'x'}, name='campaign_0')
+    assert operation['omit_response_on_success'] is False
+
+    assert 'omit_response_on_success' not in batch_operation('DELETE', '123')
+
+
+def test_fake_omits_named_responses_by_default(meta_client):
+    operation = batch_operation('POST', 'act_123/campaigns', body={'name': 'Omitted'}, name='campaign_0')
+    del operation['omit_response_on_success']
+
+    (result,) = meta_client.batch([operation])
+
+    assert 'Not executed' in result['error']['message']
+
+
+def test_provision_template(service, fake_graph):
+    template = CampaignTemplates.cold_hr_directors()
+
+    result = service.create_campaign_from_template(template)
+
+    campaign_id = result['campaign']['id']
+    assert fake_graph.CREATED_OBJECTS[campaign_id]['type'] == 'campaign'
+    assert len(result['ad_sets']) == len(template.audience_segments)
+    for ad_set in result['ad_sets']:
+        assert fake_graph.CREATED_OBJECTS[ad_set['id']]['campaign_id'] == campaign_id
+
+
+def test_failed_ad_set_rolls_back_campaign(service, fake_graph, monkeypatch):
+    template = CampaignTemplates.cold_hr_directors()
+    failing_segment = template.audience_segments[-1].value
+    monkeypatch.setattr(fake_graph, 'FAIL_MATCH', f'{template.name} - {failing_segment}')
+    before = set(fake_graph.CREATED_OBJECTS)
+
+    (result,) = service.provision_templates([template])
+
+    assert 'error' in result
+    # Campaign and the ad sets that were created are deleted again
+    assert len(result['rolled_back']) == len(template.audience_segments)
+    assert set(fake_graph.CREATED_OBJECTS) == before
+
+
+def test_all_or_nothing_rolls_back_successful_templates(service, fake_graph, monkeypatch):
+    templates = CampaignTemplates.get_all_templates()
+    monkeypatch.setattr(fake_graph, 'FAIL_MATCH', templates[-1].name)
+    before = set(fake_graph.CREATED_OBJECTS)
+
+    results = service.provision_templates(templates, all_or_nothing=True)
+
+    assert all('error' in result for result in results)
+    assert set(fake_graph.CREATED_OBJECTS) == before
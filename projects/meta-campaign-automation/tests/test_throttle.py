@@ -0,0 +1,44 @@
+"""Meta throttle budgets: request handlers fail fast, bulk CLIs wait"""
+
+import time
+from collections import deque
+
+import pytest
+
+from meta_api_client import MetaApiError
+from meta_throttle import MetaThrottle, ThrottleBlocked, ThrottleConfig
+
+
+@pytest.fixture
+def call_budget(fake_graph, monkeypatch):
+    """Fake Graph business use case limit of 3 calls per minute"""
+    monkeypatch.setattr(fake_graph, 'CALL_BUDGET', 3)
+    monkeypatch.setattr(fake_graph, 'CALL_TIMES', deque())
+    return fake_graph
+
+
+def test_interactive_client_fails_fast_when_rate_limited(interactive_client, call_budget):
+    started = time.perf_counter()
+    errors = []
+    for _ in range(6):
+        try:
+            interactive_client.get_campaigns()
+        except MetaApiError as e:
+            errors.append(e)
+    elapsed = time.perf_counter() - started
+
+    # The first listing uses up the budget, the usage headers block the account
+    assert len(errors) == 5
+    assert elapsed < ThrottleConfig.INTERACTIVE_MAX_WAIT
+    # The account is blocked for the bulk clients too, but they may wait for it
+    wait = interactive_client.throttle.reserve('act_123')
+    assert ThrottleConfig.INTERACTIVE_MAX_WAIT < wait <= ThrottleConfig.MAX_WAIT
+
+
+def test_reserve_honours_the_callers_budget():
+    throttle = MetaThrottle()
+    throttle.record_rate_limit('act_1', 17)
+
+    with pytest.raises(ThrottleBlocked):
+        throttle.reserve('act_1', max_wait=ThrottleConfig.INTERACTIVE_MAX_WAIT)
+    assert 0 < throttle.reserve('act_1') <= ThrottleConfig.DEFAULT_BLOCK
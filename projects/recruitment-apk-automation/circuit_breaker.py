@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+CIRCUIT BREAKERS
+================
+One circuit breaker per outbound dependency (Claude, Pipedrive, Meta,
+Slack, Zapier, SMTP), so an upstream outage costs microseconds per
+request instead of a full timeout that ties up a worker.
+
+Each breaker watches the calls of the last WINDOW seconds:
+- CLOSED      calls go through; once MIN_CALLS calls were made and the
+              share of failures (errors, timeouts, 5xx) or of slow calls
+              (slower than the dependency's latency threshold) reaches its
+              limit, the breaker opens
+- OPEN        calls fail immediately with CircuitOpenError for OPEN_SECONDS
+- HALF_OPEN   a single probe call is let through; success closes the
+              breaker, failure opens it again
+
+Callers already handle failures of these integrations (fallback report,
+None deal, error dict), and CircuitOpenError takes the same path.
+
+Usage:
+    response = get_breaker('pipedrive').call(
+        requests.get, url, params=params, timeout=30,
+        failure_if=server_error
+    )
+
+    # /health
+    breaker_states()  ->  {'pipedrive': {'state': 'open', ...}, ...}
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any, Callable, Optional
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+# ==============================================================================
+# CONFIGURATION
+# ==============================================================================
+
+class CircuitBreakerConfig:
+    """Circuit Breaker Configuration"""
+    # Calls in the last WINDOW seconds decide the state
+    WINDOW = int(os.getenv('CIRCUIT_BREAKER_WINDOW', '60'))  # seconds
+
+    # Fewer calls than this in the window never open the breaker
+    MIN_CALLS = int(os.getenv('CIRCUIT_BREAKER_MIN_CALLS', '5'))
+
+    # Share of failed / slow calls in the window that opens the breaker
+    FAILURE_RATE = float(os.getenv('CIRCUIT_BREAKER_FAILURE_RATE', '0.5'))
+    SLOW_CALL_RATE = float(os.getenv('CIRCUIT_BREAKER_SLOW_CALL_RATE', '0.8'))
+
+    # Time an open breaker rejects calls before probing
+    OPEN_SECONDS = int(os.getenv('CIRCUIT_BREAKER_OPEN_SECONDS', '30'))
+
+    # Calls slower than this count as slow, per dependency (below their timeouts)
+    SLOW_CALL_SECONDS = {
+        'claude': 45.0,
+        'pipedrive': 10.0,
+        'meta': 10.0,
+        'slack': 5.0,
+        'zapier': 5.0,
+        'smtp': 15.0
+    }
+    DEFAULT_SLOW_CALL_SECONDS = 10.0
+
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """A call was rejected because its dependency's breaker is open"""
+
+    def __init__(self, dependency: str, retry_after: float):
+        self.dependency = dependency
+        self.retry_after = retry_after
+        super().__init__(f"{dependency} circuit is open (retry in {retry_after:.0f}s)")
+
+
+def server_error(response) -> bool:
+    """failure_if for requests responses: 5xx means the dependency is unhealthy"""
+    return response.status_code >= 500
+
+
+# ==============================================================================
+# CIRCUIT BREAKER
+# ==============================================================================
+
+class CircuitBreaker:
+    """
+    Error-rate and latency circuit breaker for one dependency
+
+    Thread-safe; the check before a call is a lock and a few comparisons.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        slow_call_seconds: float = None,
+        window: int = None,
+        min_calls: int = None,
+        failure_rate: float = None,
+        slow_call_rate: float = None,
+        open_seconds: int = None
+    ):
+        self.name = name
+        self.slow_call_seconds = slow_call_seconds or CircuitBreakerConfig.SLOW_CALL_SECONDS.get(
+            name, CircuitBreakerConfig.DEFAULT_SLOW_CALL_SECONDS
+        )
+        self.window = window or CircuitBreakerConfig.WINDOW
+        self.min_calls = min_calls or CircuitBreakerConfig.MIN_CALLS
+        self.failure_rate = failure_rate or CircuitBreakerConfig.FAILURE_RATE
+        self.slow_call_rate = slow_call_rate or CircuitBreakerConfig.SLOW_CALL_RATE
+        self.open_seconds = open_seconds or CircuitBreakerConfig.OPEN_SECONDS
+
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.last_error: Optional[str] = None
+        self.rejected = 0
+
+        # (finished_at, failed, slow) per call in the window
+        self._calls: deque = deque()
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def _trim(self, now: float) -> None:
+        while self._calls and self._calls[0][0] < now - self.window:
+            self._calls.popleft()
+
+    def _open(self, now: float, reason: str) -> None:
+        self.state = OPEN
+        self.opened_at = now
+        self._probe_in_flight = False
+        logger.warning(f"Circuit {self.name} opened: {reason}")
+
+    def before_call(self) -> None:
+        """Let a call through or raise CircuitOpenError"""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+
+            now = time.monotonic()
+            if self.state == OPEN:
+                retry_after = self.opened_at + self.open_seconds - now
+                if retry_after > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, retry_after)
+                self.state = HALF_OPEN
+                logger.info(f"Circuit {self.name} half-open: probing")
+
+            # HALF_OPEN: one probe at a time
+            if self._probe_in_flight:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, 0)
+            self._probe_in_flight = True
+
+    def after_call(self, duration: float, failed: bool, error: str = None) -> None:
+        """Record the outcome of a call let through by before_call"""
+        slow = duration >= self.slow_call_seconds
+        with self._lock:
+            now = time.monotonic()
+            if failed:
+                self.last_error = error
+
+            if self.state == HALF_OPEN:
+                self._probe_in_flight = False
+                if failed or slow:
+                    self._open(now, f"probe {'failed' if failed else 'was slow'} ({error or f'{duration:.1f}s'})")
+                else:
+                    self.state = CLOSED
+                    self._calls.clear()
+                    logger.info(f"Circuit {self.name} closed: probe succeeded")
+                return
+
+            if self.state == OPEN:
+                # A call that started before the breaker opened
+                return
+
+            self._calls.append((now, failed, slow))
+            self._trim(now)
+
+            total = len(self._calls)
+            if total < self.min_calls:
+                return
+            failures = sum(1 for _, call_failed, _ in self._calls if call_failed)
+            slow_calls = sum(1 for _, _, call_slow in self._calls if call_slow)
+
+            if failures / total >= self.failure_rate:
+                self._open(now, f"{failures}/{total} calls failed in {self.window}s (last: {self.last_error})")
+            elif slow_calls / total >= self.slow_call_rate:
+                self._open(now, f"{slow_calls}/{total} calls slower than {self.slow_call_seconds}s")
+
+    def is_open(self) -> bool:
+        """True while calls would be rejected (no state change, no probe used up)"""
+        with self._lock:
+            if self.state == OPEN:
+                return time.monotonic() < self.opened_at + self.open_seconds
+            return self.state == HALF_OPEN and self._probe_in_flight
+
+    def call(self, func: Callable, *args, failure_if: Callable[[Any], bool] = None, **kwargs) -> Any:
+        """
+        Call func through the breaker
+
+        Exceptions count as failures and are re-raised; failure_if marks
+        returned values as failures too (e.g. server_error for HTTP 5xx),
+        those are returned as usual.
+
+        Raises:
+            CircuitOpenError without calling func while the breaker is open
+        """
+        self.before_call()
+        started = time.monotonic()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self.after_call(time.monotonic() - started, failed=True, error=f"{type(e).__name__}: {e}")
+            raise
+
+        failed = bool(failure_if and failure_if(result))
+        self.after_call(
+            time.monotonic() - started,
+            failed=failed,
+            error=f"HTTP {getattr(result, 'status_code', '?')}" if failed else None
+        )
+        return result
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            return {
+                'state': self.state,
+                'calls_in_window': len(self._calls),
+                'failures_in_window': sum(1 for _, failed, _ in self._calls if failed),
+                'slow_in_window': sum(1 for _, _, slow in self._calls if slow),
+                'retry_in': round(max(0.0, self.opened_at + self.open_seconds - now), 1) if self.state == OPEN else 0,
+                'rejected': self.rejected,
+                'last_error': self.last_error
+            }
+
+
+# ==============================================================================
+# REGISTRY
+# ==============================================================================
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Breaker for a dependency, shared by every caller in the process"""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _registry_lock:
+            breaker = _breakers.setdefault(name, CircuitBreaker(name))
+    return breaker
+
+
+def breaker_states() -> Dict[str, Dict[str, Any]]:
+    """Status of every breaker used so far (for /health)"""
+    return {name: breaker.status() for name, breaker in sorted(_breakers.items())}
+
+
+def any_open() -> bool:
+    return any(breaker.state != CLOSED for breaker in list(_breakers.values()))
+
+
+# ==============================================================================
+# MAIN (for testing)
+# ==============================================================================
+
+if __name__ == '__main__':
+    breaker = CircuitBreaker('test', min_calls=3, open_seconds=1)
+
+    def failing():
+        raise ConnectionError("upstream down")
+
+    for _ in range(3):
+        try:
+            breaker.call(failing)
+        except ConnectionError:
+            pass
+    assert breaker.state == OPEN
+
+    started = time.perf_counter()
+    try:
+        breaker.call(failing)
+        raise AssertionError("open breaker should reject")
+    except CircuitOpenError as e:
+        print(f"Rejected in {(time.perf_counter() - started) * 1e6:.0f}µs: {e}")
+
+    time.sleep(1.1)
+    assert breaker.call(lambda: 'ok') == 'ok'
+    assert breaker.state == CLOSED, "successful probe closes the breaker"
+    print(breaker.status())
@@ -26,6 +26,8 @@ import requests
 from threading import Thread
 import time
 
+from circuit_breaker import get_breaker, server_error
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -316,14 +318,15 @@ def pipedrive_request(method: str, endpoint: str, data: Dict = None) -> Optional
     """Make request to Pipedrive API"""
     url = f"{PIPEDRIVE_BASE_URL}/{endpoint}"
     params = {"api_token": PIPEDRIVE_API_TOKEN}
+    breaker = get_breaker('pipedrive')
 
     try:
         if method == "GET":
-            response = requests.get(url, params=params, timeout=30)
+            response = breaker.call(requests.get, url, params=params, timeout=30, failure_if=server_error)
         elif method == "POST":
-            response = requests.post(url, params=params, json=data, timeout=30)
+            response = breaker.call(requests.post, url, params=params, json=data, timeout=30, failure_if=server_error)
         elif method == "PUT":
-            response = requests.put(url, params=params, json=data, timeout=30)
+            response = breaker.call(requests.put, url, params=params, json=data, timeout=30, failure_if=server_error)
         else:
             return None
 
@@ -418,10 +421,13 @@ def send_sequence_email(deal_id: int, email_num: int, to_email: str,
         msg.attach(MIMEText(html_content, 'html'))
 
         # Send
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
-            server.starttls()
-            server.login(SMTP_USER, SMTP_PASS)
-            server.send_message(msg)
+        def deliver():
+            with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=30) as server:
+                server.starttls()
+                server.login(SMTP_USER, SMTP_PASS)
+                server.send_message(msg)
+
+        get_breaker('smtp').call(deliver)
 
         logger.info(f"Email {email_num} sent to {to_email} for deal {deal_id}")
 
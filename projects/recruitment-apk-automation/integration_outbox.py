@@ -0,0 +1,569 @@
+#!/usr/bin/env python3
+"""
+INTEGRATION OUTBOX
+==================
+Durable record of outbound side effects (Slack, Pipedrive, Zapier, email,
+Conversion API), so a failed integration call is kept for replay instead
+of only being logged.
+
+Every side effect is written to the outbox (SQLite, WAL) before it is
+executed, under a kind ('lead.pipedrive', 'conversion_api.events', ...)
+and a JSON payload with everything needed to execute it again:
+- success         the outbox row is removed
+- failure         the row moves to the dead_letters table with the error,
+                  its type and the traceback
+- process crash   the row stays pending; `recover` turns pending rows older
+                  than STALE_AFTER into dead letters
+
+Modules register a handler per kind (register_handler), so dead letters
+can be replayed later, e.g. after a Pipedrive outage. A handler names the
+circuit breaker of its dependency; replay skips (and keeps) the letters of
+kinds whose circuit is open instead of failing them again.
+
+Payloads hold personal data (names, emails, phone numbers), so dead
+letters are not kept forever: replayed letters are dropped by
+`purge --days`, and letters that were never replayed expire RETENTION_DAYS
+after they were created (OUTBOX_RETENTION_DAYS, default 30; run `purge`
+daily, `replay` also expires them first). Expired letters are deleted with
+their payload, error and traceback; only a count per kind is logged.
+
+CLI:
+    python integration_outbox.py status
+    python integration_outbox.py list --kind lead.pipedrive
+    python integration_outbox.py replay --concurrency 4 --rate 2
+    python integration_outbox.py replay --kind apk.pipedrive_deal --ids 12 13
+    python integration_outbox.py purge --days 30         # drop replayed and expired dead letters
+
+Usage:
+    register_handler('lead.slack', replay_slack, dependency='slack')
+    result = get_outbox().run('lead.slack', asdict(lead), handler)
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+import traceback
+import importlib
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Iterator, Callable
+
+from circuit_breaker import get_breaker, CircuitOpenError
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+# ==============================================================================
+# CONFIGURATION
+# ==============================================================================
+
+class OutboxConfig:
+    """Integration Outbox Configuration"""
+    DB_PATH = os.getenv('OUTBOX_DB_PATH', './data/outbox.db')
+
+    # Pending rows older than this were interrupted by a crash or restart
+    STALE_AFTER = 15 * 60  # seconds
+
+    # Replay defaults
+    REPLAY_CONCURRENCY = 4
+    REPLAY_RATE = 2.0  # calls per second over all workers
+
+    # Traceback characters kept per dead letter
+    MAX_TRACEBACK = 4000
+
+    # Days an unreplayed dead letter (and the personal data in its payload)
+    # is kept before it expires (0 keeps them until they are replayed)
+    RETENTION_DAYS = int(os.getenv('OUTBOX_RETENTION_DAYS', '30'))
+
+    # Modules whose import registers handlers (missing ones are skipped)
+    HANDLER_MODULES = ['pixel_tracking', 'lead_ads_handler', 'webhook_handler_apk']
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS dead_letters (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    error TEXT,
+    error_type TEXT,
+    traceback TEXT,
+    attempts INTEGER NOT NULL DEFAULT 1,
+    created_at TEXT NOT NULL,
+    failed_at TEXT NOT NULL,
+    replayed_at TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_dead_letters_open ON dead_letters (kind, id) WHERE replayed_at IS NULL;
+"""
+
+
+class IntegrationError(Exception):
+    """An integration call reported failure without raising"""
+
+    def __init__(self, message: str, result: Any = None):
+        self.result = result
+        super().__init__(message)
+
+
+def ensure(result: Any, what: str) -> Any:
+    """Raise IntegrationError for a falsy or {'error': ...} result, else return it"""
+    if not result:
+        raise IntegrationError(f"{what} failed", result)
+    if isinstance(result, dict) and 'error' in result:
+        raise IntegrationError(f"{what} failed: {result['error']}", result)
+    return result
+
+
+# ==============================================================================
+# HANDLER REGISTRY
+# ==============================================================================
+
+_handlers: Dict[str, Callable[[Dict[str, Any]], Any]] = {}
+
+# kind -> circuit breaker name of the dependency its handler calls
+_dependencies: Dict[str, str] = {}
+
+
+def register_handler(
+    kind: str,
+    handler: Callable[[Dict[str, Any]], Any],
+    dependency: str = None
+) -> None:
+    """
+    Register how to (re-)execute a kind of side effect from its payload
+
+    Args:
+        dependency: circuit_breaker name the handler calls through; replay
+                    skips the kind while that circuit is open
+    """
+    _handlers[kind] = handler
+    if dependency:
+        _dependencies[kind] = dependency
+
+
+def load_handlers() -> Dict[str, Callable[[Dict[str, Any]], Any]]:
+    """Import the modules that register handlers"""
+    for module in OutboxConfig.HANDLER_MODULES:
+        try:
+            importlib.import_module(module)
+        except Exception as e:
+            logger.debug(f"Outbox handlers of {module} not available: {e}")
+
+    # Run as a script this module is __main__, while the handler modules
+    # registered with the imported integration_outbox
+    return importlib.import_module('integration_outbox')._handlers
+
+
+def handler_dependency(kind: str) -> Optional[str]:
+    """Circuit breaker name registered for a kind (after load_handlers)"""
+    return importlib.import_module('integration_outbox')._dependencies.get(kind)
+
+
+# ==============================================================================
+# OUTBOX
+# ==============================================================================
+
+class Outbox:
+    """
+    SQLite outbox and dead-letter queue
+
+    Usage:
+        outbox = Outbox()
+        deal = outbox.run('lead.pipedrive', asdict(lead), create_deal)
+    """
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or OutboxConfig.DB_PATH
+
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection per unit of work"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    # ==========================================================================
+    # RECORDING
+    # ==========================================================================
+
+    def record(self, kind: str, payload: Dict[str, Any]) -> int:
+        """Write a side effect to the outbox before executing it"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                'INSERT INTO outbox (kind, payload, created_at) VALUES (?, ?, ?)',
+                (kind, json.dumps(payload, default=str), datetime.now().isoformat())
+            )
+        return cursor.lastrowid
+
+    def complete(self, entry_id: int) -> None:
+        with self._connect() as conn:
+            conn.execute('DELETE FROM outbox WHERE id = ?', (entry_id,))
+
+    def fail(self, entry_id: int, error: BaseException) -> None:
+        """Move an outbox row to the dead letters, with its error context"""
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO dead_letters (kind, payload, error, error_type, traceback, created_at, failed_at) '
+                'SELECT kind, payload, ?, ?, ?, created_at, ? FROM outbox WHERE id = ?',
+                (
+                    str(error),
+                    type(error).__name__,
+                    ''.join(traceback.format_exception(error))[-OutboxConfig.MAX_TRACEBACK:],
+                    datetime.now().isoformat(),
+                    entry_id
+                )
+            )
+            conn.execute('DELETE FROM outbox WHERE id = ?', (entry_id,))
+
+    def run(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        handler: Callable[[Dict[str, Any]], Any] = None
+    ) -> Any:
+        """
+        Record, execute and settle one side effect
+
+        Args:
+            kind: Registered kind (its handler is used when none is given)
+            payload: JSON-serializable input of the handler
+            handler: Callable executing the side effect; raises on failure
+
+        Returns:
+            The handler's result
+
+        Raises:
+            Whatever the handler raised, after the dead letter is stored
+        """
+        handler = handler or _handlers[kind]
+
+        try:
+            entry_id = self.record(kind, payload)
+        except sqlite3.Error as e:
+            # Never let the outbox itself block an integration
+            logger.error(f"Outbox unavailable ({str(e)}), running {kind} unrecorded")
+            return handler(payload)
+
+        try:
+            result = handler(payload)
+        except Exception as e:
+            logger.error(f"{kind} failed, stored as dead letter: {str(e)}")
+            self._settle(self.fail, entry_id, e)
+            raise
+
+        self._settle(self.complete, entry_id)
+        return result
+
+    def _settle(self, action: Callable, *args) -> None:
+        try:
+            action(*args)
+        except sqlite3.Error as e:
+            logger.error(f"Outbox update failed ({str(e)}); row {args[0]} stays pending")
+
+    def recover(self, older_than: int = None) -> int:
+        """Turn pending rows of interrupted runs into dead letters"""
+        cutoff = (datetime.now() - timedelta(seconds=older_than or OutboxConfig.STALE_AFTER)).isoformat()
+        with self._connect() as conn:
+            rows = conn.execute('SELECT id FROM outbox WHERE created_at < ?', (cutoff,)).fetchall()
+        for row in rows:
+            self.fail(row['id'], IntegrationError("Interrupted: still pending after a crash or restart"))
+        if rows:
+            logger.warning(f"Recovered {len(rows)} interrupted outbox entries as dead letters")
+        return len(rows)
+
+    # ==========================================================================
+    # DEAD LETTERS
+    # ==========================================================================
+
+    def dead_letters(
+        self,
+        kind: str = None,
+        ids: List[int] = None,
+        limit: int = None,
+        include_replayed: bool = False
+    ) -> List[Dict[str, Any]]:
+        query = 'SELECT * FROM dead_letters WHERE 1 = 1'
+        params: List[Any] = []
+        if not include_replayed:
+            query += ' AND replayed_at IS NULL'
+        if kind:
+            query += ' AND kind = ?'
+            params.append(kind)
+        if ids:
+            query += f" AND id IN ({','.join('?' * len(ids))})"
+            params.extend(ids)
+        query += ' ORDER BY id'
+        if limit:
+            query += ' LIMIT ?'
+            params.append(limit)
+
+        with self._connect() as conn:
+            return [dict(row) for row in conn.execute(query, params).fetchall()]
+
+    def mark_replayed(self, dead_letter_id: int) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                'UPDATE dead_letters SET replayed_at = ?, attempts = attempts + 1 WHERE id = ?',
+                (datetime.now().isoformat(), dead_letter_id)
+            )
+
+    def mark_failed(self, dead_letter_id: int, error: BaseException) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                'UPDATE dead_letters SET error = ?, error_type = ?, traceback = ?, failed_at = ?, '
+                'attempts = attempts + 1 WHERE id = ?',
+                (
+                    str(error),
+                    type(error).__name__,
+                    ''.join(traceback.format_exception(error))[-OutboxConfig.MAX_TRACEBACK:],
+                    datetime.now().isoformat(),
+                    dead_letter_id
+                )
+            )
+
+    def purge(self, days: int, retention_days: int = None) -> Dict[str, int]:
+        """
+        Delete dead letters replayed more than `days` ago, and expire old unreplayed ones
+
+        Returns:
+            {'replayed': deleted replayed letters, 'expired': see expire}
+        """
+        cutoff = (datetime.now() - timedelta(days=days)).isoformat()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                'DELETE FROM dead_letters WHERE replayed_at IS NOT NULL AND replayed_at < ?', (cutoff,)
+            )
+        return {'replayed': cursor.rowcount, 'expired': self.expire(retention_days)}
+
+    def expire(self, retention_days: int = None) -> int:
+        """
+        Delete unreplayed dead letters created more than retention_days ago
+
+        Their payloads hold personal data that must not be kept
+        indefinitely; the deleted count per kind is logged.
+
+        Returns:
+            Number of expired dead letters
+        """
+        retention_days = OutboxConfig.RETENTION_DAYS if retention_days is None else retention_days
+        if retention_days <= 0:
+            return 0
+
+        cutoff = (datetime.now() - timedelta(days=retention_days)).isoformat()
+        with self._connect() as conn:
+            by_kind = conn.execute(
+                'SELECT kind, COUNT(*) AS expired FROM dead_letters '
+                'WHERE replayed_at IS NULL AND created_at < ? GROUP BY kind', (cutoff,)
+            ).fetchall()
+            conn.execute('DELETE FROM dead_letters WHERE replayed_at IS NULL AND created_at < ?', (cutoff,))
+
+        for row in by_kind:
+            logger.warning(
+                f"Expired {row['expired']} unreplayed {row['kind']} dead letters "
+                f"older than {retention_days} days"
+            )
+        return sum(row['expired'] for row in by_kind)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            pending = conn.execute('SELECT COUNT(*) FROM outbox').fetchone()[0]
+            by_kind = conn.execute(
+                'SELECT kind, COUNT(*) AS dead, MIN(failed_at) AS oldest FROM dead_letters '
+                'WHERE replayed_at IS NULL GROUP BY kind ORDER BY kind'
+            ).fetchall()
+            replayed = conn.execute('SELECT COUNT(*) FROM dead_letters WHERE replayed_at IS NOT NULL').fetchone()[0]
+        return {
+            'db_path': self.db_path,
+            'pending': pending,
+            'dead_letters': {row['kind']: {'count': row['dead'], 'oldest': row['oldest']} for row in by_kind},
+            'replayed': replayed
+        }
+
+    # ==========================================================================
+    # REPLAY
+    # ==========================================================================
+
+    def replay(
+        self,
+        kind: str = None,
+        ids: List[int] = None,
+        limit: int = None,
+        concurrency: int = None,
+        rate: float = None,
+        dry_run: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Re-execute dead letters with their registered handlers
+
+        Args:
+            kind: Only this kind
+            ids: Only these dead letter IDs
+            limit: At most this many dead letters
+            concurrency: Parallel workers
+            rate: Calls per second over all workers
+            dry_run: List what would be replayed
+
+        Returns:
+            {'selected', 'replayed', 'failed', 'skipped'} ('skipped': no handler
+            or the dependency's circuit is open; those letters are kept as they are)
+        """
+        handlers = load_handlers()
+        letters = self.dead_letters(kind=kind, ids=ids, limit=limit)
+        summary = {'selected': len(letters), 'replayed': 0, 'failed': 0, 'skipped': 0}
+
+        if dry_run or not letters:
+            for letter in letters:
+                logger.info(f"[dry run] Would replay #{letter['id']} {letter['kind']}: {letter['error']}")
+            return summary
+
+        interval = 1.0 / (rate or OutboxConfig.REPLAY_RATE)
+        next_slot = [time.monotonic()]
+        slot_lock = threading.Lock()
+        summary_lock = threading.Lock()
+
+        def wait_for_slot():
+            with slot_lock:
+                slot = max(next_slot[0], time.monotonic())
+                next_slot[0] = slot + interval
+            time.sleep(max(0.0, slot - time.monotonic()))
+
+        def circuit_open(letter: Dict[str, Any]) -> bool:
+            dependency = handler_dependency(letter['kind'])
+            if dependency and get_breaker(dependency).is_open():
+                logger.warning(f"{dependency} circuit is open, skipping #{letter['id']} {letter['kind']}")
+                return True
+            return False
+
+        def replay_one(letter: Dict[str, Any]) -> str:
+            handler = handlers.get(letter['kind'])
+            if handler is None:
+                logger.warning(f"No handler registered for {letter['kind']}, skipping #{letter['id']}")
+                return 'skipped'
+
+            # Handlers turn an open circuit into an error result, so check
+            # the breaker before the call (and again once the slot is due)
+            if circuit_open(letter):
+                return 'skipped'
+            wait_for_slot()
+            if circuit_open(letter):
+                return 'skipped'
+
+            try:
+                handler(json.loads(letter['payload']))
+            except Exception as e:
+                if isinstance(e, CircuitOpenError):
+                    # Not attempted: the dependency is known to be down
+                    return 'skipped'
+                logger.error(f"Replay of #{letter['id']} {letter['kind']} failed: {str(e)}")
+                self.mark_failed(letter['id'], e)
+                return 'failed'
+
+            self.mark_replayed(letter['id'])
+            logger.info(f"Replayed #{letter['id']} {letter['kind']}")
+            return 'replayed'
+
+        with ThreadPoolExecutor(max_workers=concurrency or OutboxConfig.REPLAY_CONCURRENCY) as executor:
+            for outcome in executor.map(replay_one, letters):
+                with summary_lock:
+                    summary[outcome] += 1
+
+        logger.info(
+            f"Replay finished: {summary['replayed']} replayed, {summary['failed']} failed, "
+            f"{summary['skipped']} skipped of {summary['selected']}"
+        )
+        return summary
+
+
+# One outbox per process (opened on first use)
+_outbox: Optional[Outbox] = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox() -> Outbox:
+    global _outbox
+    if _outbox is None:
+        with _outbox_lock:
+            if _outbox is None:
+                _outbox = Outbox()
+    return _outbox
+
+
+# ==============================================================================
+# CLI INTERFACE
+# ==============================================================================
+
+def main():
+    """Command line interface"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect and replay failed integration calls")
+    parser.add_argument("command", choices=["status", "list", "replay", "purge"],
+                        help="status: counts per kind, list: dead letters, replay: re-execute, "
+                             "purge: drop replayed and expired dead letters")
+    parser.add_argument("--kind", help="Only this kind (e.g. lead.pipedrive)")
+    parser.add_argument("--ids", type=int, nargs="+", help="Only these dead letter IDs")
+    parser.add_argument("--limit", type=int, help="At most this many dead letters")
+    parser.add_argument("--concurrency", type=int, default=OutboxConfig.REPLAY_CONCURRENCY, help="Parallel workers")
+    parser.add_argument("--rate", type=float, default=OutboxConfig.REPLAY_RATE, help="Calls per second")
+    parser.add_argument("--dry-run", action="store_true", help="Show what would be replayed")
+    parser.add_argument("--days", type=int, default=30, help="purge: replayed more than this many days ago")
+    parser.add_argument("--retention-days", type=int, default=OutboxConfig.RETENTION_DAYS,
+                        help="purge/replay: expire unreplayed dead letters created more than this many days ago")
+    parser.add_argument("--db", default=OutboxConfig.DB_PATH, help="SQLite outbox path")
+
+    args = parser.parse_args()
+    outbox = Outbox(args.db)
+
+    if args.command == "status":
+        print(json.dumps(outbox.stats(), indent=2))
+
+    elif args.command == "list":
+        for letter in outbox.dead_letters(kind=args.kind, ids=args.ids, limit=args.limit):
+            print(f"#{letter['id']:<6} {letter['kind']:<24} attempts={letter['attempts']} "
+                  f"failed_at={letter['failed_at']}  {letter['error_type']}: {letter['error']}")
+
+    elif args.command == "replay":
+        outbox.recover()
+        outbox.expire(args.retention_days)
+        summary = outbox.replay(
+            kind=args.kind,
+            ids=args.ids,
+            limit=args.limit,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            dry_run=args.dry_run
+        )
+        print(json.dumps(summary, indent=2))
+
+    elif args.command == "purge":
+        purged = outbox.purge(args.days, args.retention_days)
+        print(f"Purged {purged['replayed']} replayed and {purged['expired']} expired dead letters")
+
+
+if __name__ == "__main__":
+    main()
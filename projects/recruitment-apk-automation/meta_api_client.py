@@ -30,6 +30,8 @@ import requests
 from dataclasses import dataclass
 from enum import Enum
 
+from pii_hashing import hash_pii
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -596,27 +598,18 @@ def verify_webhook_signature(payload: bytes, signature: str, app_secret: str) ->
     return hmac.compare_digest(f'sha256={expected_signature}', signature)
 
 
-def hash_user_data(value: str, data_type: str = 'email') -> str:
+def hash_user_data(value: str, data_type: str = 'email') -> Optional[str]:
     """
     Hash user data for Conversion API
 
     Args:
         value: Value to hash
-        data_type: Type of data (email, phone, etc.)
+        data_type: Type of data (email, phone, first_name, ... or em, ph, fn, ...)
 
     Returns:
-        SHA256 hashed and lowercase value
+        SHA256 hash of the normalized value (see pii_hashing), None if nothing usable is left
     """
-    normalized = value.lower().strip()
-
-    if data_type == 'phone':
-        # Remove non-digits
-        normalized = ''.join(filter(str.isdigit, normalized))
-        # Add country code if missing
-        if not normalized.startswith('31'):
-            normalized = '31' + normalized.lstrip('0')
-
-    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+    return hash_pii(value, data_type)
 
 
 # ==============================================================================
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+PII NORMALIZATION & HASHING
+===========================
+One implementation of Meta's customer-information normalization and
+SHA-256 hashing, shared by the Conversion API (pixel_tracking), customer
+list uploads and hash_user_data (meta_api_client).
+
+Normalization per field (Meta advanced matching rules):
+- em          trimmed, lowercase
+- ph          digits only, with country code, no leading zeros or trunk
+              '0' ('06-1234 5678' and '+31 (0)6 12345678' -> '31612345678');
+              numbers without a country code are taken as Dutch
+- fn, ln      lowercase, no punctuation or spaces (letters stay UTF-8)
+- ct          lowercase, no punctuation or spaces ('Den Haag' -> 'denhaag')
+- st          lowercase, no punctuation or spaces
+- zp          lowercase, no spaces or dashes ('1234 AB' -> '1234ab')
+- country     lowercase ISO code ('NL' -> 'nl')
+- external_id trimmed, lowercase
+
+Values that already are SHA-256 hashes are passed through unchanged.
+Hashes are memoized per (field, normalized value) in an LRU cache, so an
+event that is sent several times, or a person appearing in many batches,
+is hashed once per process.
+
+Usage:
+    hash_pii('Jan@Example.nl ', 'em')
+    hash_many(['0612345678', '+31 6 12345678'], 'ph')
+    hash_fields({'em': 'jan@example.nl', 'ct': 'Den Haag'})
+"""
+
+import os
+import re
+import hashlib
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+# Country code for phone numbers without one
+DEFAULT_COUNTRY_CODE = '31'
+
+# Memoized hashes per process
+HASH_CACHE_SIZE = int(os.getenv('PII_HASH_CACHE_SIZE', '100000'))
+
+SHA256_HEX = re.compile(r'^[0-9a-f]{64}$')
+
+# Everything except letters and digits (unicode aware)
+NON_ALPHANUMERIC = re.compile(r'[\W_]+', re.UNICODE)
+
+# Friendly names accepted next to Meta's field keys
+FIELD_ALIASES = {
+    'email': 'em',
+    'phone': 'ph',
+    'first_name': 'fn',
+    'last_name': 'ln',
+    'city': 'ct',
+    'state': 'st',
+    'zip': 'zp',
+    'zip_code': 'zp'
+}
+
+
+# ==============================================================================
+# NORMALIZATION
+# ==============================================================================
+
+def normalize_phone(value: str) -> str:
+    """Digits with country code, Dutch when none is given"""
+    value = value.strip()
+    digits = ''.join(filter(str.isdigit, value))
+    international = value.startswith('+')
+
+    if digits.startswith('00'):
+        # 0031... international dialing prefix
+        digits = digits[2:]
+        international = True
+
+    if international:
+        # +31 (0)6...: drop the trunk zero written after the country code
+        if digits.startswith(DEFAULT_COUNTRY_CODE + '0'):
+            digits = DEFAULT_COUNTRY_CODE + digits[len(DEFAULT_COUNTRY_CODE):].lstrip('0')
+        return digits
+
+    if digits.startswith('0'):
+        return DEFAULT_COUNTRY_CODE + digits.lstrip('0')
+    if digits.startswith(DEFAULT_COUNTRY_CODE):
+        return digits
+    return DEFAULT_COUNTRY_CODE + digits
+
+
+def _lower(value: str) -> str:
+    return value.strip().lower()
+
+
+def _lower_alphanumeric(value: str) -> str:
+    return NON_ALPHANUMERIC.sub('', value.strip().lower())
+
+
+NORMALIZERS = {
+    'em': _lower,
+    'ph': normalize_phone,
+    'fn': _lower_alphanumeric,
+    'ln': _lower_alphanumeric,
+    'ct': _lower_alphanumeric,
+    'st': _lower_alphanumeric,
+    'zp': _lower_alphanumeric,
+    'country': _lower_alphanumeric,
+    'external_id': _lower
+}
+
+
+def normalize(value: Optional[str], field: str) -> Optional[str]:
+    """
+    Normalize a value for a field ('em', 'ph', ... or an alias like 'email')
+
+    Returns:
+        Normalized value, None when nothing usable is left
+    """
+    if value is None:
+        return None
+    value = str(value)
+    field = FIELD_ALIASES.get(field, field)
+
+    normalized = NORMALIZERS.get(field, _lower)(value)
+    if field == 'ph' and len(normalized) <= len(DEFAULT_COUNTRY_CODE):
+        return None
+    return normalized or None
+
+
+# ==============================================================================
+# HASHING
+# ==============================================================================
+
+@lru_cache(maxsize=HASH_CACHE_SIZE)
+def _sha256(field: str, normalized: str) -> str:
+    """SHA-256 of a normalized value (memoized per field and value)"""
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def is_hashed(value: str) -> bool:
+    """True if a value already is a lowercase hex SHA-256 digest"""
+    return bool(SHA256_HEX.match(value.strip()))
+
+
+def hash_pii(value: Optional[str], field: str = 'em') -> Optional[str]:
+    """
+    Normalize and SHA-256 hash one value
+
+    Returns:
+        Hex digest, the value itself if it already is one, None for empty values
+    """
+    if value is None:
+        return None
+    if is_hashed(str(value)):
+        return str(value).strip()
+
+    field = FIELD_ALIASES.get(field, field)
+    normalized = normalize(value, field)
+    return _sha256(field, normalized) if normalized else None
+
+
+def hash_many(values: Iterable[Optional[str]], field: str = 'em') -> List[Optional[str]]:
+    """Hash a list of values of one field (duplicates are hashed once), order preserved"""
+    field = FIELD_ALIASES.get(field, field)
+    hashes: Dict[Optional[str], Optional[str]] = {}
+    return [
+        hashes[value] if value in hashes else hashes.setdefault(value, hash_pii(value, field))
+        for value in values
+    ]
+
+
+def hash_fields(fields: Dict[str, Optional[str]]) -> Dict[str, str]:
+    """Hash a {field: value} mapping, leaving out fields without a usable value"""
+    hashed = {}
+    for field, value in fields.items():
+        digest = hash_pii(value, field)
+        if digest:
+            hashed[FIELD_ALIASES.get(field, field)] = digest
+    return hashed
+
+
+def cache_info():
+    """LRU statistics of the hash cache (hits, misses, maxsize, currsize)"""
+    return _sha256.cache_info()
+
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+CACHED PIXEL SNIPPETS
+=====================
+Pre-rendered, pre-compressed responses for the /api/pixel/* endpoints.
+
+The pixel snippets only depend on the pixel ID (and, for events, the
+event name and parameters), so each response is rendered once and kept
+as bytes: the plain body plus gzip and, when the brotli package is
+installed, brotli versions. Responses carry a strong ETag and
+Cache-Control, and conditional GETs (If-None-Match) are answered with
+304 Not Modified without a body.
+
+Usage:
+    snippets = PixelSnippetCache(PixelCodeGenerator())
+
+    @app.route('/api/pixel/code')
+    def get_pixel_code():
+        return snippet_response(snippets.base_code({'instructions': '...'}))
+"""
+
+import os
+import gzip
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Any, Callable, Tuple, Optional
+
+from flask import Response, request
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+
+# ==============================================================================
+# CONFIGURATION
+# ==============================================================================
+
+class SnippetConfig:
+    """Pixel Snippet Cache Configuration"""
+    # Browser/CDN cache lifetime of snippet responses
+    MAX_AGE = int(os.getenv('PIXEL_SNIPPET_MAX_AGE', '3600'))  # seconds
+
+    # Distinct event snippets (event name + parameters) kept in memory
+    MAX_EVENT_ENTRIES = int(os.getenv('PIXEL_SNIPPET_MAX_EVENTS', '256'))
+
+    # Bodies smaller than this are not worth compressing
+    MIN_COMPRESS_SIZE = 256  # bytes
+
+
+@dataclass(frozen=True)
+class CachedSnippet:
+    """One rendered response with its compressed encodings"""
+    body: bytes
+    content_type: str
+    etag: str
+    encodings: Dict[str, bytes] = field(default_factory=dict)  # 'br' / 'gzip' -> bytes
+
+
+def build_snippet(body: bytes, content_type: str) -> CachedSnippet:
+    """Compress a rendered body once and derive its ETag"""
+    encodings = {}
+    if len(body) >= SnippetConfig.MIN_COMPRESS_SIZE:
+        if BROTLI_AVAILABLE:
+            encodings['br'] = brotli.compress(body, quality=11)
+        encodings['gzip'] = gzip.compress(body, compresslevel=9, mtime=0)
+
+    return CachedSnippet(
+        body=body,
+        content_type=content_type,
+        etag=hashlib.sha256(body).hexdigest()[:32],
+        encodings=encodings
+    )
+
+
+# ==============================================================================
+# SNIPPET CACHE
+# ==============================================================================
+
+class PixelSnippetCache:
+    """
+    Rendered /api/pixel/* responses per pixel ID
+
+    Every method takes the extra JSON fields of the endpoint (instructions,
+    deploy target; fixed per endpoint) and returns the same CachedSnippet
+    on every call.
+    Pass raw=True for the snippet itself instead of the JSON wrapper, so
+    a website can load it directly.
+    """
+
+    def __init__(self, generator, max_event_entries: int = None):
+        self.generator = generator
+        self.max_event_entries = max_event_entries or SnippetConfig.MAX_EVENT_ENTRIES
+        self._snippets: Dict[Tuple, CachedSnippet] = {}
+        self._events: 'OrderedDict[Tuple, CachedSnippet]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(
+        self,
+        store: Dict[Tuple, CachedSnippet],
+        key: Tuple,
+        render: Callable[[], Tuple[bytes, str]]
+    ) -> CachedSnippet:
+        with self._lock:
+            snippet = store.get(key)
+            if snippet is not None:
+                if store is self._events:
+                    self._events.move_to_end(key)
+                return snippet
+
+        # Rendering is deterministic, so a concurrent duplicate render is harmless
+        snippet = build_snippet(*render())
+
+        with self._lock:
+            store[key] = snippet
+            if store is self._events and len(self._events) > self.max_event_entries:
+                self._events.popitem(last=False)
+        return snippet
+
+    @staticmethod
+    def _json(payload: Dict[str, Any]) -> Tuple[bytes, str]:
+        return json.dumps(payload).encode('utf-8'), 'application/json'
+
+    def base_code(self, extra: Dict[str, Any] = None, raw: bool = False) -> CachedSnippet:
+        """Base pixel code (/api/pixel/code)"""
+        pixel_id = self.generator.pixel_id
+
+        def render():
+            code = self.generator.get_base_pixel_code()
+            if raw:
+                return code.encode('utf-8'), 'text/html; charset=utf-8'
+            return self._json(dict({'pixel_id': pixel_id, 'code': code}, **(extra or {})))
+
+        return self._get(self._snippets, ('base', pixel_id, raw), render)
+
+    def netlify_code(self, extra: Dict[str, Any] = None, raw: bool = False) -> CachedSnippet:
+        """Netlify integration code (/api/pixel/netlify)"""
+        pixel_id = self.generator.pixel_id
+
+        def render():
+            code = self.generator.get_netlify_integration_code()
+            if raw:
+                return code.encode('utf-8'), 'text/html; charset=utf-8'
+            return self._json(dict({'pixel_id': pixel_id, 'code': code}, **(extra or {})))
+
+        return self._get(self._snippets, ('netlify', pixel_id, raw), render)
+
+    def event_code(
+        self,
+        event_name: str,
+        custom_data: Optional[Dict[str, Any]] = None,
+        raw: bool = False
+    ) -> CachedSnippet:
+        """Event tracking code (/api/pixel/event/<event_name>), LRU-bounded"""
+        custom_data = custom_data or {}
+
+        def render():
+            code = self.generator.get_event_code(event_name, custom_data or None)
+            if raw:
+                return code.encode('utf-8'), 'application/javascript; charset=utf-8'
+            return self._json({'event_name': event_name, 'custom_data': custom_data, 'code': code})
+
+        key = (self.generator.pixel_id, event_name, json.dumps(custom_data, sort_keys=True), raw)
+        return self._get(self._events, key, render)
+
+
+# ==============================================================================
+# HTTP RESPONSES
+# ==============================================================================
+
+def _accepts(accept_encoding: str, encoding: str) -> bool:
+    """True if the Accept-Encoding header allows an encoding (q > 0)"""
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        if name.strip().lower() not in (encoding, '*'):
+            continue
+        params = params.replace(' ', '')
+        if params.startswith('q='):
+            try:
+                return float(params[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+def snippet_response(snippet: CachedSnippet) -> Response:
+    """
+    Serve a cached snippet for the current request
+
+    Answers If-None-Match with 304 and picks br > gzip > identity from
+    Accept-Encoding. Each encoding has its own strong ETag ("<hash>-br"),
+    all of which validate the same content.
+    """
+    headers = {
+        'Cache-Control': f'public, max-age={SnippetConfig.MAX_AGE}',
+        'Vary': 'Accept-Encoding'
+    }
+
+    accept_encoding = request.headers.get('Accept-Encoding', '')
+    encoding = next(
+        (name for name in ('br', 'gzip') if name in snippet.encodings and _accepts(accept_encoding, name)),
+        None
+    )
+    etag = f'"{snippet.etag}-{encoding}"' if encoding else f'"{snippet.etag}"'
+    headers['ETag'] = etag
+
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        if '*' in tags or any(tag.removeprefix('W/').strip('"').split('-')[0] == snippet.etag for tag in tags):
+            return Response(status=304, headers=headers)
+
+    body = snippet.encodings[encoding] if encoding else snippet.body
+    if encoding:
+        headers['Content-Encoding'] = encoding
+
+    return Response(body, status=200, headers=headers, content_type=snippet.content_type)
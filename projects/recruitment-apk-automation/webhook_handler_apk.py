@@ -38,10 +38,13 @@ import requests
 
 # Import email automation service
 from email_automation_service import start_email_sequence
+from circuit_breaker import get_breaker, breaker_states, any_open, server_error
+from integration_outbox import get_outbox, register_handler, ensure
 
 # Import Meta campaign modules
 try:
     from pixel_tracking import PixelCodeGenerator, ConversionAPI, UserData, CustomData, PixelConfig
+    from pixel_snippets import PixelSnippetCache, snippet_response
     from lead_ads_handler import LeadAdsWebhookHandler, LeadAdsConfig
     from campaign_automation import CampaignAutomationService, CampaignTemplates, AudienceBuilder
     META_MODULES_AVAILABLE = True
@@ -114,8 +117,11 @@ def health_check():
 
 @app.route('/health', methods=['GET'])
 def health():
-    """Alternative health check"""
-    return jsonify({'status': 'ok'})
+    """Alternative health check, with the circuit breaker state per dependency"""
+    return jsonify({
+        'status': 'degraded' if any_open() else 'ok',
+        'dependencies': breaker_states()
+    })
 
 
 # ==============================================================================
@@ -166,7 +172,7 @@ def handle_typeform_webhook():
         apk_report = generate_apk_report(assessment_data)
 
         # Create/update Pipedrive deal
-        deal = create_or_update_pipedrive_deal(assessment_data, apk_report)
+        deal = record_pipedrive_deal(assessment_data, apk_report)
 
         # Send email with APK report
         email_sent = send_apk_email(assessment_data, apk_report)
@@ -502,11 +508,13 @@ Zorg dat alle tekst in het Nederlands is en praktisch toepasbaar voor een Nederl
             'messages': [{'role': 'user', 'content': prompt}]
         }
 
-        response = requests.post(
+        response = get_breaker('claude').call(
+            requests.post,
             'https://api.anthropic.com/v1/messages',
             headers=headers,
             json=payload,
-            timeout=60
+            timeout=60,
+            failure_if=server_error
         )
 
         if response.status_code == 200:
@@ -560,14 +568,15 @@ def pipedrive_request(method: str, endpoint: str, data: Dict = None) -> Optional
     """Make request to Pipedrive API"""
     url = f"{PIPEDRIVE_BASE_URL}/{endpoint}"
     params = {"api_token": PIPEDRIVE_API_TOKEN}
+    breaker = get_breaker('pipedrive')
 
     try:
         if method == "GET":
-            response = requests.get(url, params=params, timeout=30)
+            response = breaker.call(requests.get, url, params=params, timeout=30, failure_if=server_error)
         elif method == "POST":
-            response = requests.post(url, params=params, json=data, timeout=30)
+            response = breaker.call(requests.post, url, params=params, json=data, timeout=30, failure_if=server_error)
         elif method == "PUT":
-            response = requests.put(url, params=params, json=data, timeout=30)
+            response = breaker.call(requests.put, url, params=params, json=data, timeout=30, failure_if=server_error)
         else:
             return None
 
@@ -664,6 +673,31 @@ def create_or_update_pipedrive_deal(assessment_data: Dict, report: Dict) -> Opti
         return None
 
 
+def _replay_pipedrive_deal(payload: Dict) -> Dict:
+    """integration_outbox handler: create the deal from the stored submission"""
+    return ensure(create_or_update_pipedrive_deal(payload['assessment_data'], payload['report']), 'Pipedrive deal')
+
+
+register_handler('apk.pipedrive_deal', _replay_pipedrive_deal, dependency='pipedrive')
+
+
+def record_pipedrive_deal(assessment_data: Dict, report: Dict) -> Optional[Dict]:
+    """
+    create_or_update_pipedrive_deal through the outbox: when no deal comes
+    back the submission is kept as a dead letter for
+    `python integration_outbox.py replay --kind apk.pipedrive_deal`
+    """
+    try:
+        return get_outbox().run(
+            'apk.pipedrive_deal',
+            {'assessment_data': assessment_data, 'report': report},
+            _replay_pipedrive_deal
+        )
+    except Exception as e:
+        logger.error(f"Pipedrive deal kept for replay: {str(e)}")
+        return None
+
+
 # ==============================================================================
 # EMAIL SENDING
 # ==============================================================================
@@ -818,10 +852,13 @@ recruitmentapk.nl
         msg.attach(MIMEText(html_content, 'html'))
 
         # Send email
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
-            server.starttls()
-            server.login(SMTP_USER, SMTP_PASS)
-            server.send_message(msg)
+        def deliver():
+            with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=30) as server:
+                server.starttls()
+                server.login(SMTP_USER, SMTP_PASS)
+                server.send_message(msg)
+
+        get_breaker('smtp').call(deliver)
 
         logger.info(f"APK email sent to {to_email}")
         return True
@@ -838,6 +875,7 @@ recruitmentapk.nl
 # Initialize Meta services (if available)
 if META_MODULES_AVAILABLE:
     pixel_generator = PixelCodeGenerator()
+    pixel_snippets = PixelSnippetCache(pixel_generator)
     conversion_api = ConversionAPI()
     lead_handler = LeadAdsWebhookHandler()
     audience_builder = AudienceBuilder()
@@ -865,11 +903,10 @@ def get_pixel_code():
     if not META_MODULES_AVAILABLE:
         return jsonify({'error': 'Meta modules not available'}), 503
 
-    return jsonify({
-        'pixel_id': PixelConfig.PIXEL_ID,
-        'code': pixel_generator.get_base_pixel_code(),
-        'instructions': 'Add this code to the <head> section of kandidatentekort.nl'
-    })
+    return snippet_response(pixel_snippets.base_code(
+        {'instructions': 'Add this code to the <head> section of kandidatentekort.nl'},
+        raw=request.args.get('raw') == '1'
+    ))
 
 
 @app.route('/api/pixel/netlify', methods=['GET'])
@@ -878,17 +915,18 @@ def get_netlify_pixel_code():
     if not META_MODULES_AVAILABLE:
         return jsonify({'error': 'Meta modules not available'}), 503
 
-    return jsonify({
-        'pixel_id': PixelConfig.PIXEL_ID,
-        'code': pixel_generator.get_netlify_integration_code(),
-        'deploy_to': 'kandidatentekortv2.netlify.app',
-        'instructions': [
-            '1. Copy the code from the "code" field',
-            '2. Add to your index.html or layout template',
-            '3. Deploy to Netlify',
-            '4. Verify with Facebook Pixel Helper extension'
-        ]
-    })
+    return snippet_response(pixel_snippets.netlify_code(
+        {
+            'deploy_to': 'kandidatentekortv2.netlify.app',
+            'instructions': [
+                '1. Copy the code from the "code" field',
+                '2. Add to your index.html or layout template',
+                '3. Deploy to Netlify',
+                '4. Verify with Facebook Pixel Helper extension'
+            ]
+        },
+        raw=request.args.get('raw') == '1'
+    ))
 
 
 @app.route('/api/pixel/event/<event_name>', methods=['GET'])
@@ -898,6 +936,7 @@ def get_event_code(event_name: str):
         return jsonify({'error': 'Meta modules not available'}), 503
 
     custom_data = request.args.to_dict()
+    raw = custom_data.pop('raw', None) == '1'
 
     # Convert string values to appropriate types
     for key in ['value', 'num_items']:
@@ -907,13 +946,7 @@ def get_event_code(event_name: str):
             except ValueError:
                 pass
 
-    code = pixel_generator.get_event_code(event_name, custom_data if custom_data else None)
-
-    return jsonify({
-        'event_name': event_name,
-        'custom_data': custom_data,
-        'code': code
-    })
+    return snippet_response(pixel_snippets.event_code(event_name, custom_data, raw=raw))
 
 
 @app.route('/api/conversion/lead', methods=['POST'])